@@ -3,7 +3,9 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 
-db = SQLAlchemy()
+from .routing import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
 login_manager.login_message_category = "warning"
@@ -17,7 +19,21 @@ def create_app():
     db.init_app(app)
     login_manager.init_app(app)
 
+    from .compression import init_compression
+
+    init_compression(app)
+
+    from .profiling import init_profiling
+
+    init_profiling(app)
+
+    from .routing import pin_after_write, replicas_cli
+
+    app.after_request(pin_after_write)
+
     from .models import User, seed_admin, seed_sample_events
+    from .cache import CATALOG_VERSION, FACETS_VERSION, ensure_data_version
+    from .typeahead import SEARCH_INDEX_VERSION, suggest_index
 
     @login_manager.user_loader
     def load_user(user_id):
@@ -27,10 +43,30 @@ def create_app():
     from .auth import auth_bp
     from .events import events_bp
     from .admin import admin_bp
+    from .api import api_bp
+    from .images import images_bp, images_cli
 
     app.register_blueprint(events_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(images_bp)
+
+    from . import activity  # noqa: F401  registers per-user counter listeners
+    from . import notifications  # noqa: F401  registers job handlers
+    from .summaries import ensure_summaries, summaries_cli
+    from .changes import changes_cli
+    from .jobs import jobs_cli
+    from .mail import mail_cli
+    from .recommendations import recommendations_cli
+
+    app.cli.add_command(changes_cli)
+    app.cli.add_command(images_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(mail_cli)
+    app.cli.add_command(recommendations_cli)
+    app.cli.add_command(replicas_cli)
+    app.cli.add_command(summaries_cli)
 
     # 🔥 ADD HOME ROUTE
     @app.route("/")
@@ -40,6 +76,9 @@ def create_app():
     # Setup database
     with app.app_context():
         db.create_all()
+        ensure_data_version(CATALOG_VERSION, FACETS_VERSION, SEARCH_INDEX_VERSION)
+        suggest_index.rebuild()
+        ensure_summaries()
 #        seed_admin()
 #        seed_sample_events()
 
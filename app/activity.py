@@ -0,0 +1,34 @@
+"""Per-user registration and interest counts kept on the user row as they change."""
+from __future__ import annotations
+
+from collections import Counter
+
+from sqlalchemy import event as sa_event, update
+from sqlalchemy.orm import Session
+
+from .models import EventInterest, Registration, User
+
+
+# Counted model -> name of the User column holding how many such rows each user has.
+COUNTERS = {Registration: "registration_count", EventInterest: "interest_count"}
+
+
+@sa_event.listens_for(Session, "after_flush")
+def _apply_count_deltas(session, flush_context) -> None:
+    """Fold this flush's inserts and deletes into the owners' counters, in the same transaction.
+
+    Deletes cascaded from an event or series are part of ``session.deleted``
+    here too, so every ORM write path is covered without touching the views.
+    """
+    deltas = {name: Counter() for name in COUNTERS.values()}
+    for objects, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            name = COUNTERS.get(type(obj))
+            if name is not None:
+                deltas[name][obj.user_id] += sign
+
+    for name, per_user in deltas.items():
+        column = getattr(User, name)
+        for user_id, delta in per_user.items():
+            if delta:
+                session.connection().execute(update(User).where(User.id == user_id).values({column: column + delta}))
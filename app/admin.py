@@ -1,11 +1,35 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from functools import wraps
 
-from flask import Blueprint, abort, flash, redirect, render_template, request, url_for
+from flask import Blueprint, Response, abort, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
+from sqlalchemy.orm import joinedload
 
 from . import db
-from .models import EVENT_CATEGORY_CHOICES, Event, EventInterest, Registration
+from .admission import admission_controller
+from .changes import record_change
+from .checkin import MAX_BULK_SCANS, bulk_check_in, check_in, check_in_counts, roster
+from .compression import compression_stats
+from .conflicts import conflict_report, series_venue_conflicts, venue_conflicts
+from .events import TEAM_OPTIONS
+from .images import ImageError, images_enabled, is_local_image, queue_ingest, read_upload
+from .models import EVENT_CATEGORY_CHOICES, RECURRENCE_FREQUENCIES, Event, EventInterest, EventSeries, Registration
+from .profiling import profiler
+from .recurrence import (
+    SeriesEditError,
+    apply_series_edit,
+    exclude_occurrence,
+    find_occurrence,
+    materialize,
+    remove_series,
+    series_rule,
+)
+from .rosters import ROSTER_COLUMNS, RosterError, parse_roster, register_roster
+from .routing import replica_status
+from .streaming import stream_events, stream_page, stream_rows
+from .summaries import SUPER_SCOPE, dashboard_summary
+from .typeahead import stage_index_update
+from .waitlist import promote_waitlist
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -39,13 +63,6 @@ def _ensure_event_access(event: Event):
         abort(403)
 
 
-def _registration_query():
-    query = Registration.query
-    if current_user.is_super_admin:
-        return query
-    return query.join(Event).filter(Event.event_type == current_user.admin_scope)
-
-
 def _event_type_options():
     if current_user.is_super_admin:
         return EVENT_CATEGORY_CHOICES
@@ -56,17 +73,14 @@ def _event_type_options():
 @login_required
 @admin_required
 def dashboard():
-    events = _filtered_events_query(Event.query).order_by(Event.start_time).all()
-    total_registrations = _registration_query().count()
-    upcoming_events = _filtered_events_query(
-        Event.query.filter(Event.start_time >= datetime.utcnow())
-    ).count()
-    return render_template(
+    scope = SUPER_SCOPE if current_user.is_super_admin else current_user.admin_scope
+    series = _filtered_events_query(EventSeries.query).order_by(EventSeries.start_time).all()
+    return stream_page(
         "admin/dashboard.html",
-        events=events,
-        total_registrations=total_registrations,
-        upcoming_events=upcoming_events,
+        events=stream_events(_filtered_events_query(Event.query).order_by(Event.start_time)),
+        series=series,
         admin_scope=current_user.admin_scope,
+        **dashboard_summary(scope),
     )
 
 
@@ -77,24 +91,45 @@ def create_event():
     event_type_choices = _event_type_options()
     if request.method == "POST":
         form = _event_form_data(request)
-        if form["errors"]:
-            for error in form["errors"]:
+        recurrence = _recurrence_form_data(request)
+        upload = _image_upload(request)
+        errors = form["errors"] + recurrence["errors"] + upload["errors"]
+        if errors:
+            for error in errors:
                 flash(error, "danger")
             return render_template(
                 "admin/event_form.html",
                 event=None,
-                form_defaults=_build_form_defaults(data=form["data"]),
+                form_defaults=_build_form_defaults(data={**form["data"], **recurrence["data"]}),
                 event_types=event_type_choices,
                 form_action=url_for("admin.create_event"),
+                show_recurrence=True,
             )
 
         if not current_user.is_super_admin:
             form["data"]["event_type"] = current_user.admin_scope
 
+        if recurrence["data"]["frequency"] != "none":
+            series = EventSeries(**form["data"], **recurrence["data"])
+            db.session.add(series)
+            db.session.flush()
+            clashes = series_venue_conflicts(series)
+            record_change(series, "create")
+            queue_ingest(series, upload["data"])
+            db.session.commit()
+            flash(f"Recurring event created ({series.rule_label.lower()}).", "success")
+            _flash_venue_conflicts(clashes)
+            return redirect(url_for("admin.dashboard"))
+
+        clashes = venue_conflicts(form["data"]["location"], form["data"]["start_time"], form["data"]["end_time"])
         event = Event(**form["data"])
         db.session.add(event)
+        stage_index_update(event)
+        record_change(event, "create")
+        queue_ingest(event, upload["data"])
         db.session.commit()
         flash("Event created successfully.", "success")
+        _flash_venue_conflicts(clashes)
         return redirect(url_for("admin.dashboard"))
 
     defaults = _build_form_defaults()
@@ -107,6 +142,7 @@ def create_event():
         form_defaults=defaults,
         event_types=event_type_choices,
         form_action=url_for("admin.create_event"),
+        show_recurrence=True,
     )
 
 
@@ -120,8 +156,10 @@ def edit_event(event_id: int):
 
     if request.method == "POST":
         form = _event_form_data(request)
-        if form["errors"]:
-            for error in form["errors"]:
+        upload = _image_upload(request)
+        errors = form["errors"] + upload["errors"]
+        if errors:
+            for error in errors:
                 flash(error, "danger")
             return render_template(
                 "admin/event_form.html",
@@ -134,10 +172,23 @@ def edit_event(event_id: int):
         if not current_user.is_super_admin:
             form["data"]["event_type"] = current_user.admin_scope
 
+        clashes = venue_conflicts(
+            form["data"]["location"], form["data"]["start_time"], form["data"]["end_time"], exclude_event_id=event.id
+        )
+        previous_capacity = event.capacity
         for key, value in form["data"].items():
             setattr(event, key, value)
+        if event.series_id:
+            # An individually edited occurrence no longer follows later series edits.
+            event.is_exception = True
+        stage_index_update(event)
+        record_change(event, "update")
+        if event.capacity > previous_capacity:
+            promote_waitlist(event)
+        queue_ingest(event, upload["data"])
         db.session.commit()
         flash("Event updated successfully.", "success")
+        _flash_venue_conflicts(clashes)
         return redirect(url_for("admin.dashboard"))
 
     return render_template(
@@ -155,29 +206,304 @@ def edit_event(event_id: int):
 def delete_event(event_id: int):
     event = Event.query.get_or_404(event_id)
     _ensure_event_access(event)
+    stage_index_update(event, removed=True)
+    record_change(event, "delete")
+    if event.series_id:
+        exclude_occurrence(event.series, event.occurrence_start)
     db.session.delete(event)
     db.session.commit()
     flash("Event deleted successfully.", "info")
     return redirect(url_for("admin.dashboard"))
 
 
+@admin_bp.route("/series/<int:series_id>/edit", methods=["GET", "POST"])
+@login_required
+@admin_required
+def edit_series(series_id: int):
+    series = EventSeries.query.get_or_404(series_id)
+    _ensure_event_access(series)
+    event_type_choices = _event_type_options()
+    form_action = url_for("admin.edit_series", series_id=series.id)
+
+    if request.method == "POST":
+        form = _event_form_data(request)
+        recurrence = _recurrence_form_data(request, allow_single=False)
+        upload = _image_upload(request)
+        errors = form["errors"] + recurrence["errors"] + upload["errors"]
+        if errors:
+            for error in errors:
+                flash(error, "danger")
+            return render_template(
+                "admin/event_form.html",
+                event=series,
+                form_defaults=_build_form_defaults(data={**form["data"], **recurrence["data"]}),
+                event_types=event_type_choices,
+                form_action=form_action,
+                show_recurrence=True,
+            )
+
+        if not current_user.is_super_admin:
+            form["data"]["event_type"] = current_user.admin_scope
+
+        previous_rule = series_rule(series)
+        for key, value in {**form["data"], **recurrence["data"]}.items():
+            setattr(series, key, value)
+        record_change(series, "update")
+        try:
+            updated = apply_series_edit(series, previous_rule)
+        except SeriesEditError as error:
+            db.session.rollback()
+            flash(str(error), "danger")
+            return render_template(
+                "admin/event_form.html",
+                event=series,
+                form_defaults=_build_form_defaults(data={**form["data"], **recurrence["data"]}),
+                event_types=event_type_choices,
+                form_action=form_action,
+                show_recurrence=True,
+            )
+        clashes = series_venue_conflicts(series)
+        queue_ingest(series, upload["data"])
+        db.session.commit()
+        message = "Series updated successfully."
+        if updated:
+            message += f" {updated} booked date{'s' if updated != 1 else ''} updated too."
+        flash(message, "success")
+        _flash_venue_conflicts(clashes)
+        return redirect(url_for("admin.dashboard"))
+
+    return render_template(
+        "admin/event_form.html",
+        event=series,
+        form_defaults=_build_form_defaults(event=series),
+        event_types=event_type_choices,
+        form_action=form_action,
+        show_recurrence=True,
+    )
+
+
+@admin_bp.route("/series/<int:series_id>/delete", methods=["POST"])
+@login_required
+@admin_required
+def delete_series(series_id: int):
+    series = EventSeries.query.get_or_404(series_id)
+    _ensure_event_access(series)
+    remove_series(series)
+    db.session.commit()
+    flash("Series deleted successfully.", "info")
+    return redirect(url_for("admin.dashboard"))
+
+
+@admin_bp.route("/series/<int:series_id>/<stamp>/edit", methods=["POST"])
+@login_required
+@admin_required
+def edit_occurrence(series_id: int, stamp: str):
+    occurrence = find_occurrence(series_id, stamp)
+    if occurrence is None:
+        abort(404)
+    _ensure_event_access(occurrence)
+    if occurrence.id is None:
+        occurrence = materialize(occurrence, exception=True)
+        db.session.commit()
+    return redirect(url_for("admin.edit_event", event_id=occurrence.id))
+
+
+@admin_bp.route("/series/<int:series_id>/<stamp>/cancel", methods=["POST"])
+@login_required
+@admin_required
+def cancel_occurrence(series_id: int, stamp: str):
+    occurrence = find_occurrence(series_id, stamp)
+    if occurrence is None:
+        abort(404)
+    _ensure_event_access(occurrence)
+    if occurrence.id is not None:
+        flash("This date has registrations; delete it from its event page instead.", "warning")
+        return redirect(url_for("events.event_detail", event_id=occurrence.id))
+    exclude_occurrence(occurrence.series, occurrence.start_time)
+    db.session.commit()
+    flash(f"{occurrence.date_label} removed from the series.", "info")
+    return redirect(url_for("events.events_list"))
+
+
+@admin_bp.route("/admission")
+@login_required
+@admin_required
+def admission_stats():
+    return jsonify(admission_controller().stats())
+
+
+@admin_bp.route("/compression")
+@login_required
+@admin_required
+def compression_report():
+    return jsonify(compression_stats().snapshot())
+
+
+@admin_bp.route("/profiling")
+@login_required
+@admin_required
+def profiling_report():
+    return jsonify(profiler().snapshot())
+
+
+@admin_bp.route("/profiling/cpu/<int:profile_id>")
+@login_required
+@admin_required
+def cpu_profile(profile_id: int):
+    profile = profiler().profile(profile_id)
+    if profile is None:
+        abort(404)
+    body = "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
+    return Response(
+        body,
+        mimetype="text/plain",
+        headers={"Content-Disposition": f"attachment; filename=profile-{profile_id}.folded"},
+    )
+
+
+@admin_bp.route("/profiling/memory", methods=["GET", "POST"])
+@login_required
+@admin_required
+def memory_growth():
+    """POST sets this worker's allocation baseline; GET lists the biggest growth since then."""
+    report = profiler()
+    if request.method == "POST":
+        report.set_baseline()
+        return jsonify({"baseline_set": True})
+    limit = min(request.args.get("limit", 25, type=int), 200)
+    return jsonify({"baseline_set": report.baseline is not None, "growth": report.growth_since_baseline(limit)})
+
+
+@admin_bp.route("/replicas")
+@login_required
+@admin_required
+def replicas():
+    return jsonify({"replicas": replica_status(refresh=True)})
+
+
+@admin_bp.route("/conflicts")
+@login_required
+@admin_required
+def conflicts():
+    scope = None if current_user.is_super_admin else current_user.admin_scope
+    report = conflict_report(event_type=scope)
+    return render_template("admin/conflicts.html", report=report, admin_scope=current_user.admin_scope)
+
+
 @admin_bp.route("/events/<int:event_id>/registrations")
 @login_required
 @admin_required
 def event_registrations(event_id: int):
     event = Event.query.get_or_404(event_id)
     _ensure_event_access(event)
-    registrations = (
-        Registration.query.filter_by(event_id=event.id)
-        .order_by(Registration.created_at.desc())
-        .all()
+    registrations = Registration.query.filter_by(event_id=event.id)
+    interests = EventInterest.query.filter_by(event_id=event.id)
+    return stream_page(
+        "admin/registrations.html",
+        event=event,
+        registrations=stream_rows(registrations.order_by(Registration.created_at.desc())),
+        registration_count=registrations.count(),
+        checked_in=registrations.filter(Registration.checked_in_at.isnot(None)).count(),
+        interests=stream_rows(
+            interests.options(joinedload(EventInterest.user)).order_by(EventInterest.created_at.desc())
+        ),
+        interest_count=interests.count(),
     )
-    interests = (
-        EventInterest.query.filter_by(event_id=event.id)
-        .order_by(EventInterest.created_at.desc())
-        .all()
+
+
+@admin_bp.route("/events/<int:event_id>/bulk-register", methods=["GET", "POST"])
+@login_required
+@admin_required
+def bulk_register(event_id: int):
+    event = Event.query.get_or_404(event_id)
+    _ensure_event_access(event)
+    results = None
+
+    if request.method == "POST":
+        upload = request.files.get("roster")
+        if not upload or not upload.filename:
+            flash("Choose a CSV roster to upload.", "danger")
+            return redirect(url_for("admin.bulk_register", event_id=event.id))
+        try:
+            rows = parse_roster(upload.stream)
+        except RosterError as error:
+            flash(str(error), "danger")
+            return redirect(url_for("admin.bulk_register", event_id=event.id))
+
+        results = register_roster(event, rows, TEAM_OPTIONS)
+        db.session.commit()
+        registered = sum(1 for result in results if result["status"] == "registered")
+        flash(f"Registered {registered} of {len(results)} roster rows.", "success" if registered else "warning")
+
+    return render_template(
+        "admin/bulk_register.html",
+        event=event,
+        results=results,
+        roster_columns=ROSTER_COLUMNS,
     )
-    return render_template("admin/registrations.html", event=event, registrations=registrations, interests=interests)
+
+
+@admin_bp.route("/events/<int:event_id>/kiosk")
+@login_required
+@admin_required
+def checkin_kiosk(event_id: int):
+    event = Event.query.get_or_404(event_id)
+    _ensure_event_access(event)
+    registered, checked_in = check_in_counts(event.id)
+    return render_template("admin/kiosk.html", event=event, registered=registered, checked_in=checked_in)
+
+
+@admin_bp.route("/events/<int:event_id>/roster")
+@login_required
+@admin_required
+def checkin_roster(event_id: int):
+    event = Event.query.get_or_404(event_id)
+    _ensure_event_access(event)
+    return jsonify({"event_id": event.id, "attendees": roster(event.id)})
+
+
+@admin_bp.route("/events/<int:event_id>/check-in", methods=["POST"])
+@login_required
+@admin_required
+def checkin_scan(event_id: int):
+    event = Event.query.get_or_404(event_id)
+    _ensure_event_access(event)
+    payload = request.get_json(silent=True) or request.form
+    student_uid = (payload.get("student_uid") or "").strip()
+    if not student_uid:
+        return jsonify({"status": "invalid", "error": "student_uid is required."}), 400
+
+    status, attendee = check_in(event.id, student_uid)
+    db.session.commit()
+    return jsonify({"status": status, "student_uid": student_uid, "attendee": attendee}), (
+        404 if status == "not_found" else 200
+    )
+
+
+@admin_bp.route("/events/<int:event_id>/check-in/bulk", methods=["POST"])
+@login_required
+@admin_required
+def checkin_bulk(event_id: int):
+    event = Event.query.get_or_404(event_id)
+    _ensure_event_access(event)
+    scans = (request.get_json(silent=True) or {}).get("scans") or []
+    if len(scans) > MAX_BULK_SCANS:
+        return jsonify({"error": f"At most {MAX_BULK_SCANS} scans per batch."}), 400
+
+    parsed = []
+    for scan in scans:
+        student_uid = str(scan.get("uid", "")).strip()
+        try:
+            scanned_at = datetime.fromisoformat(scan["scanned_at"]) if scan.get("scanned_at") else datetime.utcnow()
+        except (TypeError, ValueError):
+            scanned_at = datetime.utcnow()
+        if student_uid:
+            parsed.append((student_uid, scanned_at.replace(tzinfo=None)))
+
+    results = bulk_check_in(event.id, parsed)
+    db.session.commit()
+    registered, checked_in = check_in_counts(event.id)
+    return jsonify({"results": results, "registered": registered, "checked_in": checked_in})
 
 
 @admin_bp.route("/registrations/<int:registration_id>")
@@ -204,6 +530,16 @@ def registration_detail(registration_id: int):
     )
 
 
+def _flash_venue_conflicts(clashes, limit: int = 5):
+    for clash in clashes[:limit]:
+        flash(
+            f"{clash.location} is also booked for \"{clash.title}\" ({clash.date_label}, {clash.time_range}).",
+            "warning",
+        )
+    if len(clashes) > limit:
+        flash(f"{len(clashes) - limit} more dates clash; see Schedule Conflicts.", "warning")
+
+
 def _event_form_data(req):
     """Extract and validate common event fields from request data."""
     data = {
@@ -247,6 +583,50 @@ def _event_form_data(req):
     if data["event_type"] not in EVENT_CATEGORY_CHOICES:
         errors.append("Select a valid event type.")
 
+    image_url = data["image_url"]
+    if image_url and not (image_url.startswith(("http://", "https://")) or is_local_image(image_url)):
+        errors.append("Image URL must start with http:// or https://.")
+
+    return {"data": data, "errors": errors}
+
+
+def _image_upload(req):
+    """Read the optional cover image upload; it replaces the image URL once processed."""
+    upload = req.files.get("image_file")
+    if upload is None or not upload.filename:
+        return {"data": None, "errors": []}
+    if not images_enabled():
+        return {"data": None, "errors": ["Image uploads are not available on this server."]}
+    try:
+        return {"data": read_upload(upload), "errors": []}
+    except ImageError as error:
+        return {"data": None, "errors": [str(error)]}
+
+
+def _recurrence_form_data(req, allow_single: bool = True):
+    """Extract and validate the repeat rule shown on the create and series forms."""
+    frequency = req.form.get("frequency", "none").strip() or "none"
+    interval_raw = req.form.get("interval", "1").strip() or "1"
+    until_raw = req.form.get("until", "").strip()
+    data = {"frequency": frequency, "interval": 1, "until": None}
+
+    errors = []
+    allowed = RECURRENCE_FREQUENCIES + (["none"] if allow_single else [])
+    if frequency not in allowed:
+        errors.append("Select a valid repeat option.")
+    try:
+        data["interval"] = int(interval_raw)
+        if data["interval"] <= 0:
+            raise ValueError
+    except ValueError:
+        errors.append("Repeat interval must be a positive integer.")
+    if until_raw:
+        try:
+            # Inclusive of the whole final day.
+            data["until"] = datetime.fromisoformat(until_raw) + timedelta(days=1) - timedelta(microseconds=1)
+        except ValueError:
+            errors.append("Repeat until must be a valid date.")
+
     return {"data": data, "errors": errors}
 
 
@@ -266,6 +646,9 @@ def _build_form_defaults(event=None, data=None):
             "capacity": event.capacity,
             "image_url": event.image_url,
             "event_type": event.event_type,
+            "frequency": getattr(event, "frequency", "none"),
+            "interval": getattr(event, "interval", 1),
+            "until": getattr(event, "until", None),
         }
 
     start_time = source.get("start_time")
@@ -288,6 +671,9 @@ def _build_form_defaults(event=None, data=None):
         "capacity": source.get("capacity", 10),
         "image_url": source.get("image_url", "") or "",
         "event_type": source.get("event_type", EVENT_CATEGORY_CHOICES[0]),
+        "frequency": source.get("frequency", "none"),
+        "interval": source.get("interval", 1),
+        "until": source["until"].strftime("%Y-%m-%d") if source.get("until") else "",
     }
 
     return defaults
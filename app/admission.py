@@ -0,0 +1,240 @@
+"""Admission control for write endpoints: token buckets plus a concurrency cap.
+
+Buckets and in-flight slots live in a small SQLite file beside the app
+database rather than in it, so throttling bookkeeping never queues behind the
+main write lock, and every gunicorn worker on the host shares the same counts.
+"""
+from __future__ import annotations
+
+import itertools
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+
+from flask import Response, current_app, g, request, session
+
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# Fully refilled buckets are indistinguishable from missing ones, so idle rows are pruned now and then.
+PRUNE_EVERY = 1000
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)",
+    # One row per write request in progress; rows left by a crashed worker lapse at expires_at.
+    "CREATE TABLE IF NOT EXISTS slot (id INTEGER PRIMARY KEY, expires_at REAL NOT NULL)",
+    """
+    CREATE TABLE IF NOT EXISTS counter (
+        endpoint TEXT NOT NULL,
+        outcome TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (endpoint, outcome)
+    )
+    """,
+)
+
+Bucket = Tuple[str, float, float]
+
+
+class BucketStore:
+    """Token buckets and throttling counters shared by every process that opens the same file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._calls = itertools.count(1)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=0.25, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+        return connection
+
+    def take(self, buckets: List[Bucket], endpoint: str) -> Optional[float]:
+        """Spend one token from every bucket, or from none of them.
+
+        Returns ``None`` when admitted, otherwise the seconds until the
+        emptiest bucket holds a whole token again.
+        """
+        connection = self._connection()
+        now = time.time()
+        # IMMEDIATE takes the store's write lock up front, making the read-modify-write atomic across workers.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            refilled = []
+            retry_after = None
+            for key, burst, rate in buckets:
+                row = connection.execute("SELECT tokens, updated_at FROM bucket WHERE key = ?", (key,)).fetchone()
+                tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+                if tokens < 1:
+                    retry_after = max(retry_after or 0.0, (1 - tokens) / rate)
+                refilled.append((key, tokens - 1))
+            if retry_after is None:
+                connection.executemany(
+                    "INSERT INTO bucket (key, tokens, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                    [(key, tokens, now) for key, tokens in refilled],
+                )
+            self._count(connection, endpoint, "admitted" if retry_after is None else "throttled")
+            if next(self._calls) % PRUNE_EVERY == 0:
+                longest_refill = max(burst / rate for _, burst, rate in buckets)
+                connection.execute("DELETE FROM bucket WHERE updated_at < ?", (now - longest_refill,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    def acquire_slot(self, limit: int, ttl: float) -> Optional[int]:
+        """Claim one of ``limit`` in-flight slots for ``ttl`` seconds; ``None`` when all are taken."""
+        connection = self._connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM slot WHERE expires_at < ?", (now,))
+            if connection.execute("SELECT COUNT(*) FROM slot").fetchone()[0] >= limit:
+                slot_id = None
+            else:
+                slot_id = connection.execute("INSERT INTO slot (expires_at) VALUES (?)", (now + ttl,)).lastrowid
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return slot_id
+
+    def release_slot(self, slot_id: int) -> None:
+        self._connection().execute("DELETE FROM slot WHERE id = ?", (slot_id,))
+
+    def slots_in_use(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM slot WHERE expires_at >= ?", (time.time(),)).fetchone()[0]
+
+    @staticmethod
+    def _count(connection: sqlite3.Connection, endpoint: str, outcome: str) -> None:
+        connection.execute(
+            "INSERT INTO counter (endpoint, outcome, count) VALUES (?, ?, 1) "
+            "ON CONFLICT (endpoint, outcome) DO UPDATE SET count = count + 1",
+            (endpoint, outcome),
+        )
+
+    def count(self, endpoint: str, outcome: str) -> None:
+        self._count(self._connection(), endpoint, outcome)
+
+    def counters(self) -> Dict[str, Dict[str, int]]:
+        counters: Dict[str, Dict[str, int]] = {}
+        rows = self._connection().execute("SELECT endpoint, outcome, count FROM counter ORDER BY endpoint, outcome")
+        for endpoint, outcome, count in rows:
+            counters.setdefault(endpoint, {})[outcome] = count
+        return counters
+
+
+class AdmissionController:
+    """Gate in front of write views: a non-blocking slot for the concurrency cap, then the buckets."""
+
+    def __init__(self, config, instance_path: str):
+        self.store = BucketStore(config["ADMISSION_STORE"] or os.path.join(instance_path, "admission.db"))
+        self.max_in_flight = config["ADMISSION_MAX_CONCURRENT_WRITES"]
+        self.slot_ttl = config["ADMISSION_SLOT_TTL"]
+        self.limits = {
+            "user": (config["ADMISSION_USER_BURST"], config["ADMISSION_USER_RATE"]),
+            "ip": (config["ADMISSION_IP_BURST"], config["ADMISSION_IP_RATE"]),
+            "endpoint": (config["ADMISSION_ENDPOINT_BURST"], config["ADMISSION_ENDPOINT_RATE"]),
+        }
+
+    def acquire(self) -> Optional[int]:
+        """Return a slot id to release later, or ``None`` when the host is at its cap."""
+        return self.store.acquire_slot(self.max_in_flight, self.slot_ttl)
+
+    def release(self, slot_id: int) -> None:
+        self.store.release_slot(slot_id)
+
+    def buckets(self, scope: str) -> List[Bucket]:
+        # remote_addr is the client's once ProxyFix trusts TRUSTED_PROXY_HOPS proxies. A client-sent
+        # X-Forwarded-For never changes the key, so it cannot be used to dodge the per-IP bucket.
+        buckets = [
+            (f"endpoint:{scope}", *self.limits["endpoint"]),
+            (f"ip:{scope}:{request.remote_addr}", *self.limits["ip"]),
+        ]
+        # Read the id from the session cookie so the check itself never loads the user row.
+        user_id = session.get("_user_id")
+        if user_id:
+            buckets.append((f"user:{scope}:{user_id}", *self.limits["user"]))
+        return buckets
+
+    def stats(self) -> dict:
+        return {
+            "limits": {name: {"burst": burst, "per_second": rate} for name, (burst, rate) in self.limits.items()},
+            "max_concurrent_writes": self.max_in_flight,
+            "in_flight": self.store.slots_in_use(),
+            "counters": self.store.counters(),
+        }
+
+
+def admission_controller() -> AdmissionController:
+    controller = current_app.extensions.get("admission")
+    if controller is None:
+        controller = current_app.extensions.setdefault(
+            "admission", AdmissionController(current_app.config, current_app.instance_path)
+        )
+    return controller
+
+
+def _too_many(retry_after: float) -> Response:
+    return Response(
+        "Too many requests, retry shortly.",
+        status=429,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def admit(scope: str):
+    """Guard a write view; ``scope`` names its endpoint bucket and counters.
+
+    Goes above ``idempotent`` and ``login_required``, so a rejected request
+    costs no main-database work at all.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if (
+                request.method not in WRITE_METHODS
+                or g.get("admitted")
+                or not current_app.config["ADMISSION_ENABLED"]
+            ):
+                return view(*args, **kwargs)
+
+            controller = admission_controller()
+            try:
+                slot_id = controller.acquire()
+                if slot_id is None:
+                    controller.store.count(scope, "shed")
+                    return _too_many(1)
+                retry_after = controller.store.take(controller.buckets(scope), scope)
+            except sqlite3.OperationalError:
+                # Fail open: a busy throttle store must not take the site down with it.
+                current_app.logger.warning("Admission store unavailable; admitting %s", scope)
+                slot_id = retry_after = None
+            try:
+                if retry_after is not None:
+                    return _too_many(retry_after)
+                g.admitted = True
+                return view(*args, **kwargs)
+            finally:
+                if slot_id is not None:
+                    try:
+                        controller.release(slot_id)
+                    except sqlite3.OperationalError:
+                        # The slot lapses on its own after ADMISSION_SLOT_TTL.
+                        pass
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,238 @@
+"""Versioned read-only JSON API for kiosks and partner sites."""
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, abort, current_app, request
+from sqlalchemy import func, select
+
+from . import db
+from .cache import current_data_version
+from .changes import changes_since
+from .events import QUICK_TIMEFRAMES, _resolve_timeframe
+from .facets import search_clause
+from .models import Event, Registration
+from .pagination import after_cursor, encode_cursor
+
+
+api_bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+MAX_BATCH_IDS = 100
+MAX_CHANGE_BATCH = 1000
+
+_seats_taken = (
+    select(func.count(Registration.id)).where(Registration.event_id == Event.id).correlate(Event).scalar_subquery()
+)
+
+FIELDS = {
+    "id": Event.id,
+    "title": Event.title,
+    "summary": Event.summary,
+    "description": Event.description,
+    "location": Event.location,
+    "start_time": Event.start_time,
+    "end_time": Event.end_time,
+    "capacity": Event.capacity,
+    "event_type": Event.event_type,
+    "image_url": Event.image_url,
+    "seats_remaining": (Event.capacity - _seats_taken).label("seats_remaining"),
+}
+DEFAULT_FIELDS = tuple(name for name in FIELDS if name != "description")
+
+
+class APIError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@api_bp.errorhandler(APIError)
+def handle_api_error(error: APIError):
+    return _json_response({"error": error.message}, status=error.status, cache=False)
+
+
+def _requested_fields():
+    raw = request.args.get("fields", "").strip()
+    if not raw:
+        return DEFAULT_FIELDS
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise APIError(f"Unknown field(s): {', '.join(unknown)}.")
+    # The id is always returned so clients can correlate rows.
+    return ("id", *[name for name in names if name != "id"])
+
+
+def _serialize(rows, fields):
+    """Build plain dicts straight from result tuples, skipping ORM object construction."""
+    items = []
+    for row in rows:
+        item = {}
+        for name, value in zip(fields, row):
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            elif name == "seats_remaining":
+                value = max(value, 0)
+            elif name == "image_url" and value and value.startswith("/"):
+                value = request.host_url.rstrip("/") + value
+            item[name] = value
+        items.append(item)
+    return items
+
+
+def _page_size():
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise APIError("limit must be an integer.")
+    return min(max(limit, 1), MAX_PAGE_SIZE)
+
+
+def _json_response(payload, status: int = 200, cache: bool = True) -> Response:
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    response = Response(body, status=status, mimetype="application/json")
+    if cache:
+        response.headers["Cache-Control"] = "public, max-age=60"
+    return response
+
+
+def _cached(build, clock: str = ""):
+    """Answer conditional requests from the data version before running any event query.
+
+    ``clock`` names the period a time-relative result was computed for, so its
+    ETag changes when the period rolls over even if no data did.
+    """
+    digest = hashlib.sha1(request.full_path.encode()).hexdigest()[:16]
+    etag = f"{current_data_version()}-{digest}" + (f"-{clock}" if clock else "")
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.headers["Cache-Control"] = "public, max-age=60"
+    else:
+        response = build()
+    response.set_etag(etag)
+    return response
+
+
+@api_bp.route("/events")
+def list_events():
+    now = datetime.utcnow()
+    # ``upcoming`` compares against the minute so that the result and its ETag move together.
+    upcoming_after = now.replace(second=0, microsecond=0) if request.args.get("upcoming") in {"1", "true"} else None
+    timeframe, selected_date, start_bound, end_bound = _resolve_timeframe(now)
+    clock = []
+    if timeframe in QUICK_TIMEFRAMES:
+        clock.append(start_bound.strftime("%Y%m%d"))
+    if upcoming_after is not None:
+        clock.append(upcoming_after.strftime("%Y%m%dT%H%M"))
+
+    def build():
+        fields = _requested_fields()
+        limit = _page_size()
+        search_query = request.args.get("q", "").strip()
+        category = request.args.get("category", "all")
+
+        # start_time and id drive the keyset cursor, so fetch them even if not requested.
+        columns = [FIELDS[name] for name in fields] + [Event.start_time, Event.id]
+        statement = select(*columns).order_by(Event.start_time, Event.id).limit(limit + 1)
+        if category != "all":
+            statement = statement.where(Event.event_type == category)
+        if search_query:
+            statement = statement.where(search_clause(search_query))
+        if start_bound and end_bound:
+            statement = statement.where(Event.start_time >= start_bound, Event.start_time < end_bound)
+        if upcoming_after is not None:
+            statement = statement.where(Event.start_time >= upcoming_after)
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                statement = statement.where(after_cursor(Event.start_time, Event.id, cursor))
+            except ValueError as error:
+                raise APIError(str(error))
+
+        rows = db.session.execute(statement).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][-2], rows[-1][-1])
+        return _json_response(
+            {
+                "data": _serialize((row[:-2] for row in rows), fields),
+                "next_cursor": next_cursor,
+                "filters": {"q": search_query, "category": category, "timeframe": timeframe, "date": selected_date},
+            }
+        )
+
+    return _cached(build, clock="-".join(clock))
+
+
+@api_bp.route("/events/batch")
+def batch_events():
+    def build():
+        fields = _requested_fields()
+        raw_ids = request.args.get("ids", "")
+        try:
+            ids = list(dict.fromkeys(int(value) for value in raw_ids.split(",") if value.strip()))
+        except ValueError:
+            raise APIError("ids must be a comma-separated list of integers.")
+        if not ids:
+            raise APIError("Provide at least one id.")
+        if len(ids) > MAX_BATCH_IDS:
+            raise APIError(f"At most {MAX_BATCH_IDS} ids per request.")
+
+        rows = db.session.execute(select(*[FIELDS[name] for name in fields]).where(Event.id.in_(ids))).all()
+        by_id = {item["id"]: item for item in _serialize(rows, fields)}
+        return _json_response(
+            {
+                "data": [by_id[event_id] for event_id in ids if event_id in by_id],
+                "missing": [event_id for event_id in ids if event_id not in by_id],
+            }
+        )
+
+    return _cached(build)
+
+
+@api_bp.route("/events/<int:event_id>")
+def get_event(event_id: int):
+    def build():
+        fields = _requested_fields()
+        row = db.session.execute(select(*[FIELDS[name] for name in fields]).where(Event.id == event_id)).first()
+        if row is None:
+            abort(404)
+        return _json_response({"data": _serialize([row], fields)[0]})
+
+    return _cached(build)
+
+
+@api_bp.route("/changes")
+def list_changes():
+    token = current_app.config.get("CHANGE_FEED_TOKEN")
+    if not token:
+        abort(404)
+    supplied = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(supplied, f"Bearer {token}"):
+        raise APIError("A valid bearer token is required.", status=401)
+    try:
+        since = int(request.args.get("since", 0))
+        limit = min(max(int(request.args.get("limit", 500)), 1), MAX_CHANGE_BATCH)
+    except ValueError:
+        raise APIError("since and limit must be integers.")
+    batch = changes_since(since, limit)
+    return _json_response(
+        {
+            "changes": batch,
+            "next_since": batch[-1]["seq"] if batch else since,
+            "has_more": len(batch) == limit,
+        },
+        cache=False,
+    )
+
+
+@api_bp.errorhandler(404)
+def handle_not_found(error):
+    return _json_response({"error": "Not found."}, status=404, cache=False)
@@ -2,12 +2,14 @@ from flask import Blueprint, flash, redirect, render_template, request, url_for
 from flask_login import current_user, login_required, login_user, logout_user
 
 from . import db
+from .admission import admit
 from .models import User
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
 
 @auth_bp.route("/register", methods=["GET", "POST"])
+@admit("auth.register")
 def register():
     if current_user.is_authenticated:
         flash("You are already signed in.", "info")
@@ -47,6 +49,7 @@ def register():
 
 
 @auth_bp.route("/login", methods=["GET", "POST"])
+@admit("auth.login")
 def login():
     if current_user.is_authenticated:
         flash("You are already signed in.", "info")
@@ -80,8 +83,7 @@ def logout():
 @auth_bp.route("/account")
 @login_required
 def account():
-    registration_count = len(current_user.registrations)
-    return render_template("account.html", registration_count=registration_count)
+    return render_template("account.html")
 
 
 @auth_bp.route("/settings", methods=["GET", "POST"])
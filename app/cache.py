@@ -0,0 +1,136 @@
+"""Per-process caches invalidated by data versions shared across workers."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import event as sa_event, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import DataVersion, Event, EventInterest, EventSeries, Registration, SeriesExclusion
+
+
+CATALOG_VERSION = "catalog"
+FACETS_VERSION = "facets"
+VERSION_MAX_AGE = 1.0
+
+# Models whose writes invalidate each version. Seat counts, feeds and the conflict
+# index depend on registrations; facet counts only on the events themselves, so
+# booking a seat does not flush them.
+TRACKED_MODELS = {
+    CATALOG_VERSION: (Event, Registration, EventInterest, EventSeries, SeriesExclusion),
+    FACETS_VERSION: (Event, EventSeries, SeriesExclusion),
+}
+
+_known_versions: Dict[str, Tuple[int, float]] = {}
+_version_lock = threading.Lock()
+
+
+def ensure_data_version(*names: str) -> None:
+    """Create the version rows on first launch."""
+    created = False
+    for name in names or (CATALOG_VERSION,):
+        if db.session.get(DataVersion, name) is None:
+            db.session.add(DataVersion(name=name, version=0))
+            created = True
+    if created:
+        db.session.commit()
+
+
+def current_data_version(name: str = CATALOG_VERSION, max_age: float = VERSION_MAX_AGE) -> int:
+    """Return the named version, re-reading it at most once per ``max_age`` seconds."""
+    now = time.monotonic()
+    with _version_lock:
+        known = _known_versions.get(name)
+        if known is not None and now - known[1] < max_age:
+            return known[0]
+    version = db.session.execute(
+        select(DataVersion.version).where(DataVersion.name == name)
+    ).scalar() or 0
+    with _version_lock:
+        _known_versions[name] = (version, now)
+    return version
+
+
+def bump_data_version(name: str, connection=None) -> int:
+    """Increment the named version inside the current transaction and return the new value."""
+    connection = connection or db.session.connection()
+    result = connection.execute(
+        update(DataVersion).where(DataVersion.name == name).values(version=DataVersion.version + 1)
+    )
+    if not result.rowcount:
+        connection.execute(insert(DataVersion).values(name=name, version=1))
+    return connection.execute(select(DataVersion.version).where(DataVersion.name == name)).scalar()
+
+
+def _forget_known_versions() -> None:
+    with _version_lock:
+        _known_versions.clear()
+
+
+@sa_event.listens_for(Session, "after_flush")
+def _bump_on_catalog_write(session, flush_context):
+    bumped = session.info.setdefault("bumped_versions", set())
+    written = (*session.new, *session.deleted, *session.dirty)
+    for name, models in TRACKED_MODELS.items():
+        if name not in bumped and any(isinstance(obj, models) for obj in written):
+            bump_data_version(name, session.connection())
+            bumped.add(name)
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _after_catalog_commit(session):
+    if session.info.pop("bumped_versions", None):
+        _forget_known_versions()
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _after_catalog_rollback(session):
+    session.info.pop("bumped_versions", None)
+
+
+class VersionedCache:
+    """Small LRU whose entries are only valid for the data version they were computed at."""
+
+    def __init__(self, max_entries: int = 256, version_name: str = CATALOG_VERSION):
+        self.max_entries = max_entries
+        self.version_name = version_name
+        self._entries: OrderedDict = OrderedDict()
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default=None) -> Tuple[int, object]:
+        """Return ``(version, value)``; pass the version back to :meth:`set` after a miss."""
+        version = current_data_version(self.version_name)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            elif key in self._entries:
+                self._entries.move_to_end(key)
+                return version, self._entries[key]
+        return version, default
+
+    def set(self, key: Hashable, value, version: int) -> None:
+        """Store ``value`` unless the data changed while it was being computed."""
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = value
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable):
+        missing = object()
+        version, value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.set(key, value, version)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._version = None
@@ -0,0 +1,160 @@
+"""Incremental change feed so downstream systems sync in O(changes) instead of re-exporting tables."""
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, event as sa_event, func, select
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import ChangeLogEntry, Event, EventInterest, EventSeries, Registration, SeriesExclusion
+
+
+ENTITY_NAMES = {
+    Event: "event",
+    Registration: "registration",
+    EventInterest: "interest",
+    EventSeries: "series",
+    SeriesExclusion: "series_exclusion",
+}
+# Large text bodies are left out; consumers fetch them from the API when needed.
+OMITTED_COLUMNS = {Event: {"description"}, EventSeries: {"description"}}
+
+changes_cli = AppGroup("changes", help="Read and compact the change feed.")
+
+
+def _snapshot(obj) -> dict:
+    omitted = OMITTED_COLUMNS.get(type(obj), set())
+    snapshot = {}
+    for column in obj.__table__.columns:
+        if column.name in omitted:
+            continue
+        value = getattr(obj, column.key)
+        snapshot[column.name] = value.isoformat() if isinstance(value, datetime) else value
+    return snapshot
+
+
+def record_change(obj, action: str) -> ChangeLogEntry:
+    """Append a change for ``obj`` to the current transaction. The caller commits."""
+    if obj.id is None:
+        db.session.flush()
+    if action == "delete":
+        db.session.info.setdefault("recorded_deletes", set()).add((type(obj), obj.id))
+    payload = {"id": obj.id} if action == "delete" else _snapshot(obj)
+    entry = ChangeLogEntry(
+        entity=ENTITY_NAMES[type(obj)],
+        entity_id=obj.id,
+        action=action,
+        payload=json.dumps(payload),
+    )
+    db.session.add(entry)
+    return entry
+
+
+@sa_event.listens_for(Session, "before_flush")
+def _record_cascaded_deletes(session, flush_context, instances) -> None:
+    """Log deletes nobody recorded explicitly, in the same transaction.
+
+    Deleting an event, series or user cascades to its registrations, interests,
+    occurrences and exclusions. Those rows reach ``session.deleted`` without
+    passing through a view that calls :func:`record_change`.
+    """
+    recorded = session.info.get("recorded_deletes", set())
+    for obj in list(session.deleted):
+        if type(obj) in ENTITY_NAMES and (type(obj), obj.id) not in recorded:
+            record_change(obj, "delete")
+
+
+@sa_event.listens_for(Session, "after_commit")
+@sa_event.listens_for(Session, "after_rollback")
+def _forget_recorded_deletes(session) -> None:
+    session.info.pop("recorded_deletes", None)
+
+
+def record_raw_change(entity: str, entity_id: int, action: str, payload: dict) -> None:
+    """Append a change for a write made with a Core statement rather than an ORM object."""
+    db.session.add(ChangeLogEntry(entity=entity, entity_id=entity_id, action=action, payload=json.dumps(payload)))
+
+
+def changes_since(since: int, limit: int = 500) -> List[dict]:
+    rows = db.session.execute(
+        select(
+            ChangeLogEntry.seq,
+            ChangeLogEntry.entity,
+            ChangeLogEntry.entity_id,
+            ChangeLogEntry.action,
+            ChangeLogEntry.payload,
+            ChangeLogEntry.created_at,
+        )
+        .where(ChangeLogEntry.seq > since)
+        .order_by(ChangeLogEntry.seq)
+        .limit(limit)
+    )
+    return [
+        {
+            "seq": seq,
+            "entity": entity,
+            "entity_id": entity_id,
+            "action": action,
+            "data": json.loads(payload),
+            "created_at": created_at.isoformat(),
+        }
+        for seq, entity, entity_id, action, payload, created_at in rows
+    ]
+
+
+def compact(older_than: timedelta) -> int:
+    """Keep only the latest entry per entity among entries older than ``older_than``.
+
+    A consumer that fell behind the window still converges to the current
+    state; it just skips intermediate versions of the same row.
+    """
+    cutoff_time = datetime.utcnow() - older_than
+    cutoff_seq: Optional[int] = db.session.query(func.max(ChangeLogEntry.seq)).filter(
+        ChangeLogEntry.created_at < cutoff_time
+    ).scalar()
+    if cutoff_seq is None:
+        return 0
+    latest = (
+        select(func.max(ChangeLogEntry.seq))
+        .where(ChangeLogEntry.seq <= cutoff_seq)
+        .group_by(ChangeLogEntry.entity, ChangeLogEntry.entity_id)
+    )
+    result = db.session.execute(
+        delete(ChangeLogEntry).where(ChangeLogEntry.seq <= cutoff_seq, ChangeLogEntry.seq.not_in(latest))
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+@changes_cli.command("stream")
+@click.option("--since", default=0, show_default=True, help="Last sequence number already consumed.")
+@click.option("--batch-size", default=500, show_default=True)
+@click.option("--follow", is_flag=True, help="Keep polling for new changes.")
+@click.option("--interval", default=2.0, show_default=True, help="Polling interval with --follow.")
+def stream_command(since, batch_size, follow, interval):
+    """Print changes after --since as JSON lines."""
+    while True:
+        batch = changes_since(since, batch_size)
+        for change in batch:
+            click.echo(json.dumps(change, separators=(",", ":")))
+        if batch:
+            since = batch[-1]["seq"]
+        db.session.rollback()
+        if len(batch) < batch_size:
+            if not follow:
+                return
+            time.sleep(interval)
+
+
+@changes_cli.command("compact")
+@click.option("--keep-days", default=30, show_default=True, help="Leave every entry from the last N days intact.")
+def compact_command(keep_days):
+    """Collapse old entries to the latest change per entity."""
+    removed = compact(timedelta(days=keep_days))
+    click.echo(f"Removed {removed} superseded change(s).")
@@ -0,0 +1,139 @@
+"""Door check-in keyed by student UID, built for hundreds of scans per minute."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import case, func, select, update
+
+from . import db
+from .cache import CATALOG_VERSION, bump_data_version
+from .changes import record_raw_change
+from .models import Registration
+from .summaries import record_check_ins
+
+
+MAX_BULK_SCANS = 500
+
+_registration = Registration.__table__
+
+
+def check_in(event_id: int, student_uid: str, scanned_at: datetime = None) -> Tuple[str, dict]:
+    """Check one attendee in with a single indexed UPDATE. The caller commits.
+
+    Returns ``(status, attendee)`` where status is ``checked_in``,
+    ``already_checked_in`` or ``not_found``.
+    """
+    scanned_at = scanned_at or datetime.utcnow()
+    row = db.session.execute(
+        update(_registration)
+        .where(
+            _registration.c.event_id == event_id,
+            _registration.c.student_uid == student_uid,
+            _registration.c.checked_in_at.is_(None),
+        )
+        .values(checked_in_at=scanned_at)
+        .returning(_registration.c.id, _registration.c.attendee_name)
+    ).first()
+    if row is not None:
+        record_raw_change("registration", row.id, "check_in", {"id": row.id, "checked_in_at": scanned_at.isoformat()})
+        record_check_ins(event_id)
+        bump_data_version(CATALOG_VERSION)
+        return "checked_in", {"name": row.attendee_name, "checked_in_at": scanned_at.isoformat()}
+
+    # Only failed scans pay for a second lookup to tell duplicates from unknown UIDs.
+    existing = db.session.execute(
+        select(_registration.c.attendee_name, _registration.c.checked_in_at).where(
+            _registration.c.event_id == event_id, _registration.c.student_uid == student_uid
+        )
+    ).first()
+    if existing is None:
+        return "not_found", {}
+    return "already_checked_in", {"name": existing.attendee_name, "checked_in_at": existing.checked_in_at.isoformat()}
+
+
+def bulk_check_in(event_id: int, scans: Iterable[Tuple[str, datetime]]) -> List[dict]:
+    """Apply a batch of offline scans with one conditional UPDATE. The caller commits.
+
+    Only rows still unchecked are written, and only the rows the UPDATE returns
+    count as new check-ins, so a kiosk resending a batch whose response it lost
+    changes nothing the second time.
+    """
+    first_scan = {}
+    for student_uid, scanned_at in scans:
+        if student_uid not in first_scan or scanned_at < first_scan[student_uid]:
+            first_scan[student_uid] = scanned_at
+    if not first_scan:
+        return []
+
+    updated = db.session.execute(
+        update(_registration)
+        .where(
+            _registration.c.event_id == event_id,
+            _registration.c.student_uid.in_(list(first_scan)),
+            _registration.c.checked_in_at.is_(None),
+        )
+        .values(checked_in_at=case(first_scan, value=_registration.c.student_uid))
+        .returning(_registration.c.id, _registration.c.student_uid, _registration.c.checked_in_at)
+    ).all()
+    for row in updated:
+        record_raw_change("registration", row.id, "check_in", {"id": row.id, "checked_in_at": row.checked_in_at.isoformat()})
+    checked_in = {row.student_uid: row.checked_in_at for row in updated}
+
+    # Only scans the UPDATE skipped pay for a lookup to tell duplicates from unknown UIDs.
+    skipped = [student_uid for student_uid in first_scan if student_uid not in checked_in]
+    existing = {}
+    if skipped:
+        existing = dict(
+            db.session.execute(
+                select(_registration.c.student_uid, _registration.c.checked_in_at).where(
+                    _registration.c.event_id == event_id, _registration.c.student_uid.in_(skipped)
+                )
+            ).all()
+        )
+
+    results = []
+    for student_uid in first_scan:
+        if student_uid in checked_in:
+            status, moment = "checked_in", checked_in[student_uid]
+        elif student_uid in existing:
+            status, moment = "already_checked_in", existing[student_uid]
+        else:
+            results.append({"student_uid": student_uid, "status": "not_found"})
+            continue
+        results.append({"student_uid": student_uid, "status": status, "checked_in_at": moment.isoformat()})
+    if updated:
+        record_check_ins(event_id, len(updated))
+        bump_data_version(CATALOG_VERSION)
+    return results
+
+
+def check_in_counts(event_id: int = None) -> Tuple[int, int]:
+    """Return ``(registered, checked_in)`` from one aggregate query."""
+    query = db.session.query(func.count(Registration.id), func.count(Registration.checked_in_at))
+    if event_id is not None:
+        query = query.filter(Registration.event_id == event_id)
+    registered, checked_in = query.one()
+    return registered, checked_in
+
+
+def roster(event_id: int) -> List[dict]:
+    rows = db.session.execute(
+        select(
+            _registration.c.student_uid,
+            _registration.c.attendee_name,
+            _registration.c.department,
+            _registration.c.checked_in_at,
+        )
+        .where(_registration.c.event_id == event_id, _registration.c.student_uid.is_not(None))
+        .order_by(_registration.c.attendee_name)
+    )
+    return [
+        {
+            "uid": row.student_uid,
+            "name": row.attendee_name,
+            "department": row.department,
+            "checked_in_at": row.checked_in_at.isoformat() if row.checked_in_at else None,
+        }
+        for row in rows
+    ]
@@ -0,0 +1,172 @@
+"""Negotiated gzip/brotli compression for HTML, JSON and other text responses."""
+from __future__ import annotations
+
+import threading
+import time
+import zlib
+from typing import Dict, Iterable, Iterator, Optional
+
+from flask import Flask, Response, current_app, request
+from werkzeug.wsgi import ClosingIterator
+
+try:  # brotli is optional; without it only gzip is offered.
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+    "text/calendar",
+    "text/css",
+    "text/csv",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+}
+# Preferred first when the client rates several encodings equally.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+class CompressionStats:
+    """Per-endpoint byte counts and compression CPU time for this worker."""
+
+    def __init__(self):
+        self._routes: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, encoding: str, raw: int, sent: int, cpu: float) -> None:
+        with self._lock:
+            route = self._routes.setdefault(
+                endpoint, {"responses": 0, "raw_bytes": 0, "sent_bytes": 0, "cpu_seconds": 0.0}
+            )
+            route["responses"] += 1
+            route["raw_bytes"] += raw
+            route["sent_bytes"] += sent
+            route["cpu_seconds"] += cpu
+            route[encoding] = route.get(encoding, 0) + 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            routes = {endpoint: dict(route) for endpoint, route in self._routes.items()}
+        for route in routes.values():
+            route["ratio"] = round(route["sent_bytes"] / route["raw_bytes"], 3) if route["raw_bytes"] else None
+            route["cpu_ms_per_response"] = round(route["cpu_seconds"] * 1000 / route["responses"], 3)
+            route["cpu_seconds"] = round(route["cpu_seconds"], 4)
+        return routes
+
+
+def compression_stats() -> CompressionStats:
+    return current_app.extensions["compression"]
+
+
+def negotiate_encoding() -> Optional[str]:
+    """The best encoding the client accepts, honouring q-values (``gzip;q=0`` refuses gzip)."""
+    accepted = request.accept_encodings
+    best = max(ENCODINGS, key=lambda encoding: accepted.quality(encoding))
+    return best if accepted.quality(best) > 0 else None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, config):
+        if encoding == "br":
+            self._engine = brotli.Compressor(quality=config["COMPRESSION_BROTLI_QUALITY"])
+        else:
+            # wbits 16+ writes the gzip header and trailer around the deflate stream.
+            self._engine = zlib.compressobj(config["COMPRESSION_GZIP_LEVEL"], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self.encoding = encoding
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._engine.process(data)
+        return self._engine.compress(data)
+
+    def flush(self) -> bytes:
+        """Emit everything buffered so far as a decodable block, keeping the stream open."""
+        if self.encoding == "br":
+            return self._engine.flush()
+        return self._engine.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._engine.finish()
+        return self._engine.flush(zlib.Z_FINISH)
+
+
+def _compress_stream(chunks: Iterable, compressor: _Compressor, stats: CompressionStats, endpoint: str) -> Iterator[bytes]:
+    """Compress a streamed body piece by piece, flushing after each so nothing waits on the next chunk."""
+    raw = sent = 0
+    cpu = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if not chunk:
+                continue
+            started = time.thread_time()
+            block = compressor.compress(chunk) + compressor.flush()
+            cpu += time.thread_time() - started
+            raw += len(chunk)
+            sent += len(block)
+            yield block
+        started = time.thread_time()
+        tail = compressor.finish()
+        cpu += time.thread_time() - started
+        sent += len(tail)
+        yield tail
+    finally:
+        stats.record(endpoint, compressor.encoding, raw, sent, cpu)
+
+
+def compress_response(response: Response) -> Response:
+    if (
+        not current_app.config["COMPRESSION_ENABLED"]
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or request.method == "HEAD"
+        or response.mimetype not in COMPRESSIBLE_TYPES
+        or "Content-Encoding" in response.headers
+        or "no-transform" in response.headers.get("Cache-Control", "")
+        # send_file() bodies (static assets) are left to the front web server.
+        or response.direct_passthrough
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+    if not response.is_streamed and response.content_length is not None:
+        if response.content_length < current_app.config["COMPRESSION_MIN_BYTES"]:
+            return response
+
+    compressor = _Compressor(encoding, current_app.config)
+    stats = compression_stats()
+    endpoint = request.endpoint or "unknown"
+    if response.is_streamed:
+        body = response.response
+        # Close the original body too, even if the client goes away before the first chunk.
+        response.response = ClosingIterator(
+            _compress_stream(body, compressor, stats, endpoint), getattr(body, "close", None)
+        )
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        started = time.thread_time()
+        compressed = compressor.compress(body) + compressor.finish()
+        stats.record(endpoint, encoding, len(body), len(compressed), time.thread_time() - started)
+        response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+
+    # The compressed bytes differ from the identity ones, so a strong validator no longer applies.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    app.extensions["compression"] = CompressionStats()
+    app.after_request(compress_response)
@@ -0,0 +1,234 @@
+"""Interval indexes for venue double-booking and attendee schedule conflicts."""
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+
+from . import db
+from .cache import VersionedCache
+from .models import Event, EventSeries, Registration, User
+from .recurrence import Occurrence, default_window, occurrence_starts, occurrences_between
+
+
+Interval = Tuple[datetime, datetime, int]
+
+_index_cache = VersionedCache(max_entries=1024)
+
+
+class IntervalIndex:
+    """Half-open ``[start, end)`` intervals sorted by start time.
+
+    Remembering the longest interval bounds how far left of the query start an
+    overlapping interval can begin, so a lookup is two bisects plus a scan of
+    the candidates inside that window instead of the whole schedule.
+    """
+
+    def __init__(self, intervals: Iterable[Interval]):
+        self._items: List[Interval] = sorted(intervals)
+        self._starts = [item[0] for item in self._items]
+        self._longest = max((end - start for start, end, _ in self._items), default=timedelta(0))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def extended(self, intervals: Iterable[Interval]) -> "IntervalIndex":
+        """A new index holding these intervals as well."""
+        return IntervalIndex([*self._items, *intervals])
+
+    def overlapping(self, start: datetime, end: datetime, exclude: Optional[int] = None) -> List[int]:
+        """Ids of intervals overlapping ``[start, end)``, in start order."""
+        low = bisect_right(self._starts, start - self._longest)
+        high = bisect_left(self._starts, end)
+        return [
+            item_id for item_start, item_end, item_id in self._items[low:high]
+            if item_end > start and item_id != exclude
+        ]
+
+    def overlapping_pairs(self) -> List[Tuple[int, int]]:
+        """Every overlapping pair, found with one sweep over the sorted starts."""
+        pairs = []
+        active: List[Tuple[datetime, int]] = []
+        for start, end, item_id in self._items:
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            pairs.extend((other_id, item_id) for _, other_id in active)
+            heapq.heappush(active, (end, item_id))
+        return pairs
+
+
+def venue_key(location: str) -> str:
+    return " ".join((location or "").lower().split())
+
+
+def _venue_indexes() -> Dict[str, IntervalIndex]:
+    def build():
+        grouped = defaultdict(list)
+        rows = db.session.query(Event.id, Event.location, Event.start_time, Event.end_time)
+        for event_id, location, start, end in rows:
+            grouped[venue_key(location)].append((start, end, event_id))
+        return {key: IntervalIndex(intervals) for key, intervals in grouped.items()}
+
+    return _index_cache.get_or_compute("venues", build)
+
+
+def _user_index(user_id: int) -> IntervalIndex:
+    def build():
+        rows = (
+            db.session.query(Event.start_time, Event.end_time, Event.id)
+            .join(Registration, Registration.event_id == Event.id)
+            .filter(Registration.user_id == user_id)
+        )
+        return IntervalIndex(tuple(row) for row in rows)
+
+    return _index_cache.get_or_compute(("user", user_id), build)
+
+
+def _load_events(event_ids: Iterable[int]) -> Dict[int, Event]:
+    event_ids = set(event_ids)
+    if not event_ids:
+        return {}
+    return {event.id: event for event in Event.query.filter(Event.id.in_(event_ids))}
+
+
+def _occurrences_at(key: str, start: datetime, end: datetime, exclude_series_id: Optional[int] = None) -> List[Occurrence]:
+    """Virtual occurrences of other series at the venue that overlap ``[start, end)``.
+
+    Materialized occurrences are Event rows and already sit in the venue index.
+    """
+    series_ids = {}
+    for series_id, location, series_start, series_end in db.session.query(
+        EventSeries.id, EventSeries.location, EventSeries.start_time, EventSeries.end_time
+    ).filter(EventSeries.start_time < end):
+        if venue_key(location) == key and series_id != exclude_series_id:
+            series_ids[series_id] = series_end - series_start
+    if not series_ids:
+        return []
+    # Widen the window by the longest duration so dates that began earlier are seen too.
+    occurrences = occurrences_between(start - max(series_ids.values()), end)
+    return [
+        occurrence for occurrence in occurrences
+        if occurrence.series_id in series_ids and occurrence.end_time > start
+    ]
+
+
+def venue_conflicts(
+    location: str,
+    start: datetime,
+    end: datetime,
+    exclude_event_id: Optional[int] = None,
+    exclude_series_id: Optional[int] = None,
+) -> list:
+    """Events and series occurrences already booked at ``location`` that overlap ``[start, end)``."""
+    key = venue_key(location)
+    clashes: list = []
+    index = _venue_indexes().get(key)
+    if index is not None:
+        ids = index.overlapping(start, end, exclude=exclude_event_id)
+        events = _load_events(ids)
+        clashes = [events[event_id] for event_id in ids if event_id in events]
+    if exclude_series_id is not None:
+        clashes = [clash for clash in clashes if clash.series_id != exclude_series_id]
+    clashes.extend(_occurrences_at(key, start, end, exclude_series_id))
+    return sorted(clashes, key=lambda clash: clash.start_time)
+
+
+def series_venue_conflicts(series: EventSeries) -> list:
+    """Clashes for every date the series expands to, up to ``until`` or ``SERIES_HORIZON_DAYS`` ahead.
+
+    The venue's events and other series' dates are indexed once and each date
+    is then a lookup, rather than a query per date.
+    """
+    key = venue_key(series.location)
+    window_end = series.start_time + timedelta(days=current_app.config["SERIES_HORIZON_DAYS"])
+    index = _venue_indexes().get(key, IntervalIndex(()))
+    occurrences = _occurrences_at(key, series.start_time, window_end, exclude_series_id=series.id)
+    virtual = {-position: occurrence for position, occurrence in enumerate(occurrences, start=1)}
+    index = index.extended((occurrence.start_time, occurrence.end_time, item_id) for item_id, occurrence in virtual.items())
+
+    clash_ids = []
+    for start in occurrence_starts(series, series.start_time, window_end):
+        clash_ids.extend(index.overlapping(start, start + series.duration))
+    events = _load_events(item_id for item_id in clash_ids if item_id > 0)
+    events.update(virtual)
+    clashes = {}
+    for item_id in clash_ids:
+        clash = events.get(item_id)
+        if clash is not None and (item_id < 0 or clash.series_id != series.id):
+            clashes[item_id] = clash
+    return sorted(clashes.values(), key=lambda clash: clash.start_time)
+
+
+def schedule_conflicts(user_id: int, start: datetime, end: datetime, exclude_event_id: Optional[int] = None) -> List[Event]:
+    """Events ``user_id`` is registered for that overlap ``[start, end)``."""
+    ids = _user_index(user_id).overlapping(start, end, exclude=exclude_event_id)
+    events = _load_events(ids)
+    return [events[event_id] for event_id in ids if event_id in events]
+
+
+def conflict_report(event_type: Optional[str] = None) -> dict:
+    """Venue double-bookings and attendees booked into overlapping events.
+
+    With ``event_type`` set, only conflicts involving at least one event of
+    that category are reported.
+    """
+    # Series dates nobody has booked yet have no row; index the upcoming ones
+    # under negative ids so they pair with events and with each other.
+    virtual = {
+        -position: occurrence
+        for position, occurrence in enumerate(occurrences_between(*default_window(datetime.utcnow())), start=1)
+    }
+    indexes = dict(_venue_indexes())
+    extra = defaultdict(list)
+    for item_id, occurrence in virtual.items():
+        extra[venue_key(occurrence.location)].append((occurrence.start_time, occurrence.end_time, item_id))
+    for key, intervals in extra.items():
+        indexes[key] = indexes[key].extended(intervals) if key in indexes else IntervalIndex(intervals)
+    venue_pairs = [pair for index in indexes.values() for pair in index.overlapping_pairs()]
+
+    by_user = defaultdict(list)
+    rows = (
+        db.session.query(Registration.user_id, Event.start_time, Event.end_time, Event.id)
+        .join(Event, Registration.event_id == Event.id)
+    )
+    for user_id, start, end, event_id in rows:
+        by_user[user_id].append((start, end, event_id))
+    attendee_pairs = [
+        (user_id, first, second)
+        for user_id, intervals in by_user.items()
+        if len(intervals) > 1
+        for first, second in IntervalIndex(intervals).overlapping_pairs()
+    ]
+
+    events = _load_events(
+        [event_id for pair in venue_pairs for event_id in pair if event_id > 0]
+        + [event_id for _, first, second in attendee_pairs for event_id in (first, second)]
+    )
+    events.update(virtual)
+
+    def in_scope(*event_ids):
+        return event_type is None or any(events[event_id].event_type == event_type for event_id in event_ids)
+
+    venues = [
+        {"location": events[first].location, "first": events[first], "second": events[second]}
+        for first, second in venue_pairs
+        if in_scope(first, second)
+    ]
+    attendee_pairs = [pair for pair in attendee_pairs if in_scope(pair[1], pair[2])]
+    users = {}
+    user_ids = {user_id for user_id, _, _ in attendee_pairs}
+    if user_ids:
+        users = {user.id: user for user in User.query.filter(User.id.in_(user_ids))}
+    attendees = [
+        {"user": users[user_id], "first": events[first], "second": events[second]}
+        for user_id, first, second in attendee_pairs
+    ]
+
+    def by_start(conflict):
+        return conflict["first"].start_time, conflict["second"].start_time
+
+    return {"venues": sorted(venues, key=by_start), "attendees": sorted(attendees, key=by_start)}
@@ -1,11 +1,29 @@
+import heapq
 from datetime import datetime, timedelta
+from typing import Optional
 
-from sqlalchemy import func, or_
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, Response, abort, current_app, flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager
 
 from . import db
-from .models import Event, EventInterest, Registration
+from .admission import admit
+from .changes import record_change
+from .conflicts import schedule_conflicts
+from .facets import facet_counts, search_clause
+from .jobs import enqueue
+from .cache import current_data_version
+from .live import StreamLimitReached, seat_counts, seat_publisher, stream_seats
+from .ical import catalog_rows, feed_response, user_rows
+from .idempotency import idempotent
+from .models import Event, EventInterest, Registration, User, WaitlistEntry
+from .pagination import after_cursor, encode_cursor
+from .recommendations import recommended_for
+from .recurrence import default_window, find_occurrence, materialize, merge_by_start, occurrences_between
+from .streaming import stream_events, stream_page
+from .typeahead import suggest_index
+from .waitlist import join_waitlist, leave_waitlist, promote_waitlist, queue_position, waitlist_entry, waitlist_size
 
 
 events_bp = Blueprint("events", __name__, url_prefix="/events")
@@ -18,106 +36,58 @@ TEAM_OPTIONS = [
     "Open Team",
 ]
 
+QUICK_TIMEFRAMES = ("today", "this-week", "this-month")
+MY_REGISTRATIONS_PAGE_SIZE = 10
+
 
 @events_bp.route("/")
 def home():
     now = datetime.utcnow()
     base_upcoming_query = Event.query.filter(Event.start_time >= now).order_by(Event.start_time)
 
-    event_types = [row[0] for row in Event.query.with_entities(Event.event_type).distinct().order_by(Event.event_type).all()]
     search_query = request.args.get("q", "").strip()
     selected_category = request.args.get("category", "all")
     timeframe, selected_date, start_bound, end_bound = _resolve_timeframe(now)
+    facets = facet_counts(
+        search_query,
+        _facet_windows(now, timeframe, start_bound, end_bound),
+        selected_category,
+        timeframe,
+        upcoming_after=now,
+    )
 
     filtered_query = base_upcoming_query
     if selected_category != "all":
         filtered_query = filtered_query.filter(Event.event_type == selected_category)
     if search_query:
-        pattern = f"%{search_query}%"
-        filtered_query = filtered_query.filter(
-            or_(
-                Event.title.ilike(pattern),
-                Event.summary.ilike(pattern),
-                Event.location.ilike(pattern),
-            )
-        )
+        filtered_query = filtered_query.filter(search_clause(search_query))
     if start_bound and end_bound:
         filtered_query = filtered_query.filter(Event.start_time >= start_bound, Event.start_time < end_bound)
 
-    filtered_count = filtered_query.count()
-    upcoming_events = filtered_query.limit(6).all()
+    series_start, series_end = default_window(now, start_bound, end_bound, upcoming_after=now)
+    occurrences = occurrences_between(
+        series_start,
+        series_end,
+        category=None if selected_category == "all" else selected_category,
+        search_query=search_query,
+    )
+    filtered_count = filtered_query.count() + len(occurrences)
+    upcoming_events = merge_by_start(filtered_query.limit(6).all(), occurrences, limit=6)
     interested_event_ids = set()
+    recommended_events = []
     if current_user.is_authenticated:
         interested_event_ids = {
             row[0]
             for row in EventInterest.query.with_entities(EventInterest.event_id).filter_by(user_id=current_user.id)
         }
-
-    total_events = Event.query.count()
-    upcoming_count = base_upcoming_query.count()
-    total_registrations = Registration.query.count()
-    total_capacity = db.session.query(func.sum(Event.capacity)).scalar() or 0
-    available_capacity = max(total_capacity - total_registrations, 0)
-    capacity_percent = (total_registrations / total_capacity * 100) if total_capacity else 0
-
-    next_event = upcoming_events[0] if upcoming_events else Event.query.order_by(Event.start_time).first()
-    days_to_next_event = None
-    if next_event:
-        days_to_next_event = max((next_event.start_time.date() - now.date()).days, 0)
-
-    projected_revenue = total_registrations * 85
-    projected_checked_in = int(round(total_registrations * 0.6))
-    projected_pending = max(total_registrations - projected_checked_in, 0)
-
-    trend_points = []
-    max_count = 0
-    for offset in range(6, -1, -1):
-        day_start = (now - timedelta(days=offset)).replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
-        count = Registration.query.filter(Registration.created_at >= day_start, Registration.created_at < day_end).count()
-        label = day_start.strftime("%b %d")
-        trend_points.append({"label": label, "count": count})
-        if count > max_count:
-            max_count = count
-
-    height_base = max(max_count, 1)
-    for point in trend_points:
-        point["height"] = round((point["count"] / height_base) * 100)
-
-    recent_registrations = (
-        Registration.query.order_by(Registration.created_at.desc()).limit(4).all()
-    )
-
-    location_candidates = Event.query.order_by(Event.start_time).limit(6).all()
-    active_locations = []
-    for candidate in location_candidates:
-        if candidate.location not in active_locations:
-            active_locations.append(candidate.location)
-        if len(active_locations) == 3:
-            break
-
-    analytics = {
-        "total_events": total_events,
-        "upcoming_count": upcoming_count,
-        "total_registrations": total_registrations,
-        "total_capacity": total_capacity,
-        "available_capacity": available_capacity,
-        "capacity_percent": capacity_percent,
-        "projected_revenue": projected_revenue,
-        "projected_checked_in": projected_checked_in,
-        "projected_pending": projected_pending,
-        "days_to_next_event": days_to_next_event,
-        "next_event": next_event,
-        "trend": trend_points,
-        "recent_registrations": recent_registrations,
-        "active_locations": active_locations,
-    }
+        recommended_events = recommended_for(current_user.id, limit=3)
 
     return render_template(
         "home.html",
         upcoming_events=upcoming_events,
-        analytics=analytics,
-        event_types=event_types,
+        recommended_events=recommended_events,
+        event_types=list(facets["categories"]),
+        facets=facets,
         search_query=search_query,
         selected_category=selected_category,
         filtered_count=filtered_count,
@@ -138,126 +108,232 @@ def events_list():
     if selected_category != "all":
         events_query = events_query.filter(Event.event_type == selected_category)
     if search_query:
-        pattern = f"%{search_query}%"
-        events_query = events_query.filter(
-            or_(
-                Event.title.ilike(pattern),
-                Event.summary.ilike(pattern),
-                Event.location.ilike(pattern),
-            )
-        )
+        events_query = events_query.filter(search_clause(search_query))
     if start_bound and end_bound:
         events_query = events_query.filter(Event.start_time >= start_bound, Event.start_time < end_bound)
 
-    events = events_query.all()
+    series_start, series_end = default_window(now, start_bound, end_bound)
+    occurrences = occurrences_between(
+        series_start,
+        series_end,
+        category=None if selected_category == "all" else selected_category,
+        search_query=search_query,
+    )
+    total_results = events_query.order_by(None).count() + len(occurrences)
+    # Rows are fetched while the page streams; occurrences are already in memory and merge in by start.
+    events = heapq.merge(stream_events(events_query), occurrences, key=lambda event: event.start_time)
     interested_event_ids = set()
     if current_user.is_authenticated:
         interested_event_ids = {
             row[0]
             for row in EventInterest.query.with_entities(EventInterest.event_id).filter_by(user_id=current_user.id)
         }
-    event_types = [row[0] for row in Event.query.with_entities(Event.event_type).distinct().order_by(Event.event_type).all()]
+    facets = facet_counts(
+        search_query,
+        _facet_windows(now, timeframe, start_bound, end_bound),
+        selected_category,
+        timeframe,
+    )
 
-    return render_template(
+    return stream_page(
         "events.html",
         events=events,
-        event_types=event_types,
+        event_types=list(facets["categories"]),
+        facets=facets,
         search_query=search_query,
         selected_category=selected_category,
-        total_results=len(events),
+        total_results=total_results,
         timeframe=timeframe,
         selected_date=selected_date,
         interested_event_ids=interested_event_ids,
     )
 
 
+@events_bp.route("/events/suggest")
+def suggest():
+    query = request.args.get("q", "").strip()
+    suggest_index.ensure_current()
+    suggestions = []
+    for match in suggest_index.suggest(query):
+        if match["kind"] == "event":
+            url = url_for("events.event_detail", event_id=match["event_id"])
+        elif match["kind"] == "category":
+            url = url_for("events.events_list", category=match["label"])
+        else:
+            url = url_for("events.events_list", q=match["label"])
+        suggestions.append({"label": match["label"], "kind": match["kind"], "url": url})
+    response = jsonify({"query": query, "suggestions": suggestions})
+    response.headers["Cache-Control"] = "public, max-age=10"
+    return response
+
+
 @events_bp.route("/events/<int:event_id>")
 def event_detail(event_id: int):
     event = Event.query.get_or_404(event_id)
     is_registered = False
     interest_record = None
+    waitlist_position = None
     if current_user.is_authenticated:
         is_registered = (
             Registration.query.filter_by(user_id=current_user.id, event_id=event.id).first()
             is not None
         )
         interest_record = EventInterest.query.filter_by(user_id=current_user.id, event_id=event.id).first()
+        if not is_registered:
+            queued = waitlist_entry(current_user.id, event.id)
+            waitlist_position = queue_position(queued) if queued else None
 
     return render_template(
         "event_detail.html",
         event=event,
+        live_seats=event.start_time > datetime.utcnow(),
         is_registered=is_registered,
+        waitlist_position=waitlist_position,
+        waitlist_size=waitlist_size(event.id),
         is_interested=interest_record is not None,
         interest_note=interest_record.note if interest_record and interest_record.note else "",
         team_options=TEAM_OPTIONS,
     )
 
 
+@events_bp.route("/series/<int:series_id>/<stamp>")
+def series_occurrence(series_id: int, stamp: str):
+    occurrence = find_occurrence(series_id, stamp)
+    if occurrence is None:
+        abort(404)
+    if occurrence.id is not None:
+        return redirect(url_for("events.event_detail", event_id=occurrence.id))
+    return render_template(
+        "event_detail.html",
+        event=occurrence,
+        live_seats=False,
+        is_registered=False,
+        waitlist_position=None,
+        waitlist_size=0,
+        is_interested=False,
+        interest_note="",
+        team_options=TEAM_OPTIONS,
+    )
+
+
+@events_bp.route("/series/<int:series_id>/<stamp>/register", methods=["POST"])
+@admit("events.register")
+@idempotent
+@login_required
+def register_for_occurrence(series_id: int, stamp: str):
+    occurrence = find_occurrence(series_id, stamp)
+    if occurrence is None:
+        abort(404)
+    if occurrence.id is None:
+        form = _registration_form_data(request)
+        if form["errors"]:
+            for error in form["errors"]:
+                flash(error, "danger")
+            return redirect(url_for("events.series_occurrence", series_id=series_id, stamp=stamp))
+        try:
+            occurrence = materialize(occurrence)
+            db.session.flush()
+        except IntegrityError:
+            # Someone else registered for this date first and created its row.
+            db.session.rollback()
+            occurrence = find_occurrence(series_id, stamp)
+    return register_for_event(occurrence.id)
+
+
+@events_bp.route("/events/<int:event_id>/seats/stream")
+def seat_stream(event_id: int):
+    snapshot = seat_counts([event_id]).get(event_id)
+    if snapshot is None:
+        abort(404)
+    try:
+        subscription = seat_publisher.subscribe(current_app._get_current_object(), event_id, snapshot)
+    except StreamLimitReached:
+        return Response("Too many live seat streams, retry shortly.", status=503, headers={"Retry-After": "30"})
+    finally:
+        db.session.remove()
+
+    heartbeat = current_app.config["LIVE_SEATS_HEARTBEAT"]
+    return Response(
+        stream_seats(subscription, snapshot, heartbeat),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@events_bp.route("/events/<int:event_id>/seats")
+def seat_snapshot(event_id: int):
+    """Seat counts for pages that could not open a stream; revalidated against the data version."""
+    etag = f"seats-{event_id}-{current_data_version()}"
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        snapshot = seat_counts([event_id]).get(event_id)
+        if snapshot is None:
+            abort(404)
+        response = jsonify(snapshot)
+    response.headers["Cache-Control"] = "no-cache"
+    response.set_etag(etag)
+    return response
+
+
 @events_bp.route("/events/<int:event_id>/register", methods=["POST"])
+@admit("events.register")
+@idempotent
 @login_required
 def register_for_event(event_id: int):
     event = Event.query.get_or_404(event_id)
 
-    if not event.has_space():
-        flash("This event is already full.", "warning")
-        return redirect(url_for("events.event_detail", event_id=event.id))
-
     already_registered = Registration.query.filter_by(user_id=current_user.id, event_id=event.id).first()
     if already_registered:
         flash("You are already registered for this event.", "info")
         return redirect(url_for("events.event_detail", event_id=event.id))
 
-    attendee_name = request.form.get("attendee_name", "").strip()
-    attendee_email = request.form.get("attendee_email", "").strip()
-    department = request.form.get("department", "").strip()
-    section = request.form.get("section", "").strip()
-    student_uid = request.form.get("student_uid", "").strip()
-    team_selection = request.form.get("team_selection", "").strip()
-    agreement = request.form.get("agreement")
-
-    errors = []
-    if not attendee_name:
-        errors.append("Attendee name is required.")
-    if not attendee_email:
-        errors.append("Email address is required.")
-    if not department:
-        errors.append("Department is required.")
-    if not section:
-        errors.append("Section or batch is required.")
-    if not student_uid:
-        errors.append("Unique ID is required.")
-    if not team_selection:
-        errors.append("Please select a team preference.")
-    if not agreement:
-        errors.append("Please confirm that you agree to the participation rules.")
-    if team_selection and team_selection not in TEAM_OPTIONS:
-        errors.append("Select a valid team option.")
+    queued = waitlist_entry(current_user.id, event.id)
+    if queued:
+        flash(f"You are #{queue_position(queued)} on the waitlist for this event.", "info")
+        return redirect(url_for("events.event_detail", event_id=event.id))
 
-    if errors:
-        for error in errors:
+    form = _registration_form_data(request)
+    if form["errors"]:
+        for error in form["errors"]:
             flash(error, "danger")
         return redirect(url_for("events.event_detail", event_id=event.id))
 
-    registration = Registration(
-        user_id=current_user.id,
-        event_id=event.id,
-        attendee_name=attendee_name,
-        attendee_email=attendee_email,
-        department=department or None,
-        section=section or None,
-        student_uid=student_uid or None,
-        team_selection=team_selection or None,
-    )
+    if _student_uid_taken(event.id, form["data"]["student_uid"]):
+        flash("That unique ID is already registered or waitlisted for this event.", "danger")
+        return redirect(url_for("events.event_detail", event_id=event.id))
+
+    if not event.has_space():
+        entry = join_waitlist(current_user.id, event, form["data"])
+        db.session.commit()
+        flash(
+            f"This event is already full. You are #{queue_position(entry)} on the waitlist and will be "
+            "registered automatically when a seat opens.",
+            "warning",
+        )
+        return redirect(url_for("events.event_detail", event_id=event.id))
+
+    clashes = schedule_conflicts(current_user.id, event.start_time, event.end_time, exclude_event_id=event.id)
+    registration = Registration(user_id=current_user.id, event_id=event.id, **form["data"])
     interest = EventInterest.query.filter_by(user_id=current_user.id, event_id=event.id).first()
     if interest:
+        record_change(interest, "delete")
         db.session.delete(interest)
     db.session.add(registration)
+    record_change(registration, "create")
+    enqueue("registration.confirmation", {"user_id": current_user.id, "event_id": event.id})
     db.session.commit()
     flash("You have been registered for the event!", "success")
+    for clash in clashes:
+        flash(
+            f"Heads up: this overlaps with \"{clash.title}\" ({clash.time_range}), which you are also attending.",
+            "warning",
+        )
     return redirect(url_for("events.event_detail", event_id=event.id))
 
 
 @events_bp.route("/events/<int:event_id>/unregister", methods=["POST"])
+@idempotent
 @login_required
 def unregister_from_event(event_id: int):
     event = Event.query.get_or_404(event_id)
@@ -267,13 +343,41 @@ def unregister_from_event(event_id: int):
         flash("You are not registered for this event.", "warning")
         return redirect(url_for("events.event_detail", event_id=event.id))
 
+    record_change(registration, "delete")
     db.session.delete(registration)
+    enqueue(
+        "registration.cancelled",
+        {
+            "event_id": event.id,
+            "attendee_name": registration.attendee_name,
+            "attendee_email": registration.attendee_email,
+        },
+    )
+    promote_waitlist(event)
     db.session.commit()
     flash("Your registration has been canceled.", "info")
     return redirect(url_for("events.event_detail", event_id=event.id))
 
 
+@events_bp.route("/events/<int:event_id>/waitlist/leave", methods=["POST"])
+@login_required
+def leave_event_waitlist(event_id: int):
+    event = Event.query.get_or_404(event_id)
+    entry = waitlist_entry(current_user.id, event.id)
+
+    if not entry:
+        flash("You are not on the waitlist for this event.", "warning")
+        return redirect(url_for("events.event_detail", event_id=event.id))
+
+    leave_waitlist(entry)
+    db.session.commit()
+    flash("You have left the waitlist.", "info")
+    return redirect(url_for("events.event_detail", event_id=event.id))
+
+
 @events_bp.route("/events/<int:event_id>/interest", methods=["POST"])
+@admit("events.interest")
+@idempotent
 @login_required
 def toggle_interest(event_id: int):
     event = Event.query.get_or_404(event_id)
@@ -284,6 +388,7 @@ def toggle_interest(event_id: int):
 
     if action == "remove":
         if interest:
+            record_change(interest, "delete")
             db.session.delete(interest)
             db.session.commit()
             flash("Removed from the interest list.", "info")
@@ -291,11 +396,13 @@ def toggle_interest(event_id: int):
             flash("You were not marked as interested.", "warning")
         return redirect(url_for("events.event_detail", event_id=event.id))
 
-    if not interest:
+    created = interest is None
+    if created:
         interest = EventInterest(user_id=current_user.id, event_id=event.id)
         db.session.add(interest)
 
     interest.note = note or None
+    record_change(interest, "create" if created else "update")
     db.session.commit()
     flash("Thanks! We will keep you updated about this event.", "success")
     return redirect(url_for("events.event_detail", event_id=event.id))
@@ -304,13 +411,79 @@ def toggle_interest(event_id: int):
 @events_bp.route("/my-registrations")
 @login_required
 def my_registrations():
-    registrations = (
-        Registration.query.filter_by(user_id=current_user.id)
+    now = datetime.utcnow()
+    upcoming, upcoming_cursor = _registration_page(now, request.args.get("upcoming"), past=False)
+    past, past_cursor = _registration_page(now, request.args.get("past"), past=True)
+    calendar_url = None
+    if current_user.calendar_token:
+        calendar_url = url_for("events.personal_feed", token=current_user.calendar_token, _external=True)
+    return render_template(
+        "my_registrations.html",
+        upcoming=upcoming,
+        past=past,
+        upcoming_cursor=upcoming_cursor,
+        past_cursor=past_cursor,
+        calendar_url=calendar_url,
+    )
+
+
+def _registration_page(now: datetime, cursor: Optional[str], past: bool):
+    """One keyset page of the current user's registrations with their events joined in.
+
+    Upcoming events run soonest first and past ones most recent first; the
+    returned cursor is ``None`` on the last page.
+    """
+    query = (
+        Registration.query.filter(Registration.user_id == current_user.id)
         .join(Event)
-        .order_by(Event.start_time)
-        .all()
+        .options(contains_eager(Registration.event))
     )
-    return render_template("my_registrations.html", registrations=registrations)
+    if past:
+        query = query.filter(Event.start_time < now).order_by(Event.start_time.desc(), Registration.id.desc())
+    else:
+        query = query.filter(Event.start_time >= now).order_by(Event.start_time, Registration.id)
+    if cursor:
+        try:
+            query = query.filter(after_cursor(Event.start_time, Registration.id, cursor, descending=past))
+        except ValueError:
+            abort(400)
+    registrations = query.limit(MY_REGISTRATIONS_PAGE_SIZE + 1).all()
+    if len(registrations) <= MY_REGISTRATIONS_PAGE_SIZE:
+        return registrations, None
+    registrations = registrations[:MY_REGISTRATIONS_PAGE_SIZE]
+    last = registrations[-1]
+    return registrations, encode_cursor(last.event.start_time, last.id)
+
+
+@events_bp.route("/calendar.ics")
+def catalog_feed():
+    event_type = request.args.get("event_type", "").strip()
+    if event_type.lower() in {"", "all"}:
+        event_type = None
+    name = f"EventManage {event_type} events" if event_type else "EventManage events"
+    return feed_response(("catalog", event_type), lambda: catalog_rows(event_type), name, "public, max-age=300")
+
+
+@events_bp.route("/calendar/<token>.ics")
+def personal_feed(token: str):
+    user = User.query.filter_by(calendar_token=token).first_or_404()
+    return feed_response(
+        ("user", user.id), lambda: user_rows(user.id), "My EventManage registrations", "private, max-age=300"
+    )
+
+
+@events_bp.route("/calendar/reset-token", methods=["POST"])
+@login_required
+def reset_calendar_token():
+    """Issue the personal feed link on first use, or replace it."""
+    had_link = current_user.calendar_token is not None
+    current_user.reset_calendar_token()
+    db.session.commit()
+    if had_link:
+        flash("Your calendar link has been reset. Update any calendar apps that used the old link.", "info")
+    else:
+        flash("Your calendar link is ready. Add it to your calendar app to follow your registrations.", "success")
+    return redirect(url_for("events.my_registrations"))
 
 
 @events_bp.app_context_processor
@@ -318,28 +491,61 @@ def inject_globals():
     return {"current_year": datetime.utcnow().year}
 
 
+@events_bp.app_template_global()
+def event_url(event) -> str:
+    """Detail URL for an Event row or a series occurrence that has no row yet."""
+    if event.id is None:
+        return url_for("events.series_occurrence", series_id=event.series_id, stamp=event.stamp)
+    return url_for("events.event_detail", event_id=event.id)
+
+
+def _registration_form_data(req):
+    """Extract and validate attendee details from the registration form."""
+    data = {
+        field: req.form.get(field, "").strip()
+        for field in ("attendee_name", "attendee_email", "department", "section", "student_uid", "team_selection")
+    }
+    agreement = req.form.get("agreement")
+
+    errors = []
+    if not data["attendee_name"]:
+        errors.append("Attendee name is required.")
+    if not data["attendee_email"]:
+        errors.append("Email address is required.")
+    if not data["department"]:
+        errors.append("Department is required.")
+    if not data["section"]:
+        errors.append("Section or batch is required.")
+    if not data["student_uid"]:
+        errors.append("Unique ID is required.")
+    if not data["team_selection"]:
+        errors.append("Please select a team preference.")
+    if not agreement:
+        errors.append("Please confirm that you agree to the participation rules.")
+    if data["team_selection"] and data["team_selection"] not in TEAM_OPTIONS:
+        errors.append("Select a valid team option.")
+
+    for field in ("department", "section", "student_uid", "team_selection"):
+        data[field] = data[field] or None
+    return {"data": data, "errors": errors}
+
+
+def _student_uid_taken(event_id: int, student_uid: str) -> bool:
+    registered = db.session.query(
+        Registration.query.filter_by(event_id=event_id, student_uid=student_uid).exists()
+    ).scalar()
+    return registered or db.session.query(
+        WaitlistEntry.query.filter_by(event_id=event_id, student_uid=student_uid).exists()
+    ).scalar()
+
+
 def _resolve_timeframe(now: datetime):
-    timeframe = request.args.get("timeframe", "all").lower() or "all"
+    timeframe = (request.args.get("timeframe", "all").lower() or "all").replace("_", "-")
     selected_date = request.args.get("date", "")
     start_bound = end_bound = None
 
-    def _start_of_day(dt: datetime):
-        return dt.replace(hour=0, minute=0, second=0, microsecond=0)
-
-    if timeframe == "today":
-        start_bound = _start_of_day(now)
-        end_bound = start_bound + timedelta(days=1)
-    elif timeframe in {"this-week", "this_week"}:
-        start_bound = _start_of_day(now - timedelta(days=now.weekday()))
-        end_bound = start_bound + timedelta(days=7)
-        timeframe = "this-week"
-    elif timeframe in {"this-month", "this_month"}:
-        start_bound = _start_of_day(now).replace(day=1)
-        if start_bound.month == 12:
-            end_bound = start_bound.replace(year=start_bound.year + 1, month=1)
-        else:
-            end_bound = start_bound.replace(month=start_bound.month + 1)
-        timeframe = "this-month"
+    if timeframe in QUICK_TIMEFRAMES:
+        start_bound, end_bound = _timeframe_window(timeframe, now)
     elif timeframe == "date" and selected_date:
         try:
             parsed_date = datetime.strptime(selected_date, "%Y-%m-%d")
@@ -354,3 +560,28 @@ def _resolve_timeframe(now: datetime):
         selected_date = ""
 
     return timeframe, selected_date, start_bound, end_bound
+
+
+def _start_of_day(dt: datetime):
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _timeframe_window(timeframe: str, now: datetime):
+    """Return the ``[start, end)`` bounds of a quick-filter timeframe."""
+    if timeframe == "today":
+        start_bound = _start_of_day(now)
+        return start_bound, start_bound + timedelta(days=1)
+    if timeframe == "this-week":
+        start_bound = _start_of_day(now - timedelta(days=now.weekday()))
+        return start_bound, start_bound + timedelta(days=7)
+    start_bound = _start_of_day(now).replace(day=1)
+    if start_bound.month == 12:
+        return start_bound, start_bound.replace(year=start_bound.year + 1, month=1)
+    return start_bound, start_bound.replace(month=start_bound.month + 1)
+
+
+def _facet_windows(now: datetime, timeframe: str, start_bound, end_bound):
+    windows = {name: _timeframe_window(name, now) for name in QUICK_TIMEFRAMES}
+    if timeframe == "date" and start_bound and end_bound:
+        windows["date"] = (start_bound, end_bound)
+    return windows
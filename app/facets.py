@@ -0,0 +1,96 @@
+"""Category and timeframe facet counts for the event search filters."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_
+
+from . import db
+from .cache import FACETS_VERSION, VersionedCache
+from .models import Event
+from .recurrence import occurrence_facet_rows
+
+
+Window = Tuple[datetime, datetime]
+
+_facet_cache = VersionedCache(max_entries=512, version_name=FACETS_VERSION)
+
+
+def search_clause(search_query: str):
+    """SQL clause matching the free-text search box against title, summary and venue."""
+    pattern = f"%{search_query}%"
+    return or_(
+        Event.title.ilike(pattern),
+        Event.summary.ilike(pattern),
+        Event.location.ilike(pattern),
+    )
+
+
+def facet_counts(
+    search_query: str,
+    windows: Dict[str, Window],
+    selected_category: str = "all",
+    timeframe: str = "all",
+    upcoming_after: Optional[datetime] = None,
+) -> dict:
+    """Return chip counts for the current search.
+
+    Category counts honour the active timeframe and timeframe counts honour the
+    active category, so each chip shows what clicking it would return. The
+    grouped rows behind both come from a single query cached per facets version,
+    which registrations do not bump.
+    """
+    if upcoming_after is not None:
+        upcoming_after = upcoming_after.replace(second=0, microsecond=0)
+    key = (search_query.lower(), tuple(sorted(windows.items())), upcoming_after)
+    rows = _facet_cache.get_or_compute(
+        key, lambda: _grouped_rows(search_query, windows, upcoming_after)
+    )
+
+    categories = {}
+    for event_type, counts in rows.items():
+        categories[event_type] = counts.get(timeframe, counts["all"])
+    if selected_category != "all":
+        categories.setdefault(selected_category, 0)
+
+    scoped = [
+        counts for event_type, counts in rows.items()
+        if selected_category == "all" or event_type == selected_category
+    ]
+    timeframes = {name: sum(counts[name] for counts in scoped) for name in ("all", *windows)}
+
+    return {
+        "total": sum(categories.values()),
+        "categories": dict(sorted(categories.items())),
+        "timeframes": timeframes,
+    }
+
+
+def _grouped_rows(search_query: str, windows: Dict[str, Window], upcoming_after: Optional[datetime]):
+    names = list(windows)
+    columns = [Event.event_type, func.count(Event.id)]
+    for name in names:
+        start, end = windows[name]
+        in_window = and_(Event.start_time >= start, Event.start_time < end)
+        columns.append(func.sum(case((in_window, 1), else_=0)))
+
+    query = db.session.query(*columns)
+    if upcoming_after is not None:
+        query = query.filter(Event.start_time >= upcoming_after)
+    if search_query:
+        query = query.filter(search_clause(search_query))
+
+    rows = {}
+    for event_type, total, *window_counts in query.group_by(Event.event_type).all():
+        counts = {"all": total}
+        counts.update({name: int(count or 0) for name, count in zip(names, window_counts)})
+        rows[event_type] = counts
+
+    # Series occurrences without a row yet are counted by expanding each window.
+    series_rows = occurrence_facet_rows(search_query, windows, upcoming_after, datetime.utcnow())
+    for event_type, series_counts in series_rows.items():
+        counts = rows.setdefault(event_type, dict.fromkeys(series_counts, 0))
+        for name, count in series_counts.items():
+            counts[name] += count
+    return rows
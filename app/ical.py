@@ -0,0 +1,198 @@
+"""Streaming iCalendar feeds cached per catalog data version."""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from flask import Response, request, stream_with_context, url_for
+from sqlalchemy import select
+
+from . import db
+from .cache import VersionedCache
+from .models import Event, EventSeries, Registration, SeriesExclusion
+
+
+PRODID = "-//EventManage//Event Feeds//EN"
+
+_feed_cache = VersionedCache(max_entries=1024)
+
+EVENT_COLUMNS = (Event.id, Event.title, Event.summary, Event.location, Event.start_time, Event.end_time, Event.event_type)
+SERIES_COLUMNS = (
+    EventSeries.id,
+    EventSeries.title,
+    EventSeries.summary,
+    EventSeries.location,
+    EventSeries.start_time,
+    EventSeries.end_time,
+    EventSeries.event_type,
+    EventSeries.frequency,
+    EventSeries.interval,
+    EventSeries.until,
+)
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Fold content lines at 75 octets as RFC 5545 requires."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _stamp(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _vevent(row, host: str, dtstamp: str) -> str:
+    event_id, title, summary, location, start_time, end_time, event_type, *occurrence = row
+    # Catalog rows materialized from a series override that series' instance instead of duplicating it.
+    identity = [f"UID:event-{event_id}@{host}"]
+    if occurrence and occurrence[0] is not None:
+        series_id, occurrence_start = occurrence
+        identity = [f"UID:series-{series_id}@{host}", f"RECURRENCE-ID:{_stamp(occurrence_start)}"]
+    lines = [
+        "BEGIN:VEVENT",
+        *identity,
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART:{_stamp(start_time)}",
+        f"DTEND:{_stamp(end_time)}",
+        f"SUMMARY:{_escape(title)}",
+        f"DESCRIPTION:{_escape(summary)}",
+        f"LOCATION:{_escape(location)}",
+        f"CATEGORIES:{_escape(event_type)}",
+        f"URL:{url_for('events.event_detail', event_id=event_id, _external=True)}",
+        "END:VEVENT",
+    ]
+    return "".join(_fold(line) for line in lines)
+
+
+class SeriesRow(tuple):
+    """A series result row carrying its excluded dates alongside the columns."""
+
+    def __new__(cls, row, exdates):
+        instance = super().__new__(cls, row)
+        instance.exdates = exdates
+        return instance
+
+
+def _vseries(row, host: str, dtstamp: str, exdates) -> str:
+    series_id, title, summary, location, start_time, end_time, event_type, frequency, interval, until = row
+    rule = f"RRULE:FREQ={frequency.upper()};INTERVAL={interval}"
+    if until:
+        rule += f";UNTIL={_stamp(until)}"
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:series-{series_id}@{host}",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART:{_stamp(start_time)}",
+        f"DTEND:{_stamp(end_time)}",
+        rule,
+        *(f"EXDATE:{_stamp(value)}" for value in exdates),
+        f"SUMMARY:{_escape(title)}",
+        f"DESCRIPTION:{_escape(summary)}",
+        f"LOCATION:{_escape(location)}",
+        f"CATEGORIES:{_escape(event_type)}",
+        "END:VEVENT",
+    ]
+    return "".join(_fold(line) for line in lines)
+
+
+def _render(rows: Iterable, calendar_name: str) -> Iterator[str]:
+    host = request.host.split(":")[0]
+    dtstamp = _stamp(datetime.utcnow())
+    yield "".join(
+        _fold(line)
+        for line in (
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            f"PRODID:{PRODID}",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            f"X-WR-CALNAME:{_escape(calendar_name)}",
+        )
+    )
+    for row in rows:
+        if isinstance(row, SeriesRow):
+            yield _vseries(row, host, dtstamp, row.exdates)
+        else:
+            yield _vevent(row, host, dtstamp)
+    yield "END:VCALENDAR\r\n"
+
+
+def catalog_rows(category: Optional[str]):
+    """Event rows followed by one RRULE master per series, so open-ended series stay one entry."""
+    statement = select(*EVENT_COLUMNS, Event.series_id, Event.occurrence_start).order_by(Event.start_time)
+    if category:
+        statement = statement.where(Event.event_type == category)
+    yield from db.session.execute(statement.execution_options(yield_per=200))
+
+    series_statement = select(*SERIES_COLUMNS).order_by(EventSeries.start_time)
+    if category:
+        series_statement = series_statement.where(EventSeries.event_type == category)
+    series_rows = db.session.execute(series_statement).all()
+    exdates = {}
+    if series_rows:
+        for series_id, occurrence_start in db.session.execute(
+            select(SeriesExclusion.series_id, SeriesExclusion.occurrence_start)
+            .where(SeriesExclusion.series_id.in_([row.id for row in series_rows]))
+            .order_by(SeriesExclusion.occurrence_start)
+        ):
+            exdates.setdefault(series_id, []).append(occurrence_start)
+    for row in series_rows:
+        yield SeriesRow(row, exdates.get(row.id, ()))
+
+
+def user_rows(user_id: int):
+    statement = (
+        select(*EVENT_COLUMNS)
+        .join(Registration, Registration.event_id == Event.id)
+        .where(Registration.user_id == user_id)
+        .order_by(Event.start_time)
+    )
+    return db.session.execute(statement.execution_options(yield_per=200))
+
+
+def feed_response(cache_key: tuple, rows_factory, calendar_name: str, cache_control: str) -> Response:
+    """Serve a feed with ETag/304 support, streaming it on a cache miss and caching the result."""
+    key = (cache_key, request.host)
+    version, cached = _feed_cache.get(key)
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+    etag = f"{version}-{digest}"
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        if cached is not None:
+            response = Response(cached)
+        else:
+            response = Response(stream_with_context(_stream_and_cache(key, version, rows_factory, calendar_name)))
+        response.mimetype = "text/calendar"
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def _stream_and_cache(key, version: int, rows_factory, calendar_name: str) -> Iterator[str]:
+    chunks = []
+    for chunk in _render(rows_factory(), calendar_name):
+        chunks.append(chunk)
+        yield chunk
+    _feed_cache.set(key, "".join(chunks), version)
@@ -0,0 +1,137 @@
+"""Idempotency keys for form POSTs that users double-submit or browsers retry.
+
+Forms carry a client-generated ``idempotency_key`` field (API clients may send
+an ``Idempotency-Key`` header instead). The first request with a key claims it
+in the same transaction as its write, so a concurrent duplicate fails on the
+key instead of on ``unique_event_registration``. Once the view returns, its
+redirect and flashed messages are saved with the key, and later requests
+carrying that key get them back without running the view at all.
+"""
+from __future__ import annotations
+
+import itertools
+import json
+import re
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Optional
+
+from flask import abort, current_app, flash, g, redirect, request, session, url_for
+from flask_login import current_user
+from sqlalchemy import delete, event as sa_event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import IdempotencyKey
+
+
+KEY_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+# Expired keys are only ever skipped by lookups, so they are deleted in bulk now and then.
+PRUNE_EVERY = 200
+
+_keys = IdempotencyKey.__table__
+_stores = itertools.count(1)
+
+
+def _submitted_key() -> Optional[str]:
+    key = request.headers.get("Idempotency-Key") or request.form.get("idempotency_key", "")
+    return key if KEY_PATTERN.match(key) else None
+
+
+def _lookup(user_id: int, key: str):
+    return db.session.execute(
+        select(_keys).where(_keys.c.user_id == user_id, _keys.c.key == key, _keys.c.expires_at > datetime.utcnow())
+    ).first()
+
+
+def _replay(row):
+    if row.request_path != request.path:
+        abort(422)
+    if row.response is None:
+        # The original committed but has not recorded its outcome (yet).
+        flash("We already received this submission.", "info")
+        return redirect(request.referrer or url_for("events.home"))
+    outcome = json.loads(row.response)
+    for category, message in outcome["flashes"]:
+        flash(message, category)
+    return redirect(outcome["location"], code=outcome["status"])
+
+
+@sa_event.listens_for(Session, "before_commit")
+def _claim_with_write(session) -> None:
+    claim = session.info.pop("idempotency_claim", None)
+    if claim is None:
+        return
+    # A live row for this key means a duplicate got here first; the INSERT then fails and this one replays it.
+    session.execute(
+        delete(_keys).where(
+            _keys.c.user_id == claim["user_id"], _keys.c.key == claim["key"], _keys.c.expires_at <= datetime.utcnow()
+        )
+    )
+    session.execute(insert(_keys).values(**claim))
+
+
+def _store(user_id: int, key: str, response, flashes) -> None:
+    now = datetime.utcnow()
+    values = {
+        "request_path": request.path,
+        "response": json.dumps({"location": response.location, "status": response.status_code, "flashes": flashes}),
+        "expires_at": now + timedelta(seconds=current_app.config["IDEMPOTENCY_TTL_SECONDS"]),
+    }
+    try:
+        result = db.session.execute(update(_keys).where(_keys.c.user_id == user_id, _keys.c.key == key).values(values))
+        if not result.rowcount:
+            db.session.execute(insert(_keys).values(user_id=user_id, key=key, **values))
+        if next(_stores) % PRUNE_EVERY == 0:
+            db.session.execute(delete(_keys).where(_keys.c.expires_at <= now))
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent duplicate recorded the same outcome first.
+        db.session.rollback()
+
+
+def idempotent(view):
+    """Replay the first outcome of a redirecting POST view for repeated idempotency keys.
+
+    Goes below ``admit``: the key lookup reads the main database, so
+    duplicates are throttled like any other write before they get that far.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != "POST" or g.get("idempotency_key") or not current_user.is_authenticated:
+            return view(*args, **kwargs)
+        key = _submitted_key()
+        if key is None:
+            return view(*args, **kwargs)
+
+        user_id = current_user.id
+        row = _lookup(user_id, key)
+        if row is not None:
+            return _replay(row)
+
+        g.idempotency_key = key
+        flashed_before = len(session.get("_flashes", []))
+        db.session.info["idempotency_claim"] = {
+            "user_id": user_id,
+            "key": key,
+            "request_path": request.path,
+            "expires_at": datetime.utcnow() + timedelta(seconds=current_app.config["IDEMPOTENCY_TTL_SECONDS"]),
+        }
+        try:
+            response = view(*args, **kwargs)
+        except IntegrityError:
+            db.session.rollback()
+            row = _lookup(user_id, key)
+            if row is None:
+                raise
+            return _replay(row)
+        finally:
+            db.session.info.pop("idempotency_claim", None)
+
+        if response.status_code in (301, 302, 303, 307, 308):
+            _store(user_id, key, response, [list(item) for item in session.get("_flashes", [])[flashed_before:]])
+        return response
+
+    return wrapper
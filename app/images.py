@@ -0,0 +1,313 @@
+"""Event images ingested once and served as content-addressed responsive thumbnails.
+
+Admin forms hand an uploaded file or a remote URL to an ``images.ingest``
+job. The worker stores the original under its SHA-256, renders every
+configured width as WebP and JPEG on a process pool, then points the
+event's ``image_url`` at the local copy. Thumbnail URLs never change
+content, so they are served with immutable cache headers.
+"""
+from __future__ import annotations
+
+import hashlib
+import http.client
+import io
+import ipaddress
+import multiprocessing
+import os
+import re
+import socket
+import urllib.parse
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Union
+
+import click
+from flask import Blueprint, abort, current_app, send_from_directory
+from flask.cli import AppGroup
+
+from . import db
+from .changes import record_change
+from .jobs import enqueue, job_handler
+from .models import Event, EventSeries
+
+try:  # Pillow is optional; without it image URLs are used as given.
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - depends on the environment
+    Image = ImageOps = None
+
+
+URL_PREFIX = "/media"
+FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+LOCAL_URL = re.compile(rf"^{URL_PREFIX}/(?P<digest>[0-9a-f]{{64}})/(?P<width>\d+)\.jpg$")
+TARGETS = {"event": Event, "series": EventSeries}
+
+images_bp = Blueprint("images", __name__, url_prefix=URL_PREFIX)
+images_cli = AppGroup("images", help="Manage locally stored event images.")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class ImageError(ValueError):
+    """The upload or download is not an image we can use."""
+
+
+@images_bp.app_template_global()
+def images_enabled() -> bool:
+    return Image is not None
+
+
+def is_local_image(image_url: Optional[str]) -> bool:
+    return LOCAL_URL.match(image_url or "") is not None
+
+
+def media_root() -> Path:
+    return Path(current_app.config["MEDIA_ROOT"] or os.path.join(current_app.instance_path, "media"))
+
+
+def media_url(digest: str, width: int, ext: str = "jpg") -> str:
+    return f"{URL_PREFIX}/{digest}/{width}.{ext}"
+
+
+def thumbnail_widths(original_width: int) -> List[int]:
+    """Configured widths, never upscaled: anything wider collapses to the original width."""
+    return sorted({min(width, original_width) for width in current_app.config["IMAGE_WIDTHS"]})
+
+
+@images_bp.app_template_global()
+def image_sources(image_url: Optional[str]) -> Optional[dict]:
+    """``src``/``srcset`` values for a locally stored image, or ``None`` for a remote URL."""
+    match = LOCAL_URL.match(image_url or "")
+    if match is None:
+        return None
+    digest, largest = match["digest"], int(match["width"])
+    widths = thumbnail_widths(largest)
+    srcset = {ext: ", ".join(f"{media_url(digest, width, ext)} {width}w" for width in widths) for ext in FORMATS}
+    fallback = next((width for width in widths if width >= 640), largest)
+    return {"src": media_url(digest, fallback), **srcset}
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    partial.write_bytes(data)
+    os.replace(partial, path)
+
+
+def _check_image(data: bytes) -> None:
+    if len(data) > current_app.config["IMAGE_MAX_BYTES"]:
+        raise ImageError(f"Images must be under {current_app.config['IMAGE_MAX_BYTES'] // (1024 * 1024)} MB.")
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.verify()
+    except Exception as error:
+        raise ImageError("The file is not a readable image.") from error
+
+
+def store_original(data: bytes) -> str:
+    """Keep the source bytes under their SHA-256 and return the digest."""
+    _check_image(data)
+    digest = hashlib.sha256(data).hexdigest()
+    path = media_root() / digest / "original"
+    if not path.exists():
+        _write_atomic(path, data)
+    return digest
+
+
+def read_upload(upload) -> bytes:
+    """Read a form upload, refusing oversized files without buffering all of them."""
+    data = upload.stream.read(current_app.config["IMAGE_MAX_BYTES"] + 1)
+    _check_image(data)
+    return data
+
+
+def _is_public(address: Union[ipaddress.IPv4Address, ipaddress.IPv6Address]) -> bool:
+    if address.version == 6 and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return address.is_global
+
+
+def _public_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None) -> socket.socket:
+    """``socket.create_connection`` that refuses hosts resolving to private, loopback or link-local addresses.
+
+    The address that is checked is the one connected to, so a DNS answer that
+    changes between the check and the connect cannot slip through.
+    """
+    host, port = address
+    try:
+        candidates = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError as error:
+        raise ImageError(f"Could not resolve image host {host}.") from error
+    if not all(_is_public(ipaddress.ip_address(sockaddr[0].split("%")[0])) for *_, sockaddr in candidates):
+        raise ImageError("Image URLs must point at a public host.")
+    error = None
+    for family, kind, proto, _, sockaddr in candidates:
+        sock = socket.socket(family, kind, proto)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as exc:
+            error = exc
+            sock.close()
+    raise error
+
+
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_connection
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _public_connection
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _HTTPRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if urllib.parse.urlsplit(newurl).scheme not in ("http", "https"):
+            raise ImageError("Image URLs may only redirect to http(s) URLs.")
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def _opener() -> urllib.request.OpenerDirector:
+    """An opener with only the handlers image downloads need: no proxies, files, FTP or data URLs."""
+    opener = urllib.request.OpenerDirector()
+    for handler in (
+        _PublicHTTPHandler(),
+        _PublicHTTPSHandler(),
+        _HTTPRedirectHandler(),
+        urllib.request.HTTPDefaultErrorHandler(),
+        urllib.request.HTTPErrorProcessor(),
+    ):
+        opener.add_handler(handler)
+    return opener
+
+
+def _download(url: str) -> bytes:
+    """Fetch an admin-supplied image URL. Every hop, redirects included, must reach a public address."""
+    if not url.startswith(("http://", "https://")):
+        raise ImageError("Only http(s) image URLs can be fetched.")
+    request = urllib.request.Request(url, headers={"User-Agent": "EventManage image ingest"})
+    with _opener().open(request, timeout=current_app.config["IMAGE_FETCH_TIMEOUT"]) as response:
+        return response.read(current_app.config["IMAGE_MAX_BYTES"] + 1)
+
+
+def _render(original: str, target: str, width: int, image_format: str, quality: int) -> None:
+    """Resize one thumbnail. Runs in a pool process, so it only takes plain arguments."""
+    with Image.open(original) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "L"):
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+            image = background
+        height = max(round(image.height * width / image.width), 1)
+        image = image.resize((width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, quality=quality, optimize=True)
+    _write_atomic(Path(target), buffer.getvalue())
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Spawned rather than forked: the job worker that owns the pool is multi-threaded.
+        _pool = ProcessPoolExecutor(
+            max_workers=current_app.config["IMAGE_PROCESSES"], mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def render_thumbnails(digest: str) -> int:
+    """Render any missing thumbnails for ``digest`` and return the largest width."""
+    folder = media_root() / digest
+    original = folder / "original"
+    with Image.open(original) as image:
+        width = ImageOps.exif_transpose(image).width
+    widths = thumbnail_widths(width)
+    qualities = {"webp": current_app.config["IMAGE_WEBP_QUALITY"], "jpg": current_app.config["IMAGE_JPEG_QUALITY"]}
+    futures = [
+        _process_pool().submit(_render, str(original), str(folder / f"{size}.{ext}"), size, image_format, qualities[ext])
+        for size in widths
+        for ext, image_format in FORMATS.items()
+        if not (folder / f"{size}.{ext}").exists()
+    ]
+    for future in futures:
+        future.result()
+    return widths[-1]
+
+
+def queue_ingest(target, upload: Optional[bytes] = None) -> None:
+    """Have the worker localize ``target``'s image. Call inside the write; the caller commits.
+
+    Without an upload, ``target.image_url`` is fetched unless it is already local.
+    """
+    if not images_enabled() or (upload is None and (not target.image_url or is_local_image(target.image_url))):
+        return
+    db.session.flush()
+    payload = {
+        "target": "series" if isinstance(target, EventSeries) else "event",
+        "id": target.id,
+        # The worker only replaces this value, so a newer edit is never overwritten.
+        "expected": target.image_url,
+    }
+    if upload is not None:
+        payload["digest"] = store_original(upload)
+    else:
+        payload["url"] = target.image_url
+    enqueue("images.ingest", payload, max_attempts=3)
+
+
+@job_handler("images.ingest")
+def ingest_image(payload: dict) -> None:
+    digest = payload.get("digest") or store_original(_download(payload["url"]))
+    local_url = media_url(digest, render_thumbnails(digest))
+
+    row = db.session.get(TARGETS[payload["target"]], payload["id"])
+    if row is None or row.image_url != payload["expected"]:
+        return
+    row.image_url = local_url
+    record_change(row, "update")
+    if isinstance(row, EventSeries):
+        # Dates that still follow the series show the same image.
+        for event in Event.query.filter_by(series_id=row.id, is_exception=False, image_url=payload["expected"]):
+            event.image_url = local_url
+            record_change(event, "update")
+    db.session.commit()
+
+
+@images_bp.route("/<digest>/<int:width>.<ext>")
+def thumbnail(digest: str, width: int, ext: str):
+    if ext not in FORMATS or not re.fullmatch(r"[0-9a-f]{64}", digest):
+        abort(404)
+    response = send_from_directory(media_root() / digest, f"{width}.{ext}", max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+@images_cli.command("rebuild")
+def rebuild_command():
+    """Render missing thumbnails for every stored image, e.g. after changing IMAGE_WIDTHS."""
+    if not images_enabled():
+        raise click.ClickException("Pillow is not installed.")
+    folders = [folder for folder in media_root().glob("*") if (folder / "original").exists()]
+    for folder in folders:
+        render_thumbnails(folder.name)
+    click.echo(f"Checked thumbnails for {len(folders)} image(s).")
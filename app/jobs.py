@@ -0,0 +1,190 @@
+"""Database-backed job queue so request handlers only enqueue and never wait on side effects."""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import and_, delete, func, or_, update
+
+from . import db
+from .models import Job
+
+
+logger = logging.getLogger(__name__)
+
+HANDLERS: Dict[str, Callable[[dict], None]] = {}
+# How often a running worker deletes finished jobs older than its ``keep_days``.
+PRUNE_INTERVAL_SECONDS = 3600
+
+jobs_cli = AppGroup("jobs", help="Run and inspect the background job queue.")
+
+
+def job_handler(kind: str):
+    """Register ``func`` as the handler for jobs of ``kind``."""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+
+    return decorator
+
+
+def enqueue(kind: str, payload: Optional[dict] = None, delay: float = 0, max_attempts: int = 5) -> Job:
+    """Add a job to the current transaction, so it only exists if the caller's write commits."""
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+        max_attempts=max_attempts,
+    )
+    db.session.add(job)
+    return job
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(Job.status == "queued", Job.run_at <= now),
+        and_(Job.status == "running", Job.locked_until < now),
+    )
+
+
+def claim_batch(worker_id: str, limit: int, lease_seconds: float) -> List[Job]:
+    """Lease up to ``limit`` due jobs, including ones whose previous lease expired."""
+    now = datetime.utcnow()
+    candidate_ids = [
+        row[0]
+        for row in db.session.query(Job.id).filter(_claimable(now)).order_by(Job.run_at, Job.id).limit(limit)
+    ]
+    if not candidate_ids:
+        db.session.rollback()
+        return []
+
+    locked_until = now + timedelta(seconds=lease_seconds)
+    db.session.execute(
+        update(Job)
+        .where(Job.id.in_(candidate_ids), _claimable(now))
+        .values(status="running", locked_by=worker_id, locked_until=locked_until, attempts=Job.attempts + 1)
+    )
+    db.session.commit()
+    return Job.query.filter(Job.locked_by == worker_id, Job.locked_until == locked_until, Job.status == "running").all()
+
+
+def retry_delay(attempts: int, base: float = 5.0, cap: float = 3600.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * (2 ** attempts)))
+
+
+def _run_job(app, job_id: int, kind: str, payload: str) -> Optional[str]:
+    handler = HANDLERS.get(kind)
+    if handler is None:
+        return f"No handler registered for job kind {kind!r}."
+    with app.app_context():
+        try:
+            handler(json.loads(payload))
+        except Exception:
+            logger.exception("Job %s (%s) failed", job_id, kind)
+            return traceback.format_exc(limit=5)
+        finally:
+            db.session.remove()
+    return None
+
+
+def _finish(job: Job, worker_id: str, error: Optional[str]) -> None:
+    now = datetime.utcnow()
+    values = {"locked_by": None, "locked_until": None}
+    if error is None:
+        values.update(status="done", finished_at=now, last_error=None)
+    elif job.attempts >= job.max_attempts:
+        values.update(status="failed", finished_at=now, last_error=error)
+    else:
+        values.update(
+            status="queued",
+            run_at=now + timedelta(seconds=retry_delay(job.attempts)),
+            last_error=error,
+        )
+    # Guard on the lease holder so a job re-claimed after an expired lease is not overwritten.
+    db.session.execute(
+        update(Job).where(Job.id == job.id, Job.locked_by == worker_id).values(**values)
+    )
+
+
+def prune(older_than: timedelta) -> int:
+    """Delete done and failed jobs that finished more than ``older_than`` ago."""
+    result = db.session.execute(
+        delete(Job).where(Job.status.in_(("done", "failed")), Job.finished_at < datetime.utcnow() - older_than)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def work(batch_size: int = 20, concurrency: int = 4, lease_seconds: float = 60, once: bool = False,
+         poll_interval: float = 1.0, keep_days: float = 7) -> int:
+    """Claim and run jobs until stopped (or until the queue is drained when ``once``).
+
+    Finished jobs older than ``keep_days`` are pruned on start and then hourly.
+    """
+    app = current_app._get_current_object()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    next_prune = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job") as pool:
+        while True:
+            if time.monotonic() >= next_prune:
+                pruned = prune(timedelta(days=keep_days))
+                if pruned:
+                    logger.info("Pruned %s finished job(s)", pruned)
+                next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+            jobs = claim_batch(worker_id, batch_size, lease_seconds)
+            if not jobs:
+                if once:
+                    return processed
+                time.sleep(poll_interval)
+                continue
+
+            futures = [(job, pool.submit(_run_job, app, job.id, job.kind, job.payload)) for job in jobs]
+            for job, future in futures:
+                _finish(job, worker_id, future.result())
+            db.session.commit()
+            processed += len(jobs)
+
+
+@jobs_cli.command("work")
+@click.option("--batch-size", default=20, show_default=True, help="Jobs claimed per lease.")
+@click.option("--concurrency", default=4, show_default=True, help="Handlers run in parallel.")
+@click.option("--lease", "lease_seconds", default=60.0, show_default=True, help="Seconds before an unfinished claim expires.")
+@click.option("--once", is_flag=True, help="Exit once no jobs are due instead of polling.")
+@click.option("--keep-days", default=7.0, show_default=True, help="Prune done and failed jobs older than N days.")
+def work_command(batch_size, concurrency, lease_seconds, once, keep_days):
+    """Process queued jobs."""
+    processed = work(
+        batch_size=batch_size, concurrency=concurrency, lease_seconds=lease_seconds, once=once, keep_days=keep_days
+    )
+    click.echo(f"Processed {processed} job(s).")
+
+
+@jobs_cli.command("prune")
+@click.option("--keep-days", default=7.0, show_default=True, help="Leave jobs finished in the last N days.")
+def prune_command(keep_days):
+    """Delete done and failed jobs, e.g. from cron when no worker runs continuously."""
+    removed = prune(timedelta(days=keep_days))
+    click.echo(f"Removed {removed} finished job(s).")
+
+
+@jobs_cli.command("status")
+def status_command():
+    """Show job counts by status."""
+    rows = db.session.query(Job.status, func.count(Job.id)).group_by(Job.status).order_by(Job.status).all()
+    if not rows:
+        click.echo("No jobs recorded.")
+    for status, count in rows:
+        click.echo(f"{status:>8}  {count}")
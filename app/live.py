@@ -0,0 +1,147 @@
+"""Server-sent seat availability updates fanned out from one publisher per worker."""
+from __future__ import annotations
+
+import json
+import queue
+import threading
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import func
+
+from . import db
+from .cache import current_data_version
+from .models import Event, Registration
+
+
+def seat_counts(event_ids: Iterable[int]) -> Dict[int, dict]:
+    """Return remaining seats and capacity for each event in one grouped query."""
+    event_ids = list(event_ids)
+    if not event_ids:
+        return {}
+    rows = (
+        db.session.query(Event.id, Event.capacity, func.count(Registration.id))
+        .outerjoin(Registration, Registration.event_id == Event.id)
+        .filter(Event.id.in_(event_ids))
+        .group_by(Event.id, Event.capacity)
+        .all()
+    )
+    return {
+        event_id: {"event_id": event_id, "capacity": capacity, "seats_remaining": max(capacity - taken, 0)}
+        for event_id, capacity, taken in rows
+    }
+
+
+def format_sse(payload: dict, event: str = "seats") -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+class StreamLimitReached(Exception):
+    """Raised when the worker already serves its maximum number of live streams."""
+
+
+class Subscription:
+    def __init__(self, event_id: int):
+        self.event_id = event_id
+        self.queue: "queue.Queue[dict]" = queue.Queue(maxsize=1)
+
+    def push(self, payload: dict) -> None:
+        # Only the latest seat count matters, so a slow reader just skips stale updates.
+        try:
+            self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(payload)
+        except queue.Full:
+            pass
+
+
+class SeatPublisher:
+    """Polls the shared data version and pushes seat changes to every local watcher."""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._last_seen: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._app = None
+        self.max_streams = 500
+        self.poll_interval = 1.0
+
+    @property
+    def stream_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def subscribe(self, app, event_id: int, snapshot: dict) -> Subscription:
+        self.max_streams = app.config.get("LIVE_SEATS_MAX_STREAMS", self.max_streams)
+        self.poll_interval = app.config.get("LIVE_SEATS_POLL_INTERVAL", self.poll_interval)
+        subscription = Subscription(event_id)
+        with self._lock:
+            if sum(len(subscribers) for subscribers in self._subscribers.values()) >= self.max_streams:
+                raise StreamLimitReached()
+            self._subscribers.setdefault(event_id, set()).add(subscription)
+            self._last_seen.setdefault(event_id, snapshot)
+            if self._thread is None or not self._thread.is_alive():
+                self._app = app
+                self._thread = threading.Thread(target=self._run, name="seat-publisher", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.event_id)
+            if not subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.event_id]
+                self._last_seen.pop(subscription.event_id, None)
+
+    def _run(self) -> None:
+        seen_version = None
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                watched = list(self._subscribers)
+            if not watched:
+                continue
+            with self._app.app_context():
+                try:
+                    version = current_data_version(max_age=0)
+                    if version == seen_version:
+                        continue
+                    seen_version = version
+                    counts = seat_counts(watched)
+                finally:
+                    db.session.remove()
+            self._publish(counts)
+
+    def _publish(self, counts: Dict[int, dict]) -> None:
+        with self._lock:
+            for event_id, payload in counts.items():
+                if self._last_seen.get(event_id) == payload:
+                    continue
+                self._last_seen[event_id] = payload
+                for subscription in self._subscribers.get(event_id, ()):
+                    subscription.push(payload)
+
+
+seat_publisher = SeatPublisher()
+
+
+def stream_seats(subscription: Subscription, snapshot: dict, heartbeat: float):
+    """Yield the SSE stream for one watcher until the client disconnects."""
+    try:
+        yield "retry: 5000\n\n"
+        yield format_sse(snapshot)
+        while True:
+            try:
+                payload = subscription.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(payload)
+    finally:
+        seat_publisher.unsubscribe(subscription)
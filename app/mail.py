@@ -0,0 +1,136 @@
+"""Pluggable outgoing mail backends plus a local SMTP sink for development and tests."""
+from __future__ import annotations
+
+import logging
+import smtplib
+import socketserver
+from email.message import EmailMessage
+from typing import List
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+
+logger = logging.getLogger(__name__)
+
+mail_cli = AppGroup("mail", help="Outgoing mail utilities.")
+
+
+class ConsoleBackend:
+    """Logs messages instead of sending them; the default outside production."""
+
+    def __init__(self, config):
+        pass
+
+    def send(self, message: EmailMessage) -> None:
+        logger.info("Mail to %s: %s\n%s", message["To"], message["Subject"], message.get_content())
+
+
+class MemoryBackend:
+    """Keeps sent messages in ``outbox`` so tests can assert on them."""
+
+    outbox: List[EmailMessage] = []
+
+    def __init__(self, config):
+        pass
+
+    def send(self, message: EmailMessage) -> None:
+        self.outbox.append(message)
+
+
+class SMTPBackend:
+    def __init__(self, config):
+        self.host = config["MAIL_SERVER"]
+        self.port = config["MAIL_PORT"]
+        self.username = config.get("MAIL_USERNAME")
+        self.password = config.get("MAIL_PASSWORD")
+        self.use_tls = config.get("MAIL_USE_TLS", False)
+        self.timeout = config.get("MAIL_TIMEOUT", 10)
+
+    def send(self, message: EmailMessage) -> None:
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            smtp.send_message(message)
+
+
+BACKENDS = {
+    "console": ConsoleBackend,
+    "memory": MemoryBackend,
+    "smtp": SMTPBackend,
+}
+
+
+def send_mail(to: str, subject: str, body: str) -> None:
+    """Deliver one plain-text message through the configured ``MAIL_BACKEND``."""
+    config = current_app.config
+    message = EmailMessage()
+    message["From"] = config["MAIL_DEFAULT_SENDER"]
+    message["To"] = to
+    message["Subject"] = subject
+    message.set_content(body)
+    BACKENDS[config["MAIL_BACKEND"]](config).send(message)
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP to accept and print messages from ``SMTPBackend``."""
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self._reply("220 eventmanage-sink ready")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode(errors="replace").strip()
+            if not line:
+                return
+            command = line.split(" ", 1)[0].upper()
+            if command in {"HELO", "EHLO"}:
+                self._reply("250 eventmanage-sink")
+            elif command == "MAIL":
+                recipients = []
+                self._reply("250 OK")
+            elif command == "RCPT":
+                recipients.append(line.split(":", 1)[-1].strip())
+                self._reply("250 OK")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data_line = self.rfile.readline().decode(errors="replace").rstrip("\r\n")
+                    if data_line == ".":
+                        break
+                    lines.append(data_line[1:] if data_line.startswith("..") else data_line)
+                self.server.messages.append({"to": recipients, "data": "\n".join(lines)})
+                click.echo(f"--- message to {', '.join(recipients)} ---\n" + "\n".join(lines))
+                self._reply("250 OK queued")
+            elif command in {"RSET", "NOOP"}:
+                self._reply("250 OK")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address):
+        super().__init__(address, _SinkHandler)
+        self.messages = []
+
+
+@mail_cli.command("sink")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=1025, show_default=True)
+def sink_command(host, port):
+    """Run a local SMTP server that prints every message it receives."""
+    with SMTPSink((host, port)) as server:
+        click.echo(f"SMTP sink listening on {host}:{port}")
+        server.serve_forever()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import secrets
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -10,6 +11,7 @@ from . import db
 
 
 EVENT_CATEGORY_CHOICES = ["Arts", "Cultural", "Technical", "Science", "Sports"]
+RECURRENCE_FREQUENCIES = ["daily", "weekly", "monthly"]
 
 
 class User(UserMixin, db.Model):
@@ -20,9 +22,14 @@ class User(UserMixin, db.Model):
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
     admin_scope = db.Column(db.String(50), default="super")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    calendar_token = db.Column(db.String(64), unique=True, index=True, nullable=True)
+    # Maintained by ``activity`` on every registration/interest insert or delete.
+    registration_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    interest_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     registrations = db.relationship("Registration", back_populates="user", cascade="all, delete-orphan")
     interests = db.relationship("EventInterest", back_populates="user", cascade="all, delete-orphan")
+    waitlist_entries = db.relationship("WaitlistEntry", back_populates="user", cascade="all, delete-orphan")
 
     def set_password(self, password: str) -> None:
         self.password_hash = generate_password_hash(password)
@@ -30,6 +37,11 @@ class User(UserMixin, db.Model):
     def check_password(self, password: str) -> bool:
         return check_password_hash(self.password_hash, password)
 
+    def reset_calendar_token(self) -> str:
+        """Issue a new secret for the personal calendar feed, revoking the old URL."""
+        self.calendar_token = secrets.token_urlsafe(24)
+        return self.calendar_token
+
     @property
     def is_super_admin(self) -> bool:
         if not self.is_admin:
@@ -39,7 +51,71 @@ class User(UserMixin, db.Model):
         return self.admin_scope.lower() == "super"
 
 
-class Event(db.Model):
+class ScheduleLabelsMixin:
+    @property
+    def date_label(self) -> str:
+        return self.start_time.strftime("%B %d, %Y")
+
+    @property
+    def day_label(self) -> str:
+        return self.start_time.strftime("%A")
+
+    @property
+    def time_range(self) -> str:
+        return f"{self.start_time.strftime('%I:%M %p')} - {self.end_time.strftime('%I:%M %p')}"
+
+
+class EventSeries(ScheduleLabelsMixin, db.Model):
+    """A repeating event stored once and expanded into occurrences on demand.
+
+    ``start_time``/``end_time`` describe the first occurrence. Only occurrences
+    that were edited individually or that hold registrations exist as Event rows.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(150), nullable=False)
+    summary = db.Column(db.String(300), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    location = db.Column(db.String(200), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    capacity = db.Column(db.Integer, nullable=False)
+    event_type = db.Column(db.String(80), nullable=False, default=EVENT_CATEGORY_CHOICES[0])
+    image_url = db.Column(db.String(255), nullable=True)
+    frequency = db.Column(db.String(20), nullable=False, default="weekly")
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    until = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    occurrences = db.relationship("Event", back_populates="series", cascade="all, delete-orphan")
+    exclusions = db.relationship("SeriesExclusion", back_populates="series", cascade="all, delete-orphan")
+
+    @property
+    def duration(self) -> timedelta:
+        return self.end_time - self.start_time
+
+    @property
+    def rule_label(self) -> str:
+        unit = {"daily": "day", "weekly": "week", "monthly": "month"}[self.frequency]
+        label = f"Every {unit}" if self.interval == 1 else f"Every {self.interval} {unit}s"
+        if self.until:
+            label += f" until {self.until.strftime('%b %d, %Y')}"
+        return label
+
+
+class SeriesExclusion(db.Model):
+    """An occurrence removed from a series, so expansion skips it."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    series_id = db.Column(db.Integer, db.ForeignKey("event_series.id"), nullable=False)
+    occurrence_start = db.Column(db.DateTime, nullable=False)
+
+    series = db.relationship("EventSeries", back_populates="exclusions")
+
+    __table_args__ = (db.UniqueConstraint("series_id", "occurrence_start", name="unique_series_exclusion"),)
+
+
+class Event(ScheduleLabelsMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(150), nullable=False)
     summary = db.Column(db.String(300), nullable=False)
@@ -51,28 +127,28 @@ class Event(db.Model):
     event_type = db.Column(db.String(80), nullable=False, default=EVENT_CATEGORY_CHOICES[0])
     image_url = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set on occurrences materialized from a series; ``occurrence_start`` is the slot the rule generated.
+    series_id = db.Column(db.Integer, db.ForeignKey("event_series.id"), nullable=True)
+    occurrence_start = db.Column(db.DateTime, nullable=True)
+    is_exception = db.Column(db.Boolean, nullable=False, default=False)
 
+    series = db.relationship("EventSeries", back_populates="occurrences")
     registrations = db.relationship("Registration", back_populates="event", cascade="all, delete-orphan")
     interests = db.relationship("EventInterest", back_populates="event", cascade="all, delete-orphan")
+    waitlist_entries = db.relationship("WaitlistEntry", back_populates="event", cascade="all, delete-orphan")
 
     @property
     def seats_remaining(self) -> int:
-        return max(self.capacity - len(self.registrations), 0)
+        # Streamed listings load the count with the row (see ``streaming.stream_events``).
+        taken = self.__dict__.get("seats_taken")
+        if taken is None:
+            taken = len(self.registrations)
+        return max(self.capacity - taken, 0)
 
     def has_space(self) -> bool:
         return self.seats_remaining > 0
 
-    @property
-    def date_label(self) -> str:
-        return self.start_time.strftime("%B %d, %Y")
-
-    @property
-    def day_label(self) -> str:
-        return self.start_time.strftime("%A")
-
-    @property
-    def time_range(self) -> str:
-        return f"{self.start_time.strftime('%I:%M %p')} - {self.end_time.strftime('%I:%M %p')}"
+    __table_args__ = (db.Index("ix_event_series_occurrence", "series_id", "occurrence_start", unique=True),)
 
 
 class Registration(db.Model):
@@ -88,11 +164,16 @@ class Registration(db.Model):
     section = db.Column(db.String(60), nullable=True)
     student_uid = db.Column(db.String(60), nullable=True)
     team_selection = db.Column(db.String(80), nullable=True)
+    checked_in_at = db.Column(db.DateTime, nullable=True)
 
     user = db.relationship("User", back_populates="registrations")
     event = db.relationship("Event", back_populates="registrations")
 
-    __table_args__ = (db.UniqueConstraint("user_id", "event_id", name="unique_event_registration"),)
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "event_id", name="unique_event_registration"),
+        # Door scans resolve an attendee by UID, so this index is the whole check-in lookup.
+        db.Index("ix_registration_event_student_uid", "event_id", "student_uid", unique=True),
+    )
 
 
 class EventInterest(db.Model):
@@ -109,6 +190,138 @@ class EventInterest(db.Model):
     __table_args__ = (db.UniqueConstraint("user_id", "event_id", name="unique_event_interest"),)
 
 
+class WaitlistEntry(db.Model):
+    """A queued registration for a full event, promoted in FIFO order as seats open."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Issued from WaitlistQueue.tail on joining; the queue is ordered by it and rows are never renumbered.
+    ticket = db.Column(db.Integer, nullable=False)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    event_id = db.Column(db.Integer, db.ForeignKey("event.id"), nullable=False)
+
+    attendee_name = db.Column(db.String(150), nullable=False)
+    attendee_email = db.Column(db.String(150), nullable=False)
+    department = db.Column(db.String(120), nullable=True)
+    section = db.Column(db.String(60), nullable=True)
+    student_uid = db.Column(db.String(60), nullable=True)
+    team_selection = db.Column(db.String(80), nullable=True)
+
+    user = db.relationship("User", back_populates="waitlist_entries")
+    event = db.relationship("Event", back_populates="waitlist_entries")
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "event_id", name="unique_event_waitlist"),
+        db.Index("ix_waitlist_event_ticket", "event_id", "ticket", unique=True),
+    )
+
+
+class WaitlistQueue(db.Model):
+    """Ticket counters for one event's waitlist, so a place in line is arithmetic rather than a count.
+
+    ``tail`` is the last ticket issued and ``head`` the ticket at the front
+    (``tail + 1`` while the queue is empty).
+    """
+
+    event_id = db.Column(db.Integer, db.ForeignKey("event.id", ondelete="CASCADE"), primary_key=True)
+    tail = db.Column(db.Integer, nullable=False, default=0)
+    head = db.Column(db.Integer, nullable=False, default=1)
+
+
+class WaitlistDeparture(db.Model):
+    """A ticket that left from behind the head; places behind it are one shorter until the head passes it."""
+
+    event_id = db.Column(db.Integer, db.ForeignKey("event.id", ondelete="CASCADE"), primary_key=True)
+    ticket = db.Column(db.Integer, primary_key=True)
+
+
+class Job(db.Model):
+    """Durable unit of background work claimed by ``flask jobs work`` under a time-limited lease."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(80), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(80), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (db.Index("ix_job_status_run_at", "status", "run_at"),)
+
+
+class ChangeLogEntry(db.Model):
+    """Append-only outbox row written in the same transaction as the change it describes."""
+
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    entity = db.Column(db.String(40), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(20), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # AUTOINCREMENT keeps SQLite from reusing sequence numbers after compaction.
+    __table_args__ = (db.Index("ix_change_log_entity", "entity", "entity_id"), {"sqlite_autoincrement": True})
+
+
+class EventRecommendation(db.Model):
+    """One of an event's top-K most similar events, written by ``flask recommendations refresh``."""
+
+    event_id = db.Column(db.Integer, db.ForeignKey("event.id", ondelete="CASCADE"), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    recommended_event_id = db.Column(db.Integer, db.ForeignKey("event.id", ondelete="CASCADE"), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+
+class RecommendationBasket(db.Model):
+    """A user's weight for an event as of the last refresh, so refreshes only redo users who changed."""
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey("event.id", ondelete="CASCADE"), primary_key=True)
+    weight = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (db.Index("ix_recommendation_basket_event", "event_id", "user_id", "weight"),)
+
+
+class DashboardSummary(db.Model):
+    """Admin dashboard header for one scope (``super`` or a category), maintained by ``summaries``."""
+
+    scope = db.Column(db.String(50), primary_key=True)
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+    upcoming_count = db.Column(db.Integer, nullable=False, default=0)
+    # Earliest start counted in ``upcoming_count``; once it has passed the count is redone.
+    next_start = db.Column(db.DateTime, nullable=True)
+    capacity = db.Column(db.Integer, nullable=False, default=0)
+    registration_count = db.Column(db.Integer, nullable=False, default=0)
+    checked_in_count = db.Column(db.Integer, nullable=False, default=0)
+    # JSON list of registrations per hour, newest first; index 0 is ``signup_hour``.
+    signup_hour = db.Column(db.DateTime, nullable=True)
+    signup_buckets = db.Column(db.Text, nullable=False, default="[]")
+
+
+class DataVersion(db.Model):
+    """Monotonic counter bumped whenever catalog data changes, shared by every worker."""
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class IdempotencyKey(db.Model):
+    """Outcome of a form POST, replayed when the same key is submitted again before ``expires_at``."""
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    key = db.Column(db.String(64), primary_key=True)
+    request_path = db.Column(db.String(255), nullable=False)
+    # JSON redirect and flashes; empty while the original request is still finishing.
+    response = db.Column(db.Text, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
 def seed_admin(name: str = "Event Admin", email: str = "admin@example.com", password: str = "admin123") -> Optional[User]:
     """Ensure there is at least one admin user for first-time setup."""
     admin_profiles = [
@@ -191,18 +404,6 @@ def seed_sample_events() -> None:
             event_type="Sports",
             image_url="https://images.unsplash.com/photo-1502877338535-766e1452684a?auto=format&fit=crop&w=900&q=80",
         ),
-        Event(
-            title="Gallery Sketch Jam",
-            summary="Weekly arts meetup with live models, collaborative murals, and feedback corners.",
-            description="""<p>Bring your favorite medium, explore guided warmups, and showcase work-in-progress pieces
-            to the community. Materials table and acoustic playlist provided.</p>""",
-            location="Studio 12 - Arts Annex",
-            start_time=now + timedelta(days=3, hours=18),
-            end_time=now + timedelta(days=3, hours=21),
-            capacity=40,
-            event_type="Arts",
-            image_url="https://images.unsplash.com/photo-1500534314209-a25ddb2bd429?auto=format&fit=crop&w=900&q=80",
-        ),
         Event(
             title="Science Discovery Expo",
             summary="Monthly science fair covering lab breakthroughs, citizen science, and mentorship programs.",
@@ -339,12 +540,33 @@ def seed_sample_events() -> None:
         ),
     ]
 
+    series_samples = [
+        EventSeries(
+            title="Gallery Sketch Jam",
+            summary="Weekly arts meetup with live models, collaborative murals, and feedback corners.",
+            description="""<p>Bring your favorite medium, explore guided warmups, and showcase work-in-progress pieces
+            to the community. Materials table and acoustic playlist provided.</p>""",
+            location="Studio 12 - Arts Annex",
+            start_time=now + timedelta(days=3, hours=18),
+            end_time=now + timedelta(days=3, hours=21),
+            capacity=40,
+            event_type="Arts",
+            image_url="https://images.unsplash.com/photo-1500534314209-a25ddb2bd429?auto=format&fit=crop&w=900&q=80",
+            frequency="weekly",
+        ),
+    ]
+
     created = 0
     for event in quick_filter_samples + samples:
         if Event.query.filter_by(title=event.title).first():
             continue
         db.session.add(event)
         created += 1
+    for series in series_samples:
+        if EventSeries.query.filter_by(title=series.title).first() or Event.query.filter_by(title=series.title).first():
+            continue
+        db.session.add(series)
+        created += 1
 
     if created or pending_commit:
         db.session.commit()
@@ -0,0 +1,40 @@
+"""Job handlers for attendee notifications sent after registration writes commit."""
+from __future__ import annotations
+
+from .jobs import job_handler
+from .mail import send_mail
+from .models import Event, Registration
+
+
+@job_handler("registration.confirmation")
+def send_registration_confirmation(payload: dict) -> None:
+    registration = Registration.query.filter_by(
+        user_id=payload["user_id"], event_id=payload["event_id"]
+    ).first()
+    if registration is None:
+        return
+    event = registration.event
+    body = (
+        f"Hi {registration.attendee_name},\n\n"
+        f"You're registered for {event.title} on {event.date_label}, {event.time_range} at {event.location}.\n"
+        "Arrive 20 minutes early for check-in with your unique ID.\n"
+    )
+    if payload.get("promoted"):
+        body = (
+            f"Hi {registration.attendee_name},\n\n"
+            f"A seat opened up and you've been moved off the waitlist for {event.title}.\n"
+            f"It takes place on {event.date_label}, {event.time_range} at {event.location}.\n"
+        )
+    send_mail(registration.attendee_email, f"Registration confirmed: {event.title}", body)
+
+
+@job_handler("registration.cancelled")
+def send_cancellation_notice(payload: dict) -> None:
+    event = Event.query.get(payload["event_id"])
+    if event is None:
+        return
+    body = (
+        f"Hi {payload['attendee_name']},\n\n"
+        f"Your registration for {event.title} on {event.date_label} has been canceled.\n"
+    )
+    send_mail(payload["attendee_email"], f"Registration canceled: {event.title}", body)
@@ -0,0 +1,31 @@
+"""Opaque keyset cursors over ``(start_time, id)`` orderings."""
+from __future__ import annotations
+
+import base64
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(start_time: datetime, row_id: int) -> str:
+    raw = f"{start_time.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` for anything it did not produce."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        start_raw, id_raw = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(start_raw), int(id_raw)
+    except (ValueError, UnicodeDecodeError) as error:
+        raise ValueError("Invalid cursor.") from error
+
+
+def after_cursor(start_column, id_column, cursor: str, descending: bool = False):
+    """Filter for the rows that follow ``cursor`` in ``(start, id)`` order, or precede it when descending."""
+    start, row_id = decode_cursor(cursor)
+    if descending:
+        return or_(start_column < start, and_(start_column == start, id_column < row_id))
+    return or_(start_column > start, and_(start_column == start, id_column > row_id))
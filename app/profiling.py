@@ -0,0 +1,246 @@
+"""Opt-in memory and CPU profiling for long-running workers, read by admins at ``/admin/profiling``.
+
+Nothing here is installed unless ``PROFILING_ENABLED`` is set. When it is:
+
+* every request records its session identity-map size and ORM rows loaded, per endpoint;
+* ``tracemalloc`` traces allocations, a ``PROFILING_MEMORY_SAMPLE_RATE`` share of
+  requests is snapshotted before and after, and the growth is attributed to the
+  endpoint by source line. Admins can also set a baseline and diff the whole
+  worker against it later;
+* admins can add ``?profile=cpu`` to any page (and ``PROFILING_CPU_SAMPLE_RATE``
+  picks requests at random) to have it sampled by a stack sampler. The result is
+  kept in collapsed-stack format for ``flamegraph.pl`` or speedscope.
+
+All figures are per worker process.
+"""
+from __future__ import annotations
+
+import itertools
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+from flask import Flask, abort, current_app, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+from . import db
+
+
+TOP_SITES = 15
+# tracemalloc's own bookkeeping would otherwise top every diff.
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+)
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def _site(stat) -> str:
+    frame = stat.traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def _collapse(frame) -> str:
+    """One sample as a ``root;...;leaf`` line, the format flamegraph tools read."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})".replace(";", ":"))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """One daemon thread sampling the stacks of whichever request threads are being profiled."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._targets: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, thread_id: int) -> Counter:
+        stacks = Counter()
+        with self._lock:
+            self._targets[thread_id] = stacks
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+                self._thread.start()
+        return stacks
+
+    def unwatch(self, thread_id: int) -> None:
+        with self._lock:
+            self._targets.pop(thread_id, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._targets:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, stacks in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[_collapse(frame)] += 1
+            time.sleep(self.interval)
+
+
+class Profiler:
+    """Per-endpoint session, allocation and CPU figures for this worker."""
+
+    def __init__(self, config):
+        self.memory_sample_rate = config["PROFILING_MEMORY_SAMPLE_RATE"]
+        self.cpu_sample_rate = config["PROFILING_CPU_SAMPLE_RATE"]
+        self.sampler = StackSampler(config["PROFILING_CPU_INTERVAL"])
+        self.profiles = deque(maxlen=config["PROFILING_KEEP_PROFILES"])
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self._routes: Dict[str, dict] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _route(self, endpoint: str) -> dict:
+        return self._routes.setdefault(
+            endpoint,
+            {
+                "requests": 0,
+                "identity_map_total": 0,
+                "identity_map_max": 0,
+                "rows_loaded_total": 0,
+                "rows_loaded_max": 0,
+                "memory_samples": 0,
+                "memory_net_bytes": 0,
+                "memory_sites": Counter(),
+            },
+        )
+
+    def record_session(self, endpoint: str, identity_map: int, rows_loaded: int) -> None:
+        with self._lock:
+            route = self._route(endpoint)
+            route["requests"] += 1
+            route["identity_map_total"] += identity_map
+            route["identity_map_max"] = max(route["identity_map_max"], identity_map)
+            route["rows_loaded_total"] += rows_loaded
+            route["rows_loaded_max"] = max(route["rows_loaded_max"], rows_loaded)
+
+    def record_allocations(self, endpoint: str, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot) -> None:
+        stats = after.compare_to(before, "lineno")
+        with self._lock:
+            route = self._route(endpoint)
+            route["memory_samples"] += 1
+            route["memory_net_bytes"] += sum(stat.size_diff for stat in stats)
+            for stat in stats[:TOP_SITES]:
+                if stat.size_diff > 0:
+                    route["memory_sites"][_site(stat)] += stat.size_diff
+
+    def record_profile(self, endpoint: str, path: str, seconds: float, stacks: Counter) -> None:
+        with self._lock:
+            self.profiles.append(
+                {
+                    "id": next(self._ids),
+                    "endpoint": endpoint,
+                    "path": path,
+                    "duration_ms": round(seconds * 1000, 2),
+                    "samples": sum(stacks.values()),
+                    "stacks": stacks,
+                }
+            )
+
+    def profile(self, profile_id: int) -> Optional[dict]:
+        with self._lock:
+            return next((profile for profile in self.profiles if profile["id"] == profile_id), None)
+
+    def set_baseline(self) -> None:
+        self.baseline = _snapshot()
+
+    def growth_since_baseline(self, limit: int = 25) -> List[dict]:
+        """Source lines that gained the most memory since :meth:`set_baseline`."""
+        if self.baseline is None or not tracemalloc.is_tracing():
+            return []
+        stats = _snapshot().compare_to(self.baseline, "lineno")
+        return [
+            {"site": _site(stat), "size_diff": stat.size_diff, "count_diff": stat.count_diff, "size": stat.size}
+            for stat in stats[:limit]
+        ]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routes = {
+                endpoint: {**route, "memory_sites": Counter(route["memory_sites"])}
+                for endpoint, route in self._routes.items()
+            }
+            profiles = [{name: value for name, value in profile.items() if name != "stacks"} for profile in self.profiles]
+        for route in routes.values():
+            requests = route["requests"] or 1
+            route["identity_map_mean"] = round(route.pop("identity_map_total") / requests, 1)
+            route["rows_loaded_mean"] = round(route.pop("rows_loaded_total") / requests, 1)
+            route["memory_sites"] = [
+                {"site": site, "bytes": size} for site, size in route["memory_sites"].most_common(TOP_SITES)
+            ]
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "tracemalloc": {"tracing": tracemalloc.is_tracing(), "traced_bytes": traced, "peak_bytes": peak},
+            "baseline_set": self.baseline is not None,
+            "endpoints": routes,
+            "cpu_profiles": profiles,
+        }
+
+
+def profiler() -> Profiler:
+    """The worker's profiler; 404 when profiling is disabled, so the admin routes vanish with it."""
+    extension = current_app.extensions.get("profiling")
+    if extension is None:
+        abort(404)
+    return extension
+
+
+def _count_loaded(session, instance) -> None:
+    if has_request_context():
+        g.profiling_rows_loaded = g.get("profiling_rows_loaded", 0) + 1
+
+
+def _start_request() -> None:
+    profiler = current_app.extensions["profiling"]
+    g.profiling_started = time.perf_counter()
+    if tracemalloc.is_tracing() and random.random() < profiler.memory_sample_rate:
+        g.profiling_before = _snapshot()
+    wants_cpu = request.args.get("profile") == "cpu" and current_user.is_authenticated and current_user.is_admin
+    if wants_cpu or random.random() < profiler.cpu_sample_rate:
+        g.profiling_stacks = profiler.sampler.watch(threading.get_ident())
+
+
+def _finish_request(exc) -> None:
+    if "profiling_started" not in g:
+        return
+    profiler = current_app.extensions["profiling"]
+    endpoint = request.endpoint or "<unmatched>"
+    stacks = g.pop("profiling_stacks", None)
+    if stacks is not None:
+        profiler.sampler.unwatch(threading.get_ident())
+        profiler.record_profile(endpoint, request.full_path.rstrip("?"), time.perf_counter() - g.profiling_started, stacks)
+    before = g.pop("profiling_before", None)
+    if before is not None:
+        profiler.record_allocations(endpoint, before, _snapshot())
+    profiler.record_session(endpoint, len(db.session.identity_map), g.get("profiling_rows_loaded", 0))
+
+
+def init_profiling(app: Flask) -> None:
+    if not app.config["PROFILING_ENABLED"]:
+        return
+    app.extensions["profiling"] = Profiler(app.config)
+    if app.config["PROFILING_TRACEMALLOC_FRAMES"] and not tracemalloc.is_tracing():
+        tracemalloc.start(app.config["PROFILING_TRACEMALLOC_FRAMES"])
+    if not sa_event.contains(Session, "loaded_as_persistent", _count_loaded):
+        sa_event.listen(Session, "loaded_as_persistent", _count_loaded)
+    app.before_request(_start_request)
+    # Teardown runs after streamed bodies finish, so streamed pages are measured whole.
+    app.teardown_request(_finish_request)
@@ -0,0 +1,285 @@
+"""Item-item event recommendations precomputed from registrations and interests."""
+from __future__ import annotations
+
+import heapq
+import json
+import math
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import and_, delete, func, insert, or_, select, union
+
+from . import db
+from .models import ChangeLogEntry, DataVersion, Event, EventInterest, EventRecommendation, RecommendationBasket, Registration
+
+
+# DataVersion row holding the last change-log sequence number folded into the model.
+MODEL_CURSOR = "recommendations"
+DEFAULT_TOP_K = 10
+# A registration is a stronger signal than a saved interest.
+SIGNAL_WEIGHTS = {"registration": 1.0, "interest": 0.5}
+# Pair counting is quadratic per user, so very long histories only contribute their latest events.
+MAX_BASKET = 200
+
+recommendations_cli = AppGroup("recommendations", help="Build the event recommendation model.")
+
+Neighbours = List[Tuple[int, float]]
+
+_basket = RecommendationBasket.__table__
+
+
+def _baskets(user_ids: Optional[Set[int]] = None) -> Dict[int, Dict[int, float]]:
+    """Sparse user x event weight matrix, one dict row per user (only ``user_ids`` when given)."""
+    baskets: Dict[int, Dict[int, float]] = defaultdict(dict)
+    signals = (
+        ("registration", Registration, select(Registration.user_id, Registration.event_id).order_by(Registration.id.desc())),
+        ("interest", EventInterest, select(EventInterest.user_id, EventInterest.event_id).order_by(EventInterest.id.desc())),
+    )
+    for kind, model, statement in signals:
+        weight = SIGNAL_WEIGHTS[kind]
+        if user_ids is not None:
+            statement = statement.where(model.user_id.in_(user_ids))
+        for user_id, event_id in db.session.execute(statement.execution_options(yield_per=1000)):
+            basket = baskets[user_id]
+            if basket.get(event_id, 0.0) < weight and (event_id in basket or len(basket) < MAX_BASKET):
+                basket[event_id] = weight
+    return baskets
+
+
+def _store_baskets(baskets: Dict[int, Dict[int, float]], user_ids: Optional[Set[int]] = None) -> Set[int]:
+    """Replace the stored baskets of ``user_ids`` (everyone when None) and return the events whose weights moved."""
+    stored = select(_basket.c.user_id, _basket.c.event_id, _basket.c.weight)
+    if user_ids is not None:
+        stored = stored.where(_basket.c.user_id.in_(user_ids))
+    before: Dict[int, Dict[int, float]] = defaultdict(dict)
+    for user_id, event_id, weight in db.session.execute(stored):
+        before[user_id][event_id] = weight
+
+    moved = set()
+    for user_id in set(before) | set(baskets):
+        old, new = before.get(user_id, {}), baskets.get(user_id, {})
+        moved.update(event_id for event_id in old.keys() | new.keys() if old.get(event_id) != new.get(event_id))
+
+    removed = delete(_basket)
+    db.session.execute(removed if user_ids is None else removed.where(_basket.c.user_id.in_(user_ids)))
+    rows = [
+        {"user_id": user_id, "event_id": event_id, "weight": weight}
+        for user_id, basket in baskets.items()
+        for event_id, weight in basket.items()
+    ]
+    if rows:
+        db.session.execute(insert(_basket), rows)
+    return moved
+
+
+def _affected_events(moved: Set[int]) -> Set[int]:
+    """Events whose neighbour lists can change when the weights of ``moved`` events change.
+
+    That is the moved events themselves, everything that now shares a user with
+    one of them, and everything whose stored list still names one of them.
+    """
+    if not moved:
+        return set()
+    mine, theirs = _basket.alias(), _basket.alias()
+    sharing = (
+        select(theirs.c.event_id)
+        .join(mine, mine.c.user_id == theirs.c.user_id)
+        .where(mine.c.event_id.in_(moved))
+        .distinct()
+    )
+    listing = select(EventRecommendation.event_id).where(EventRecommendation.recommended_event_id.in_(moved)).distinct()
+    return moved | set(db.session.execute(sharing).scalars()) | set(db.session.execute(listing).scalars())
+
+
+def build_model(event_ids: Set[int], top_k: int = DEFAULT_TOP_K) -> Dict[int, Neighbours]:
+    """Top-K cosine neighbours of ``event_ids`` over the stored user x event matrix.
+
+    The database multiplies only the columns of the requested events with the
+    columns they share a user with, so the cost follows their non-zero products
+    rather than the size of the whole matrix.
+    """
+    if not event_ids:
+        return {}
+    mine, theirs = _basket.alias(), _basket.alias()
+    products = db.session.execute(
+        select(mine.c.event_id, theirs.c.event_id, func.sum(mine.c.weight * theirs.c.weight))
+        .join(theirs, and_(theirs.c.user_id == mine.c.user_id, theirs.c.event_id != mine.c.event_id))
+        .where(mine.c.event_id.in_(event_ids))
+        .group_by(mine.c.event_id, theirs.c.event_id)
+    ).all()
+    dots: Dict[int, Dict[int, float]] = defaultdict(dict)
+    for event_id, other_id, dot in products:
+        dots[event_id][other_id] = dot
+    columns = set(dots) | {other_id for row in dots.values() for other_id in row}
+    norms = dict(
+        db.session.execute(
+            select(_basket.c.event_id, func.sum(_basket.c.weight * _basket.c.weight))
+            .where(_basket.c.event_id.in_(columns))
+            .group_by(_basket.c.event_id)
+        ).all()
+    )
+
+    model = {}
+    for event_id, row in dots.items():
+        scored = (
+            (dot / math.sqrt(norms[event_id] * norms[other_id]), other_id)
+            for other_id, dot in row.items()
+        )
+        model[event_id] = [(other_id, round(score, 6)) for score, other_id in heapq.nlargest(top_k, scored)]
+    return model
+
+
+def _stored_model(event_ids: Set[int]) -> Dict[int, Neighbours]:
+    stored: Dict[int, Neighbours] = defaultdict(list)
+    rows = db.session.execute(
+        select(EventRecommendation.event_id, EventRecommendation.recommended_event_id, EventRecommendation.score)
+        .where(EventRecommendation.event_id.in_(event_ids))
+        .order_by(EventRecommendation.event_id, EventRecommendation.rank)
+    )
+    for event_id, recommended_event_id, score in rows:
+        stored[event_id].append((recommended_event_id, round(score, 6)))
+    return stored
+
+
+def _signal_changes():
+    """Change-log entries that can move the model: signals added or removed, and deleted events."""
+    return or_(
+        and_(ChangeLogEntry.entity.in_(("registration", "interest")), ChangeLogEntry.action.in_(("create", "delete"))),
+        and_(ChangeLogEntry.entity == "event", ChangeLogEntry.action == "delete"),
+    )
+
+
+def _signal_cursor() -> int:
+    """Sequence number of the latest change that can move the model."""
+    return db.session.execute(select(func.max(ChangeLogEntry.seq)).where(_signal_changes())).scalar() or 0
+
+
+def _changed_users(since: int, until: int) -> Optional[Set[int]]:
+    """Users whose baskets the change log says moved, or None when a change cannot be traced to a user.
+
+    Deletions only log the row id, so their user comes from the row's create
+    entry; deleted events take their stored basket entries with them.
+    """
+    entries = db.session.execute(
+        select(ChangeLogEntry.entity, ChangeLogEntry.entity_id, ChangeLogEntry.action, ChangeLogEntry.payload).where(
+            ChangeLogEntry.seq > since, ChangeLogEntry.seq <= until, _signal_changes()
+        )
+    ).all()
+    users: Set[int] = set()
+    deleted: Dict[str, Set[int]] = defaultdict(set)
+    for entity, entity_id, action, payload in entries:
+        if action == "create":
+            users.add(json.loads(payload)["user_id"])
+        else:
+            deleted[entity].add(entity_id)
+
+    for entity in ("registration", "interest"):
+        if not deleted[entity]:
+            continue
+        created = dict(
+            db.session.execute(
+                select(ChangeLogEntry.entity_id, ChangeLogEntry.payload).where(
+                    ChangeLogEntry.entity == entity,
+                    ChangeLogEntry.action == "create",
+                    ChangeLogEntry.entity_id.in_(deleted[entity]),
+                )
+            ).all()
+        )
+        if len(created) < len(deleted[entity]):
+            # Compacted away; only a full rebuild can tell whose basket lost the row.
+            return None
+        users.update(json.loads(payload)["user_id"] for payload in created.values())
+    if deleted["event"]:
+        users.update(db.session.execute(select(_basket.c.user_id).where(_basket.c.event_id.in_(deleted["event"]))).scalars())
+    return users
+
+
+def refresh(top_k: int = DEFAULT_TOP_K, full: bool = False) -> dict:
+    """Bring the model up to date with the registrations and interests changed since the last run.
+
+    Only the users named by the change log since the previous run have their
+    baskets re-read, and only events within reach of a weight that moved are
+    rescored; of those, only lists that changed are rewritten. The first run,
+    ``full`` and change-log gaps rebuild everything. Runs with no relevant
+    changes are skipped outright.
+    """
+    cursor_row = db.session.get(DataVersion, MODEL_CURSOR)
+    latest = _signal_cursor()
+    if not full and cursor_row is not None and cursor_row.version >= latest:
+        return {"skipped": True, "full": False, "changed": 0, "events": 0}
+
+    users = None
+    if not full and cursor_row is not None and db.session.query(_basket.c.user_id).first() is not None:
+        users = _changed_users(cursor_row.version, latest)
+    if users is None:
+        _store_baskets(_baskets())
+        affected = set(db.session.execute(select(_basket.c.event_id).distinct()).scalars())
+        affected |= set(db.session.execute(select(EventRecommendation.event_id).distinct()).scalars())
+    else:
+        affected = _affected_events(_store_baskets(_baskets(users), users))
+
+    model = build_model(affected, top_k)
+    stored = _stored_model(affected)
+    changed = [event_id for event_id in affected if model.get(event_id, []) != stored.get(event_id, [])]
+    if changed:
+        db.session.execute(delete(EventRecommendation).where(EventRecommendation.event_id.in_(changed)))
+        rows = [
+            {"event_id": event_id, "rank": rank, "recommended_event_id": other_id, "score": score}
+            for event_id in changed
+            for rank, (other_id, score) in enumerate(model.get(event_id, []), start=1)
+        ]
+        if rows:
+            db.session.execute(insert(EventRecommendation), rows)
+
+    if cursor_row is None:
+        db.session.add(DataVersion(name=MODEL_CURSOR, version=latest))
+    else:
+        cursor_row.version = latest
+    db.session.commit()
+    return {"skipped": False, "full": users is None, "changed": len(changed), "events": len(affected)}
+
+
+def recommended_for(user_id: int, limit: int = 6) -> List[Event]:
+    """Upcoming events similar to what the user registered for or saved.
+
+    The neighbour rows for all of the user's events come back from one query
+    on the top-K table's primary key; scores are summed per candidate.
+    """
+    seen = union(
+        select(Registration.event_id).where(Registration.user_id == user_id),
+        select(EventInterest.event_id).where(EventInterest.user_id == user_id),
+    ).subquery()
+    rows = db.session.execute(
+        select(EventRecommendation.event_id, EventRecommendation.recommended_event_id, EventRecommendation.score)
+        .where(EventRecommendation.event_id.in_(select(seen.c.event_id)))
+    ).all()
+    if not rows:
+        return []
+
+    own = {event_id for event_id, _, _ in rows}
+    scores: Dict[int, float] = defaultdict(float)
+    for _, recommended_event_id, score in rows:
+        if recommended_event_id not in own:
+            scores[recommended_event_id] += score
+    if not scores:
+        return []
+
+    candidates = Event.query.filter(Event.id.in_(scores), Event.start_time >= datetime.utcnow()).all()
+    candidates.sort(key=lambda event: (-scores[event.id], event.start_time))
+    return candidates[:limit]
+
+
+@recommendations_cli.command("refresh")
+@click.option("--top-k", default=DEFAULT_TOP_K, show_default=True, help="Neighbours stored per event.")
+@click.option("--full", is_flag=True, help="Rebuild even if nothing changed since the last run.")
+def refresh_command(top_k, full):
+    """Recompute recommendations after new registrations or interests."""
+    result = refresh(top_k=top_k, full=full)
+    if result["skipped"]:
+        click.echo("No new registrations or interests; recommendations are current.")
+    else:
+        scope = "full rebuild" if result["full"] else "incremental"
+        click.echo(f"Updated neighbours for {result['changed']} of {result['events']} rescored event(s) ({scope}).")
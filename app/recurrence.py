@@ -0,0 +1,317 @@
+"""Recurring event series expanded into occurrences only for the window being viewed."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import or_
+
+from . import db
+from .changes import record_change
+from .models import Event, EventSeries, ScheduleLabelsMixin, SeriesExclusion
+from .typeahead import stage_index_update
+from .waitlist import promote_waitlist
+
+
+STAMP_FORMAT = "%Y%m%dT%H%M"
+# Descriptive fields an occurrence inherits from its series.
+SERIES_FIELDS = ("title", "summary", "description", "location", "capacity", "event_type", "image_url")
+
+Rule = Tuple[datetime, str, int]
+
+
+class SeriesEditError(ValueError):
+    """Raised when an edited rule has no slot for a date that was booked or cancelled."""
+
+
+class Occurrence(ScheduleLabelsMixin):
+    """An occurrence nobody has registered for yet; it reads like an Event but has no row."""
+
+    id = None
+    is_exception = False
+
+    def __init__(self, series: EventSeries, start: datetime):
+        self.series = series
+        self.series_id = series.id
+        self.occurrence_start = start
+        self.start_time = start
+        self.end_time = start + series.duration
+        for field in SERIES_FIELDS:
+            setattr(self, field, getattr(series, field))
+
+    @property
+    def stamp(self) -> str:
+        return self.start_time.strftime(STAMP_FORMAT)
+
+    @property
+    def seats_remaining(self) -> int:
+        return self.capacity
+
+    def has_space(self) -> bool:
+        return self.capacity > 0
+
+
+def parse_stamp(stamp: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(stamp, STAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def _add_months(value: datetime, months: int) -> Optional[datetime]:
+    month_index = value.month - 1 + months
+    try:
+        return value.replace(year=value.year + month_index // 12, month=month_index % 12 + 1)
+    except ValueError:
+        # RFC 5545 skips months without the day (e.g. the 31st) rather than clamping.
+        return None
+
+
+def series_rule(series: EventSeries) -> Rule:
+    """The fields that decide which dates a series generates."""
+    return series.start_time, series.frequency, series.interval
+
+
+def _nth_start(rule: Rule, index: int) -> Optional[datetime]:
+    first, frequency, interval = rule
+    if frequency == "monthly":
+        return _add_months(first, index * interval)
+    return first + index * timedelta(days=interval * (7 if frequency == "weekly" else 1))
+
+
+def _slot_index(rule: Rule, start: datetime) -> Optional[int]:
+    first, frequency, interval = rule
+    if frequency == "monthly":
+        index, rest = divmod((start.year - first.year) * 12 + start.month - first.month, interval)
+    else:
+        index, rest = divmod(start - first, timedelta(days=interval * (7 if frequency == "weekly" else 1)))
+    return index if not rest and _nth_start(rule, index) == start else None
+
+
+def occurrence_starts(series: EventSeries, window_start: datetime, window_end: datetime) -> Iterator[datetime]:
+    """Yield the rule's start times falling in ``[window_start, window_end)``.
+
+    The first index inside the window is computed directly, so the cost is
+    proportional to the occurrences returned rather than the age of the series.
+    """
+    first = series.start_time
+    if series.until is not None:
+        window_end = min(window_end, series.until + timedelta(microseconds=1))
+    if window_end <= first:
+        return
+
+    if series.frequency == "monthly":
+        offset = (window_start.year - first.year) * 12 + window_start.month - first.month
+        index = max(offset // series.interval - 1, 0)
+        while True:
+            start = _add_months(first, index * series.interval)
+            index += 1
+            if start is None:
+                continue
+            if start >= window_end:
+                return
+            if start >= window_start:
+                yield start
+        return
+
+    step = timedelta(days=series.interval * (7 if series.frequency == "weekly" else 1))
+    index = 0
+    if window_start > first:
+        index = -((first - window_start) // step)
+    start = first + index * step
+    while start < window_end:
+        yield start
+        start += step
+
+
+def default_window(now: datetime, start_bound=None, end_bound=None, upcoming_after=None):
+    """Bound an open-ended listing so series without an end date stay finite."""
+    horizon = timedelta(days=current_app.config["SERIES_HORIZON_DAYS"])
+    start = start_bound or now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if upcoming_after is not None:
+        start = max(start, upcoming_after)
+    return start, end_bound or now + horizon
+
+
+def occurrences_between(
+    window_start: datetime,
+    window_end: datetime,
+    category: Optional[str] = None,
+    search_query: str = "",
+) -> List[Occurrence]:
+    """Unmaterialized occurrences starting in the window, in start order.
+
+    Materialized occurrences are real Event rows and come back from the normal
+    event queries, so they and excluded dates are skipped here.
+    """
+    query = EventSeries.query.filter(
+        EventSeries.start_time < window_end,
+        or_(EventSeries.until.is_(None), EventSeries.until >= window_start),
+    )
+    if category:
+        query = query.filter(EventSeries.event_type == category)
+    if search_query:
+        pattern = f"%{search_query}%"
+        query = query.filter(
+            or_(
+                EventSeries.title.ilike(pattern),
+                EventSeries.summary.ilike(pattern),
+                EventSeries.location.ilike(pattern),
+            )
+        )
+    series_list = query.all()
+    if not series_list:
+        return []
+
+    series_ids = [series.id for series in series_list]
+    taken = set(
+        db.session.query(Event.series_id, Event.occurrence_start).filter(
+            Event.series_id.in_(series_ids),
+            Event.occurrence_start >= window_start,
+            Event.occurrence_start < window_end,
+        )
+    )
+    taken.update(
+        db.session.query(SeriesExclusion.series_id, SeriesExclusion.occurrence_start).filter(
+            SeriesExclusion.series_id.in_(series_ids),
+            SeriesExclusion.occurrence_start >= window_start,
+            SeriesExclusion.occurrence_start < window_end,
+        )
+    )
+
+    occurrences = [
+        Occurrence(series, start)
+        for series in series_list
+        for start in occurrence_starts(series, window_start, window_end)
+        if (series.id, start) not in taken
+    ]
+    occurrences.sort(key=lambda occurrence: occurrence.start_time)
+    return occurrences
+
+
+def occurrence_facet_rows(search_query: str, windows: dict, upcoming_after: Optional[datetime], now: datetime) -> dict:
+    """Per-category occurrence counts shaped like the facet query rows."""
+    rows = {}
+    spans = {"all": default_window(now, upcoming_after=upcoming_after), **windows}
+    for name, (start, end) in spans.items():
+        if upcoming_after is not None:
+            start = max(start, upcoming_after)
+        for occurrence in occurrences_between(start, end, search_query=search_query):
+            counts = rows.setdefault(occurrence.event_type, dict.fromkeys(spans, 0))
+            counts[name] += 1
+    return rows
+
+
+def merge_by_start(events: List[Event], occurrences: List[Occurrence], limit: Optional[int] = None) -> list:
+    merged = sorted([*events, *occurrences], key=lambda item: item.start_time)
+    return merged if limit is None else merged[:limit]
+
+
+def find_occurrence(series_id: int, stamp: str):
+    """Resolve an occurrence URL to its Event row, a virtual Occurrence, or None."""
+    series = db.session.get(EventSeries, series_id)
+    start = parse_stamp(stamp)
+    if series is None or start is None:
+        return None
+    event = Event.query.filter_by(series_id=series.id, occurrence_start=start).first()
+    if event is not None:
+        return event
+    if start not in occurrence_starts(series, start, start + timedelta(minutes=1)):
+        return None
+    excluded = SeriesExclusion.query.filter_by(series_id=series.id, occurrence_start=start).first()
+    return None if excluded else Occurrence(series, start)
+
+
+def materialize(occurrence: Occurrence, exception: bool = False) -> Event:
+    """Create the Event row for an occurrence inside the current transaction. The caller commits."""
+    event = Event(
+        series_id=occurrence.series_id,
+        occurrence_start=occurrence.occurrence_start,
+        start_time=occurrence.start_time,
+        end_time=occurrence.end_time,
+        is_exception=exception,
+        **{field: getattr(occurrence, field) for field in SERIES_FIELDS},
+    )
+    db.session.add(event)
+    stage_index_update(event)
+    record_change(event, "create")
+    return event
+
+
+def exclude_occurrence(series: EventSeries, start: datetime) -> None:
+    """Drop one date from the series. The caller commits."""
+    if SeriesExclusion.query.filter_by(series_id=series.id, occurrence_start=start).first():
+        return
+    exclusion = SeriesExclusion(series_id=series.id, occurrence_start=start)
+    db.session.add(exclusion)
+    record_change(exclusion, "create")
+
+
+def _move_slots(series: EventSeries, previous_rule: Rule) -> None:
+    """Re-key materialized occurrences and exclusions to the same slot under the edited rule.
+
+    The n-th date of the old rule becomes the n-th date of the new one, so a
+    booked or cancelled date follows a change of time, day or frequency instead
+    of reappearing as a fresh virtual occurrence next to its old row.
+    """
+    rule = series_rule(series)
+    if rule == previous_rule:
+        return
+    rows = [
+        *Event.query.filter_by(series_id=series.id),
+        *SeriesExclusion.query.filter_by(series_id=series.id),
+    ]
+    moves = []
+    for row in rows:
+        index = _slot_index(previous_rule, row.occurrence_start)
+        target = None if index is None else _nth_start(rule, index)
+        if target is None:
+            raise SeriesEditError(
+                f"The new schedule has no date matching {row.occurrence_start:%b %d, %Y}. "
+                "Cancel or reschedule that date first."
+            )
+        moves.append((row, target))
+    # Park every row on a distinct placeholder first so the unique (series, slot)
+    # indexes never see two rows on the same date mid-move.
+    for row, _ in moves:
+        row.occurrence_start = datetime.min + timedelta(minutes=row.id)
+    db.session.flush()
+    for row, target in moves:
+        row.occurrence_start = target
+        if isinstance(row, SeriesExclusion) or row.is_exception:
+            record_change(row, "update")
+
+
+def apply_series_edit(series: EventSeries, previous_rule: Optional[Rule] = None) -> int:
+    """Carry a series edit over to its materialized occurrences and exclusions.
+
+    Virtual occurrences pick the change up for free, so this touches only the
+    rows that hold registrations or cancellations. Rows edited on their own keep
+    their fields and times but still follow the rule to their new slot. Raises
+    :class:`SeriesEditError` if a booked or cancelled date has no slot under the
+    new rule; the caller rolls back.
+    """
+    _move_slots(series, previous_rule or series_rule(series))
+    updated = 0
+    for event in Event.query.filter_by(series_id=series.id, is_exception=False):
+        previous_capacity = event.capacity
+        for field in SERIES_FIELDS:
+            setattr(event, field, getattr(series, field))
+        event.start_time = event.occurrence_start
+        event.end_time = event.occurrence_start + series.duration
+        stage_index_update(event)
+        record_change(event, "update")
+        if event.capacity > previous_capacity:
+            promote_waitlist(event)
+        updated += 1
+    return updated
+
+
+def remove_series(series: EventSeries) -> None:
+    """Remove a series with its materialized occurrences. The caller commits."""
+    for event in series.occurrences:
+        stage_index_update(event, removed=True)
+        record_change(event, "delete")
+    record_change(series, "delete")
+    db.session.delete(series)
@@ -0,0 +1,128 @@
+"""Bulk registration of department rosters in a single transaction."""
+from __future__ import annotations
+
+import csv
+import io
+from typing import List
+
+from sqlalchemy import func, or_
+
+from . import db
+from .changes import record_change
+from .jobs import enqueue
+from .models import Event, EventInterest, Registration, User, WaitlistEntry
+
+
+MAX_ROSTER_ROWS = 2000
+ROSTER_COLUMNS = ("email", "attendee_name", "department", "section", "student_uid", "team_selection")
+
+
+class RosterError(ValueError):
+    """Raised when the uploaded file cannot be read as a roster at all."""
+
+
+def parse_roster(stream) -> List[dict]:
+    text = stream.read()
+    if isinstance(text, bytes):
+        try:
+            text = text.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise RosterError("The roster must be a UTF-8 encoded CSV file.")
+    reader = csv.DictReader(io.StringIO(text))
+    headers = [(header or "").strip().lower() for header in reader.fieldnames or []]
+    if "email" not in headers or "student_uid" not in headers:
+        raise RosterError("The roster needs at least 'email' and 'student_uid' columns.")
+    reader.fieldnames = headers
+
+    rows = []
+    for line_number, raw in enumerate(reader, start=2):
+        if len(rows) == MAX_ROSTER_ROWS:
+            raise RosterError(f"Rosters are limited to {MAX_ROSTER_ROWS} rows per upload.")
+        row = {column: (raw.get(column) or "").strip() for column in ROSTER_COLUMNS}
+        row["email"] = row["email"].lower()
+        row["line"] = line_number
+        rows.append(row)
+    return rows
+
+
+def register_roster(event: Event, rows: List[dict], team_options) -> List[dict]:
+    """Register every eligible row and return one result per row. The caller commits.
+
+    Users, duplicates and capacity are each resolved with one query for the
+    whole batch rather than once per attendee.
+    """
+    results = [{"line": row["line"], "email": row["email"], "status": None, "detail": ""} for row in rows]
+
+    emails = {row["email"] for row in rows if row["email"]}
+    uids = {row["student_uid"] for row in rows if row["student_uid"]}
+    users = {user.email: user for user in User.query.filter(User.email.in_(emails))} if emails else {}
+
+    taken_user_ids, taken_uids = set(), set()
+    if users or uids:
+        for user_id, student_uid in db.session.query(Registration.user_id, Registration.student_uid).filter(
+            Registration.event_id == event.id,
+            or_(Registration.user_id.in_([user.id for user in users.values()]), Registration.student_uid.in_(uids)),
+        ):
+            taken_user_ids.add(user_id)
+            taken_uids.add(student_uid)
+        for user_id, student_uid in db.session.query(WaitlistEntry.user_id, WaitlistEntry.student_uid).filter(
+            WaitlistEntry.event_id == event.id,
+            or_(WaitlistEntry.user_id.in_([user.id for user in users.values()]), WaitlistEntry.student_uid.in_(uids)),
+        ):
+            taken_user_ids.add(user_id)
+            taken_uids.add(student_uid)
+
+    eligible = []
+    for row, result in zip(rows, results):
+        user = users.get(row["email"])
+        if not row["email"] or not row["student_uid"]:
+            result.update(status="invalid", detail="Email and unique ID are required.")
+        elif row["team_selection"] and row["team_selection"] not in team_options:
+            result.update(status="invalid", detail=f"Unknown team option {row['team_selection']!r}.")
+        elif user is None:
+            result.update(status="no_account", detail="No account uses this email.")
+        elif user.id in taken_user_ids:
+            result.update(status="duplicate", detail="Already registered or waitlisted.")
+        elif row["student_uid"] in taken_uids:
+            result.update(status="duplicate", detail="Unique ID already used for this event.")
+        else:
+            taken_user_ids.add(user.id)
+            taken_uids.add(row["student_uid"])
+            eligible.append((row, result, user))
+
+    registered_count = db.session.query(func.count(Registration.id)).filter_by(event_id=event.id).scalar()
+    remaining = max(event.capacity - registered_count, 0)
+
+    registrations = []
+    for index, (row, result, user) in enumerate(eligible):
+        if index >= remaining:
+            result.update(status="full", detail="No seats left for this row.")
+            continue
+        registration = Registration(
+            user_id=user.id,
+            event_id=event.id,
+            attendee_name=row["attendee_name"] or user.name,
+            attendee_email=row["email"],
+            department=row["department"] or None,
+            section=row["section"] or None,
+            student_uid=row["student_uid"],
+            team_selection=row["team_selection"] or None,
+        )
+        registrations.append(registration)
+        result.update(status="registered", detail="")
+
+    if not registrations:
+        return results
+
+    db.session.add_all(registrations)
+    db.session.flush()
+    registered_user_ids = [registration.user_id for registration in registrations]
+    for interest in EventInterest.query.filter(
+        EventInterest.event_id == event.id, EventInterest.user_id.in_(registered_user_ids)
+    ):
+        record_change(interest, "delete")
+        db.session.delete(interest)
+    for registration in registrations:
+        record_change(registration, "create")
+        enqueue("registration.confirmation", {"user_id": registration.user_id, "event_id": event.id})
+    return results
@@ -0,0 +1,170 @@
+"""Read/write routing: GET requests read from replica binds, everything else uses the primary."""
+from __future__ import annotations
+
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import click
+from flask import current_app, has_request_context, request, session as http_session
+from flask.cli import AppGroup
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event as sa_event, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+# Cookie key holding the time until which this client's reads go to the primary.
+PIN_KEY = "_primary_until"
+
+replicas_cli = AppGroup("replicas", help="Inspect read replicas and run the local replication stand-in.")
+
+_health: Dict[str, dict] = {}
+_health_lock = threading.Lock()
+
+
+class RoutingSession(Session):
+    """``db.session`` class that sends reads from read-only requests to a replica bind.
+
+    Anything that may write (flushes, DML statements, ``session.connection()``),
+    anything outside a request, and every request from a client that wrote
+    within ``READ_YOUR_WRITES_SECONDS`` goes to the primary. A request keeps
+    the replica it started on so its reads see one snapshot.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and clause is not None and getattr(clause, "is_select", False) and self._reads_from_replica():
+            replica = self.info.get("replica")
+            if replica is None:
+                replica = self.info["replica"] = _pick_replica() or ""
+            if replica:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self) -> bool:
+        if not has_request_context() or not current_app.config["DATABASE_REPLICAS"]:
+            return False
+        if request.method not in READ_METHODS or self.info.get("wrote_primary"):
+            return False
+        return http_session.get(PIN_KEY, 0) <= time.time()
+
+
+@sa_event.listens_for(RoutingSession, "after_flush")
+def _mark_primary_write(session, flush_context) -> None:
+    session.info["wrote_primary"] = True
+
+
+def pin_after_write(response):
+    """After a request that wrote, keep this client's reads on the primary for a while."""
+    from . import db
+
+    if current_app.config["DATABASE_REPLICAS"] and db.session.info.get("wrote_primary"):
+        http_session[PIN_KEY] = time.time() + current_app.config["READ_YOUR_WRITES_SECONDS"]
+    return response
+
+
+def _change_position(engine: Engine, after_seq: int = 0):
+    # Imported here: the models import ``db``, which is built with ``RoutingSession``.
+    from .models import ChangeLogEntry
+
+    with engine.connect() as connection:
+        return connection.execute(
+            select(func.max(ChangeLogEntry.seq), func.min(ChangeLogEntry.created_at)).where(ChangeLogEntry.seq > after_seq)
+        ).one()
+
+
+def replica_lag(key: str) -> dict:
+    """How far the replica's change log trails the primary's, in entries and seconds."""
+    from . import db
+
+    try:
+        applied = _change_position(db.engines[key])[0] or 0
+        pending, oldest_pending = _change_position(db.engines[None], applied)
+    except SQLAlchemyError as error:
+        return {"replica": key, "healthy": False, "error": str(error.__cause__ or error)}
+    seconds = (datetime.utcnow() - oldest_pending).total_seconds() if oldest_pending else 0.0
+    return {
+        "replica": key,
+        "healthy": seconds <= current_app.config["REPLICA_MAX_LAG_SECONDS"],
+        "applied_seq": applied,
+        "behind_entries": (pending or applied) - applied,
+        "lag_seconds": round(max(seconds, 0.0), 3),
+    }
+
+
+def replica_status(refresh: bool = False) -> List[dict]:
+    """Lag of every replica, re-measured at most once per ``REPLICA_CHECK_INTERVAL`` seconds."""
+    interval = current_app.config["REPLICA_CHECK_INTERVAL"]
+    now = time.monotonic()
+    statuses = []
+    for key in current_app.config["DATABASE_REPLICAS"]:
+        with _health_lock:
+            known = _health.get(key)
+        if refresh or known is None or now - known["checked_at"] >= interval:
+            known = {**replica_lag(key), "checked_at": now}
+            with _health_lock:
+                _health[key] = known
+        statuses.append({name: value for name, value in known.items() if name != "checked_at"})
+    return statuses
+
+
+def _pick_replica() -> Optional[str]:
+    """A random replica within the lag limit, or ``None`` to read from the primary."""
+    healthy = [status["replica"] for status in replica_status() if status["healthy"]]
+    return random.choice(healthy) if healthy else None
+
+
+def _sqlite_path(engine: Engine) -> str:
+    if engine.url.get_backend_name() != "sqlite" or not engine.url.database:
+        raise click.ClickException("The replication stand-in only copies file-backed SQLite databases.")
+    return engine.url.database
+
+
+def sync_replicas() -> int:
+    """Copy the primary into every replica file with SQLite's online backup."""
+    from . import db
+
+    keys = current_app.config["DATABASE_REPLICAS"]
+    source = sqlite3.connect(_sqlite_path(db.engines[None]))
+    try:
+        for key in keys:
+            target = sqlite3.connect(_sqlite_path(db.engines[key]), timeout=5)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+    finally:
+        source.close()
+    return len(keys)
+
+
+@replicas_cli.command("sync")
+@click.option("--follow", is_flag=True, help="Keep copying every --interval seconds.")
+@click.option("--interval", default=1.0, show_default=True, help="Seconds between copies with --follow.")
+def sync_command(follow, interval):
+    """Local stand-in for replication: copy the primary SQLite file onto each replica."""
+    if not current_app.config["DATABASE_REPLICAS"]:
+        raise click.ClickException("No replicas configured; set DATABASE_REPLICA_URLS.")
+    while True:
+        copied = sync_replicas()
+        if not follow:
+            click.echo(f"Copied the primary to {copied} replica(s).")
+            return
+        time.sleep(interval)
+
+
+@replicas_cli.command("status")
+def status_command():
+    """Print each replica's lag behind the primary."""
+    for status in replica_status(refresh=True):
+        if "error" in status:
+            click.echo(f"{status['replica']}: unavailable ({status['error']})")
+        else:
+            state = "ok" if status["healthy"] else "lagging, reads fall back to primary"
+            click.echo(
+                f"{status['replica']}: {status['behind_entries']} change(s) / {status['lag_seconds']}s behind ({state})"
+            )
@@ -0,0 +1,134 @@
+document.addEventListener("DOMContentLoaded", () => {
+  const kiosk = document.querySelector(".kiosk[data-roster-url]");
+  if (!kiosk) {
+    return;
+  }
+
+  const form = kiosk.querySelector("[data-kiosk-form]");
+  const input = kiosk.querySelector("[data-kiosk-input]");
+  const result = kiosk.querySelector("[data-kiosk-result]");
+  const syncStatus = kiosk.querySelector("[data-kiosk-sync-status]");
+  const checkedInCount = kiosk.querySelector("[data-kiosk-checked-in]");
+  const registeredCount = kiosk.querySelector("[data-kiosk-registered]");
+  const pendingCount = kiosk.querySelector("[data-kiosk-pending]");
+
+  const queueKey = `kiosk-queue-${kiosk.dataset.eventId}`;
+  const batchSize = 200;
+  const syncInterval = 5000;
+  const roster = new Map();
+  let queue = JSON.parse(localStorage.getItem(queueKey) || "[]");
+  let syncing = false;
+
+  const saveQueue = () => {
+    localStorage.setItem(queueKey, JSON.stringify(queue));
+    pendingCount.textContent = queue.length;
+  };
+
+  const showResult = (message, tone) => {
+    result.textContent = message;
+    result.className = `kiosk__result kiosk__result--${tone}`;
+  };
+
+  const refreshCount = () => {
+    let checkedIn = 0;
+    roster.forEach((attendee) => {
+      if (attendee.checked_in_at) {
+        checkedIn += 1;
+      }
+    });
+    checkedInCount.textContent = checkedIn;
+    registeredCount.textContent = roster.size;
+  };
+
+  const loadRoster = () =>
+    fetch(kiosk.dataset.rosterUrl, { headers: { Accept: "application/json" } })
+      .then((response) => response.json())
+      .then((data) => {
+        data.attendees.forEach((attendee) => {
+          const local = roster.get(attendee.uid);
+          if (local && local.checked_in_at && !attendee.checked_in_at) {
+            attendee.checked_in_at = local.checked_in_at;
+          }
+          roster.set(attendee.uid, attendee);
+        });
+        refreshCount();
+        showResult("Ready to scan.", "info");
+      })
+      .catch(() => showResult("Offline: roster could not be loaded. Scans will be queued.", "warning"));
+
+  const sync = () => {
+    if (syncing || !queue.length || !navigator.onLine) {
+      return;
+    }
+    syncing = true;
+    const batch = queue.slice(0, batchSize);
+    fetch(kiosk.dataset.bulkUrl, {
+      method: "POST",
+      headers: { "Content-Type": "application/json", Accept: "application/json" },
+      body: JSON.stringify({ scans: batch }),
+    })
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(`Sync failed with ${response.status}`);
+        }
+        return response.json();
+      })
+      .then((data) => {
+        queue = queue.slice(batch.length);
+        saveQueue();
+        data.results.forEach((item) => {
+          const attendee = roster.get(item.student_uid);
+          if (attendee && item.checked_in_at) {
+            attendee.checked_in_at = item.checked_in_at;
+          }
+        });
+        checkedInCount.textContent = data.checked_in;
+        registeredCount.textContent = data.registered;
+        syncStatus.textContent = `Last synced ${new Date().toLocaleTimeString()}.`;
+      })
+      .catch(() => {
+        syncStatus.textContent = "Sync paused; scans are saved on this device and will retry.";
+      })
+      .finally(() => {
+        syncing = false;
+        if (queue.length >= batchSize) {
+          sync();
+        }
+      });
+  };
+
+  form.addEventListener("submit", (event) => {
+    event.preventDefault();
+    const uid = input.value.trim();
+    input.value = "";
+    input.focus();
+    if (!uid) {
+      return;
+    }
+
+    const attendee = roster.get(uid);
+    if (roster.size && !attendee) {
+      showResult(`${uid} is not on the roster for this event.`, "danger");
+      return;
+    }
+    if (attendee && attendee.checked_in_at) {
+      showResult(`${attendee.name} already checked in at ${new Date(attendee.checked_in_at).toLocaleTimeString()}.`, "warning");
+      return;
+    }
+
+    const scannedAt = new Date().toISOString().replace("Z", "");
+    if (attendee) {
+      attendee.checked_in_at = scannedAt;
+    }
+    queue.push({ uid, scanned_at: scannedAt });
+    saveQueue();
+    refreshCount();
+    showResult(attendee ? `Welcome, ${attendee.name}!` : `${uid} queued for verification.`, "success");
+  });
+
+  window.addEventListener("online", sync);
+  setInterval(sync, syncInterval);
+  setInterval(loadRoster, 60000);
+  saveQueue();
+  loadRoster().then(sync);
+});
@@ -56,4 +56,171 @@ document.addEventListener("DOMContentLoaded", () => {
       flash.classList.add("flash--hide");
     }, 4500);
   });
+
+  // One key per rendered form: double clicks and browser retries replay the first outcome.
+  document.querySelectorAll("input[data-idempotency-key]").forEach((input) => {
+    input.value = window.crypto && crypto.randomUUID
+      ? crypto.randomUUID()
+      : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+  });
+
+  document.querySelectorAll("input[data-suggest-url]").forEach((input) => {
+    const list = document.createElement("ul");
+    list.className = "suggest-list";
+    list.hidden = true;
+    list.setAttribute("role", "listbox");
+    input.insertAdjacentElement("afterend", list);
+
+    let timer = null;
+    let controller = null;
+    let activeIndex = -1;
+
+    const closeList = () => {
+      list.hidden = true;
+      activeIndex = -1;
+    };
+
+    const render = (suggestions) => {
+      list.innerHTML = "";
+      suggestions.forEach((suggestion) => {
+        const item = document.createElement("li");
+        const link = document.createElement("a");
+        link.href = suggestion.url;
+        link.setAttribute("role", "option");
+        const label = document.createElement("span");
+        label.textContent = suggestion.label;
+        const kind = document.createElement("span");
+        kind.className = "suggest-list__kind";
+        kind.textContent = suggestion.kind;
+        link.append(label, kind);
+        item.appendChild(link);
+        list.appendChild(item);
+      });
+      activeIndex = -1;
+      list.hidden = suggestions.length === 0;
+    };
+
+    const fetchSuggestions = () => {
+      const query = input.value.trim();
+      if (!query) {
+        closeList();
+        return;
+      }
+      if (controller) {
+        controller.abort();
+      }
+      controller = new AbortController();
+      const url = `${input.dataset.suggestUrl}?q=${encodeURIComponent(query)}`;
+      fetch(url, { signal: controller.signal, headers: { Accept: "application/json" } })
+        .then((response) => (response.ok ? response.json() : { suggestions: [] }))
+        .then((data) => render(data.suggestions || []))
+        .catch(() => {});
+    };
+
+    input.addEventListener("input", () => {
+      clearTimeout(timer);
+      timer = setTimeout(fetchSuggestions, 150);
+    });
+
+    input.addEventListener("keydown", (event) => {
+      const links = list.querySelectorAll("a");
+      if (list.hidden || !links.length) {
+        return;
+      }
+      if (event.key === "ArrowDown" || event.key === "ArrowUp") {
+        event.preventDefault();
+        const step = event.key === "ArrowDown" ? 1 : -1;
+        activeIndex = (activeIndex + step + links.length) % links.length;
+        links.forEach((link, index) => link.classList.toggle("is-active", index === activeIndex));
+      } else if (event.key === "Enter" && activeIndex >= 0) {
+        event.preventDefault();
+        window.location.href = links[activeIndex].href;
+      } else if (event.key === "Escape") {
+        closeList();
+      }
+    });
+
+    input.addEventListener("blur", () => {
+      setTimeout(closeList, 150);
+    });
+  });
+
+  const liveSeats = document.querySelector("[data-live-seats-url]");
+  if (liveSeats) {
+    let source = null;
+    let pollTimer = null;
+    let polls = 0;
+    const showSeats = (data) => {
+      liveSeats.querySelectorAll("[data-seats-remaining]").forEach((node) => {
+        node.textContent = data.seats_remaining;
+      });
+      const status = liveSeats.querySelector("[data-seat-status]");
+      if (status) {
+        const open = data.seats_remaining > 0;
+        status.textContent = open ? "Registration Open" : "Waitlist Only";
+        status.classList.toggle("chip--info", open);
+        status.classList.toggle("chip--alert", !open);
+      }
+    };
+    const poll = () => {
+      fetch(liveSeats.dataset.liveSeatsPollUrl, { cache: "no-cache", headers: { Accept: "application/json" } })
+        .then((response) => (response.ok ? response.json() : null))
+        .then((data) => data && showSeats(data))
+        .catch(() => {});
+    };
+    const stopPolling = () => {
+      if (pollTimer) {
+        clearInterval(pollTimer);
+        pollTimer = null;
+      }
+    };
+    const openStream = () => {
+      if (!("EventSource" in window)) {
+        startPolling();
+        return;
+      }
+      if (!source) {
+        source = new EventSource(liveSeats.dataset.liveSeatsUrl);
+        source.addEventListener("seats", (message) => {
+          stopPolling();
+          showSeats(JSON.parse(message.data));
+        });
+        source.addEventListener("error", () => {
+          // EventSource gives up for good on a 503 (stream limit reached); poll instead.
+          if (source && source.readyState === EventSource.CLOSED) {
+            source = null;
+            startPolling();
+          }
+        });
+      }
+    };
+    const startPolling = () => {
+      if (pollTimer) {
+        return;
+      }
+      poll();
+      const seconds = Number(liveSeats.dataset.liveSeatsPollSeconds) || 15;
+      pollTimer = setInterval(() => {
+        poll();
+        polls += 1;
+        // Every few polls, see whether a stream slot has freed up.
+        if (polls % 8 === 0) {
+          openStream();
+        }
+      }, seconds * 1000);
+    };
+    const stopUpdates = () => {
+      stopPolling();
+      if (source) {
+        source.close();
+        source = null;
+      }
+    };
+    // Background tabs hand their stream back and stop polling until they are shown again.
+    document.addEventListener("visibilitychange", () => (document.hidden ? stopUpdates() : openStream()));
+    window.addEventListener("pagehide", stopUpdates);
+    if (!document.hidden) {
+      openStream();
+    }
+  }
 });
@@ -0,0 +1,71 @@
+"""Streamed HTML pages for listings that can grow with the catalog."""
+from __future__ import annotations
+
+from typing import Iterable, Iterator
+
+from flask import Response, get_flashed_messages, stream_template
+from markupsafe import Markup
+from sqlalchemy import func, select
+
+from . import db
+from .models import Event, Registration
+
+
+# Templates print ``{{ stream_flush }}`` where the page so far should go out
+# before the rows are queried; it never reaches the client.
+FLUSH_MARKER = "\x1e"
+CHUNK_BYTES = 8 * 1024
+YIELD_PER = 100
+
+_seats_taken = (
+    select(func.count(Registration.id)).where(Registration.event_id == Event.id).correlate(Event).scalar_subquery()
+)
+
+
+def _coalesce(fragments: Iterable[str]) -> Iterator[str]:
+    """Batch Jinja's many small fragments into ~8 KB writes, cutting early at flush markers."""
+    buffer = []
+    size = 0
+    for fragment in fragments:
+        if FLUSH_MARKER in fragment:
+            *ready, fragment = fragment.split(FLUSH_MARKER)
+            buffer.extend(ready)
+            chunk = "".join(buffer)
+            if chunk:
+                yield chunk
+            buffer, size = [], 0
+        buffer.append(fragment)
+        size += len(fragment)
+        if size >= CHUNK_BYTES:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_page(template_name: str, **context) -> Response:
+    """Render ``template_name`` incrementally instead of building the page in memory.
+
+    Row sources in ``context`` should be generators (see ``stream_events``) so
+    rows are fetched from the database as they are written out.
+    """
+    # Pop flashes now: the session cookie is written before the body streams.
+    get_flashed_messages(with_categories=True)
+    context.setdefault("stream_flush", Markup(FLUSH_MARKER))
+    return Response(_coalesce(stream_template(template_name, **context)), mimetype="text/html")
+
+
+def stream_rows(query) -> Iterator:
+    """Iterate a query in batches of ``YIELD_PER`` rows instead of loading it whole."""
+    return iter(query.yield_per(YIELD_PER))
+
+
+def stream_events(query) -> Iterator[Event]:
+    """Like ``stream_rows`` for events, with seat counts fetched alongside each row.
+
+    Saves the per-row lazy load of ``Event.registrations`` that
+    ``seats_remaining`` would otherwise trigger.
+    """
+    for event, seats_taken in query.add_columns(_seats_taken).yield_per(YIELD_PER):
+        event.seats_taken = seats_taken
+        yield event
@@ -0,0 +1,297 @@
+"""Per-scope admin dashboard headers kept current on every event and registration write.
+
+Every admin scope (``super`` plus one per category) has a ``DashboardSummary``
+row, so a dashboard header is one primary-key read whatever the data volume.
+Event and registration flushes fold their deltas into the affected rows in the
+same transaction; check-ins, which are raw UPDATEs, call
+:func:`record_check_ins`. Two figures also depend on the clock:
+
+* ``upcoming_count`` is exact until ``next_start``, the earliest start it
+  counts. The first read after that recounts the scope with one UPDATE.
+* Last-24h signups are kept in hourly buckets, so the window advances an
+  hour at a time.
+"""
+from __future__ import annotations
+
+import json
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import case, event as sa_event, func, inspect, insert, or_, select, true, update
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import EVENT_CATEGORY_CHOICES, DashboardSummary, Event, Registration
+
+
+SUPER_SCOPE = "super"
+SIGNUP_WINDOW_HOURS = 24
+EVENT_FIELDS = ("event_type", "capacity", "start_time")
+
+summaries_cli = AppGroup("summaries", help="Maintain the precomputed admin dashboard headers.")
+
+_summary = DashboardSummary.__table__
+
+
+def _hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _hours_ago(moment: datetime, now: datetime) -> int:
+    return int((_hour(now) - _hour(moment)).total_seconds() // 3600)
+
+
+def _window_start(now: datetime) -> datetime:
+    return _hour(now) - timedelta(hours=SIGNUP_WINDOW_HOURS - 1)
+
+
+def _shift(buckets: List[int], newest: Optional[datetime], now: datetime) -> List[int]:
+    """Re-anchor ``buckets`` on the current hour, dropping hours that left the window."""
+    offset = SIGNUP_WINDOW_HOURS if newest is None else min(max(_hours_ago(newest, now), 0), SIGNUP_WINDOW_HOURS)
+    return ([0] * offset + buckets + [0] * SIGNUP_WINDOW_HOURS)[:SIGNUP_WINDOW_HOURS]
+
+
+class _Delta:
+    """Changes to one scope's row collected during a flush."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.next_start: Optional[datetime] = None
+        self.signups = Counter()
+
+    def add_event(self, capacity: int, start_time: datetime, sign: int, now: datetime) -> None:
+        self.counts["event_count"] += sign
+        self.counts["capacity"] += sign * capacity
+        if start_time >= now:
+            self.counts["upcoming_count"] += sign
+            if sign > 0 and (self.next_start is None or start_time < self.next_start):
+                self.next_start = start_time
+
+    def add_registrations(self, count: int, checked_in: int, created: Iterable[datetime], sign: int, now: datetime) -> None:
+        self.counts["registration_count"] += sign * count
+        self.counts["checked_in_count"] += sign * checked_in
+        for created_at in created:
+            if created_at is not None and 0 <= _hours_ago(created_at, now) < SIGNUP_WINDOW_HOURS:
+                self.signups[_hours_ago(created_at, now)] += sign
+
+
+def _previous(obj, name: str):
+    history = inspect(obj).attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(obj, name)
+
+
+def _event_scopes(session, event_ids) -> Dict[int, str]:
+    scopes = {
+        obj.id: obj.event_type
+        for obj in (*session.new, *session.deleted, *session.dirty)
+        if isinstance(obj, Event) and obj.id in event_ids
+    }
+    missing = set(event_ids) - set(scopes)
+    if missing:
+        rows = session.connection().execute(select(Event.id, Event.event_type).where(Event.id.in_(missing)))
+        scopes.update(dict(rows.all()))
+    return scopes
+
+
+@sa_event.listens_for(Session, "after_flush")
+def _fold_into_summaries(session, flush_context) -> None:
+    now = datetime.utcnow()
+    deltas: Dict[str, _Delta] = defaultdict(_Delta)
+    # Events whose category changed: id -> (old scope, new scope).
+    moved = {}
+
+    for objects, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objects:
+            if isinstance(obj, Event):
+                for scope in (SUPER_SCOPE, obj.event_type):
+                    deltas[scope].add_event(obj.capacity, obj.start_time, sign, now)
+    for obj in session.dirty:
+        if not isinstance(obj, Event) or not session.is_modified(obj, include_collections=False):
+            continue
+        before = tuple(_previous(obj, name) for name in EVENT_FIELDS)
+        after = tuple(getattr(obj, name) for name in EVENT_FIELDS)
+        if before == after:
+            continue
+        for (scope_name, capacity, start_time), sign in ((before, -1), (after, 1)):
+            for scope in (SUPER_SCOPE, scope_name):
+                deltas[scope].add_event(capacity, start_time, sign, now)
+        if before[0] != after[0]:
+            moved[obj.id] = (before[0], after[0])
+
+    registrations = [
+        (obj, sign)
+        for objects, sign in ((session.new, 1), (session.deleted, -1))
+        for obj in objects
+        if isinstance(obj, Registration)
+    ]
+    if registrations:
+        scopes = _event_scopes(session, {obj.event_id for obj, _ in registrations})
+        for obj, sign in registrations:
+            # A moved event's registrations are transferred below from its old scope,
+            # so this flush's own changes are settled against the old scope first.
+            scope = moved[obj.event_id][0] if obj.event_id in moved else scopes.get(obj.event_id)
+            for name in (SUPER_SCOPE, scope):
+                deltas[name].add_registrations(1, int(obj.checked_in_at is not None), [obj.created_at], sign, now)
+
+    for event_id, (old_scope, new_scope) in moved.items():
+        count, checked_in = session.connection().execute(
+            select(func.count(Registration.id), func.count(Registration.checked_in_at)).where(
+                Registration.event_id == event_id
+            )
+        ).one()
+        created = session.connection().execute(
+            select(Registration.created_at).where(
+                Registration.event_id == event_id, Registration.created_at >= _window_start(now)
+            )
+        ).scalars().all()
+        deltas[old_scope].add_registrations(count, checked_in, created, -1, now)
+        deltas[new_scope].add_registrations(count, checked_in, created, 1, now)
+
+    for scope, delta in deltas.items():
+        if scope is not None:
+            _apply(session.connection(), scope, delta, now)
+
+
+def _apply(connection, scope: str, delta: _Delta, now: datetime) -> None:
+    values = {name: _summary.c[name] + change for name, change in delta.counts.items() if change}
+    if delta.next_start is not None:
+        column = _summary.c.next_start
+        values["next_start"] = case((or_(column.is_(None), column > delta.next_start), delta.next_start), else_=column)
+    signups = {hours_ago: change for hours_ago, change in delta.signups.items() if change}
+    if not values and not signups:
+        return
+
+    # Touching the row first also takes its write lock before the buckets are read below.
+    statement = update(_summary).where(_summary.c.scope == scope)
+    result = connection.execute(statement.values(values or {"scope": _summary.c.scope}))
+    if not result.rowcount:
+        # First write to this scope: summarize it from scratch, this flush included.
+        _rebuild_scope(connection, scope, now)
+        return
+    if signups:
+        row = connection.execute(
+            select(_summary.c.signup_hour, _summary.c.signup_buckets).where(_summary.c.scope == scope).with_for_update()
+        ).one()
+        buckets = _shift(json.loads(row.signup_buckets), row.signup_hour, now)
+        for hours_ago, change in signups.items():
+            buckets[hours_ago] = max(buckets[hours_ago] + change, 0)
+        connection.execute(statement.values(signup_hour=_hour(now), signup_buckets=json.dumps(buckets)))
+
+
+def _scope_filter(scope: str):
+    return true() if scope == SUPER_SCOPE else Event.event_type == scope
+
+
+def _rebuild_scope(connection, scope: str, now: datetime):
+    """Recompute ``scope``'s row from the events and registrations tables and return it."""
+    where = _scope_filter(scope)
+    event_count, capacity = connection.execute(
+        select(func.count(Event.id), func.coalesce(func.sum(Event.capacity), 0)).where(where)
+    ).one()
+    upcoming_count, next_start = connection.execute(
+        select(func.count(Event.id), func.min(Event.start_time)).where(where, Event.start_time >= now)
+    ).one()
+    registration_count, checked_in = connection.execute(
+        select(func.count(Registration.id), func.count(Registration.checked_in_at)).join(Event).where(where)
+    ).one()
+    buckets = [0] * SIGNUP_WINDOW_HOURS
+    created = connection.execute(
+        select(Registration.created_at).join(Event).where(where, Registration.created_at >= _window_start(now))
+    ).scalars()
+    for created_at in created:
+        if _hours_ago(created_at, now) >= 0:
+            buckets[_hours_ago(created_at, now)] += 1
+
+    values = {
+        "event_count": event_count,
+        "upcoming_count": upcoming_count,
+        "next_start": next_start,
+        "capacity": capacity,
+        "registration_count": registration_count,
+        "checked_in_count": checked_in,
+        "signup_hour": _hour(now),
+        "signup_buckets": json.dumps(buckets),
+    }
+    row = connection.execute(
+        update(_summary).where(_summary.c.scope == scope).values(values).returning(*_summary.c)
+    ).first()
+    return row or connection.execute(insert(_summary).values(scope=scope, **values).returning(*_summary.c)).one()
+
+
+def _recount_upcoming(connection, scope: str, now: datetime):
+    """Redo ``scope``'s upcoming figures in one UPDATE, so concurrent deltas are not lost, and return the row."""
+    upcoming = (_scope_filter(scope), Event.start_time >= now)
+    return connection.execute(
+        update(_summary)
+        .where(_summary.c.scope == scope)
+        .values(
+            upcoming_count=select(func.count(Event.id)).where(*upcoming).scalar_subquery(),
+            next_start=select(func.min(Event.start_time)).where(*upcoming).scalar_subquery(),
+        )
+        .returning(*_summary.c)
+    ).one()
+
+
+def _known_scopes() -> List[str]:
+    present = db.session.execute(select(Event.event_type).distinct()).scalars()
+    return [SUPER_SCOPE, *dict.fromkeys([*EVENT_CATEGORY_CHOICES, *present])]
+
+
+def rebuild_summaries(scopes: Optional[Iterable[str]] = None) -> int:
+    """Recompute scope rows from scratch. The caller commits."""
+    scopes = list(scopes or _known_scopes())
+    now = datetime.utcnow()
+    for scope in scopes:
+        _rebuild_scope(db.session.connection(), scope, now)
+    return len(scopes)
+
+
+def ensure_summaries() -> None:
+    """Build the rows missing on first launch or after a new category appears."""
+    existing = set(db.session.execute(select(_summary.c.scope)).scalars())
+    missing = [scope for scope in _known_scopes() if scope not in existing]
+    if missing:
+        rebuild_summaries(missing)
+        db.session.commit()
+
+
+def dashboard_summary(scope: str) -> dict:
+    """Header figures for ``scope`` from its summary row."""
+    now = datetime.utcnow()
+    row = db.session.execute(select(_summary).where(_summary.c.scope == scope)).first()
+    if row is None or (row.next_start is not None and row.next_start <= now):
+        # Rows come back from the write itself, since a replica may not have it yet.
+        if row is None:
+            row = _rebuild_scope(db.session.connection(), scope, now)
+        else:
+            row = _recount_upcoming(db.session.connection(), scope, now)
+        db.session.commit()
+    return {
+        "total_events": row.event_count,
+        "upcoming_events": row.upcoming_count,
+        "total_registrations": row.registration_count,
+        "checked_in": row.checked_in_count,
+        "seats_remaining": max(row.capacity - row.registration_count, 0),
+        "recent_signups": sum(_shift(json.loads(row.signup_buckets), row.signup_hour, now)),
+    }
+
+
+def record_check_ins(event_id: int, count: int = 1) -> None:
+    """Add raw-UPDATE check-ins for ``event_id`` to its scope and ``super``. The caller commits."""
+    event_scope = select(Event.event_type).where(Event.id == event_id).scalar_subquery()
+    db.session.execute(
+        update(_summary)
+        .where(or_(_summary.c.scope == SUPER_SCOPE, _summary.c.scope == event_scope))
+        .values(checked_in_count=_summary.c.checked_in_count + count)
+    )
+
+
+@summaries_cli.command("rebuild")
+def rebuild_command():
+    """Recompute every dashboard summary, e.g. after editing the database by hand."""
+    count = rebuild_summaries()
+    db.session.commit()
+    click.echo(f"Rebuilt {count} dashboard summaries.")
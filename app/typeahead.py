@@ -0,0 +1,157 @@
+"""In-process prefix index answering search-box suggestions without a database round trip."""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+from . import db
+from .cache import bump_data_version, current_data_version
+from .models import Event
+
+
+SEARCH_INDEX_VERSION = "search_index"
+SUGGESTION_LIMIT = 8
+MAX_SCAN = 200
+
+# Lower values sort first when ranking matches of equal quality.
+KIND_ORDER = {"event": 0, "category": 1, "location": 2}
+
+# (normalized key, is_word_match, kind, label, event_id)
+Entry = Tuple[str, int, str, str, int]
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _entries_for(event_id: int, title: str, location: str, event_type: str) -> List[Entry]:
+    entries = []
+    for kind, label in (("event", title), ("location", location), ("category", event_type)):
+        words = normalize(label).split(" ")
+        for position in range(len(words)):
+            key = " ".join(words[position:])
+            if key:
+                entries.append((key, 1 if position else 0, kind, label, event_id))
+    return entries
+
+
+class SuggestIndex:
+    """Sorted array of normalized labels and word suffixes searched with ``bisect``."""
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._entries: List[Entry] = []
+        self._by_event: Dict[int, List[Entry]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self) -> None:
+        """Load every event from the database, e.g. at worker start or after a foreign write."""
+        version = current_data_version(SEARCH_INDEX_VERSION, max_age=0)
+        rows = db.session.query(Event.id, Event.title, Event.location, Event.event_type).all()
+        by_event = {row[0]: _entries_for(*row) for row in rows}
+        entries = sorted(entry for items in by_event.values() for entry in items)
+        with self._lock:
+            self._entries = entries
+            self._by_event = by_event
+            self.version = version
+
+    def ensure_current(self) -> None:
+        """Rebuild if another worker changed the catalog since this index was built."""
+        if self.version != current_data_version(SEARCH_INDEX_VERSION):
+            self.rebuild()
+
+    def apply(self, event_id: int, fields: Optional[tuple], version: int) -> None:
+        """Apply one committed change incrementally, or fall back to a rebuild when out of step."""
+        with self._lock:
+            if self.version is None or self.version != version - 1:
+                self.version = None
+                return
+            for entry in self._by_event.pop(event_id, ()):
+                position = bisect_left(self._entries, entry)
+                if position < len(self._entries) and self._entries[position] == entry:
+                    del self._entries[position]
+            if fields is not None:
+                new_entries = _entries_for(event_id, *fields)
+                for entry in new_entries:
+                    insort(self._entries, entry)
+                self._by_event[event_id] = new_entries
+            self.version = version
+
+    def suggest(self, prefix: str, limit: int = SUGGESTION_LIMIT) -> List[dict]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            entries = self._entries
+            position = bisect_left(entries, (prefix,))
+            matches = []
+            while position < len(entries) and len(matches) < MAX_SCAN:
+                entry = entries[position]
+                if not entry[0].startswith(prefix):
+                    break
+                matches.append(entry)
+                position += 1
+
+        matches.sort(key=lambda entry: (entry[1], KIND_ORDER[entry[2]], entry[3].lower()))
+        results = []
+        seen = set()
+        for _, _, kind, label, event_id in matches:
+            marker = (kind, label) if kind != "event" else (kind, event_id)
+            if marker in seen:
+                continue
+            seen.add(marker)
+            results.append({"kind": kind, "label": label, "event_id": event_id if kind == "event" else None})
+            if len(results) == limit:
+                break
+        return results
+
+
+suggest_index = SuggestIndex()
+
+
+def stage_index_update(event: Event, removed: bool = False) -> None:
+    """Record an admin change so the local index picks it up once the transaction commits.
+
+    The shared search version is bumped in the same transaction, which tells the
+    other workers to rebuild on their next suggestion lookup.
+    """
+    session = db.session()
+    session.info.setdefault("search_index_staged", set()).add(id(event))
+    if not removed:
+        session.flush()
+    version = bump_data_version(SEARCH_INDEX_VERSION)
+    fields = None if removed else (event.title, event.location, event.event_type)
+    session.info.setdefault("search_index_updates", []).append((event.id, fields, version))
+
+
+@sa_event.listens_for(Session, "after_flush")
+def _bump_on_unstaged_event_write(session, flush_context) -> None:
+    """Event writes made outside the admin routes (seeding, scripts) force a rebuild everywhere."""
+    if session.info.get("search_index_bumped"):
+        return
+    staged = session.info.get("search_index_staged", ())
+    changed = (*session.new, *session.deleted, *(obj for obj in session.dirty if session.is_modified(obj)))
+    if any(isinstance(obj, Event) and id(obj) not in staged for obj in changed):
+        bump_data_version(SEARCH_INDEX_VERSION, session.connection())
+        session.info["search_index_bumped"] = True
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _apply_staged_updates(session) -> None:
+    session.info.pop("search_index_staged", None)
+    session.info.pop("search_index_bumped", None)
+    for event_id, fields, version in session.info.pop("search_index_updates", ()):
+        suggest_index.apply(event_id, fields, version)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_staged_updates(session) -> None:
+    for key in ("search_index_staged", "search_index_bumped", "search_index_updates"):
+        session.info.pop(key, None)
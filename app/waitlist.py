@@ -0,0 +1,147 @@
+"""FIFO waitlists for full events with promotion inside the caller's transaction.
+
+Each event's queue hands out increasing tickets and tracks the ticket at its
+front, so a place in line is ``ticket - head + 1`` less the few tickets that
+left from the middle, rather than a count of everyone ahead.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import List, Optional
+
+from sqlalchemy import delete, event as sa_event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import db
+from .changes import record_change
+from .jobs import enqueue
+from .models import Event, EventInterest, Registration, WaitlistDeparture, WaitlistEntry, WaitlistQueue
+
+
+ATTENDEE_FIELDS = ("attendee_name", "attendee_email", "department", "section", "student_uid", "team_selection")
+
+_queue = WaitlistQueue.__table__
+_departure = WaitlistDeparture.__table__
+
+
+def waitlist_entry(user_id: int, event_id: int) -> Optional[WaitlistEntry]:
+    return WaitlistEntry.query.filter_by(user_id=user_id, event_id=event_id).first()
+
+
+def waitlist_size(event_id: int) -> int:
+    return db.session.query(func.count(WaitlistEntry.id)).filter_by(event_id=event_id).scalar()
+
+
+def queue_position(entry: WaitlistEntry) -> int:
+    """1-based place of ``entry`` in its queue, from the head ticket and the departures ahead of it."""
+    head = db.session.execute(select(_queue.c.head).where(_queue.c.event_id == entry.event_id)).scalar()
+    departed = db.session.execute(
+        select(func.count())
+        .select_from(_departure)
+        .where(_departure.c.event_id == entry.event_id, _departure.c.ticket < entry.ticket)
+    ).scalar()
+    return entry.ticket - head + 1 - departed
+
+
+def _issue_ticket(event_id: int) -> int:
+    """Take the next ticket with one atomic increment, creating the queue on first use."""
+    ticket = db.session.execute(
+        update(_queue).where(_queue.c.event_id == event_id).values(tail=_queue.c.tail + 1).returning(_queue.c.tail)
+    ).scalar()
+    if ticket is None:
+        ticket = db.session.execute(
+            insert(_queue).values(event_id=event_id, tail=1, head=1).returning(_queue.c.tail)
+        ).scalar()
+    return ticket
+
+
+def join_waitlist(user_id: int, event: Event, details: dict) -> WaitlistEntry:
+    """Append the user to the tail of the event's queue. The caller commits.
+
+    The ticket comes from an increment, not a read, so concurrent joins cannot claim the same place.
+    """
+    entry = WaitlistEntry(
+        user_id=user_id,
+        event_id=event.id,
+        ticket=_issue_ticket(event.id),
+        **{field: details.get(field) for field in ATTENDEE_FIELDS},
+    )
+    db.session.add(entry)
+    return entry
+
+
+def leave_waitlist(entry: WaitlistEntry) -> None:
+    """Remove an entry; :func:`_advance_queues` moves the head or notes the departure. The caller commits."""
+    db.session.delete(entry)
+
+
+def promote_waitlist(event: Event) -> List[Registration]:
+    """Turn queue heads into registrations for every open seat. The caller commits.
+
+    Runs in the same transaction as the cancellation or capacity change that
+    freed the seats, so a seat is never visible as open while a queue exists.
+    """
+    db.session.flush()
+    taken = Registration.query.filter_by(event_id=event.id).count()
+    open_seats = event.capacity - taken
+    if open_seats <= 0:
+        return []
+
+    heads = (
+        WaitlistEntry.query.filter_by(event_id=event.id)
+        .order_by(WaitlistEntry.ticket)
+        .limit(open_seats)
+        .all()
+    )
+    if not heads:
+        return []
+
+    promoted = []
+    promoted_user_ids = [entry.user_id for entry in heads]
+    for entry in heads:
+        registration = Registration(
+            user_id=entry.user_id,
+            event_id=event.id,
+            **{field: getattr(entry, field) for field in ATTENDEE_FIELDS},
+        )
+        db.session.add(registration)
+        record_change(registration, "create")
+        db.session.delete(entry)
+        enqueue("registration.confirmation", {"user_id": entry.user_id, "event_id": event.id, "promoted": True})
+        promoted.append(registration)
+    for interest in EventInterest.query.filter(
+        EventInterest.event_id == event.id, EventInterest.user_id.in_(promoted_user_ids)
+    ):
+        record_change(interest, "delete")
+        db.session.delete(interest)
+    return promoted
+
+
+@sa_event.listens_for(Session, "after_flush")
+def _advance_queues(session, flush_context) -> None:
+    """Keep heads and departures in step with every removal from a queue, in the same transaction.
+
+    Leaving, promotion and deletes cascaded from a user all land in
+    ``session.deleted``; the counters of deleted events go with them.
+    """
+    removed_events = {obj.id for obj in session.deleted if isinstance(obj, Event)}
+    left = defaultdict(list)
+    for obj in session.deleted:
+        if isinstance(obj, WaitlistEntry) and obj.event_id not in removed_events:
+            left[obj.event_id].append(obj.ticket)
+    if not left and not removed_events:
+        return
+
+    connection = session.connection()
+    if removed_events:
+        connection.execute(delete(_queue).where(_queue.c.event_id.in_(removed_events)))
+        connection.execute(delete(_departure).where(_departure.c.event_id.in_(removed_events)))
+    for event_id, tickets in left.items():
+        connection.execute(insert(_departure), [{"event_id": event_id, "ticket": ticket} for ticket in tickets])
+        front = select(func.min(WaitlistEntry.ticket)).where(WaitlistEntry.event_id == event_id).scalar_subquery()
+        connection.execute(
+            update(_queue).where(_queue.c.event_id == event_id).values(head=func.coalesce(front, _queue.c.tail + 1))
+        )
+        # Departures the head has reached no longer shorten anyone's place.
+        head = select(_queue.c.head).where(_queue.c.event_id == event_id).scalar_subquery()
+        connection.execute(delete(_departure).where(_departure.c.event_id == event_id, _departure.c.ticket < head))
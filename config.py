@@ -10,3 +10,83 @@ class Config:
         f"sqlite:///{(BASE_DIR / 'instance' / 'events.db').resolve()}",
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Read replicas, comma-separated URLs registered as binds "replica_0", "replica_1", ...
+    # Reads in GET requests go to a replica within REPLICA_MAX_LAG_SECONDS; a client that
+    # just wrote reads from the primary for READ_YOUR_WRITES_SECONDS.
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    SQLALCHEMY_BINDS = {f"replica_{index}": url for index, url in enumerate(DATABASE_REPLICA_URLS)}
+    DATABASE_REPLICAS = list(SQLALCHEMY_BINDS)
+    READ_YOUR_WRITES_SECONDS = float(os.environ.get("READ_YOUR_WRITES_SECONDS", 10))
+    REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", 30))
+    REPLICA_CHECK_INTERVAL = float(os.environ.get("REPLICA_CHECK_INTERVAL", 5))
+
+    # Live seat availability streams (server-sent events) held open per worker. The gevent
+    # worker serves each stream from a greenlet, so they count against its WEB_CONNECTIONS
+    # (--worker-connections) rather than a thread pool; half is left for pages.
+    WEB_CONNECTIONS = int(os.environ.get("WEB_CONNECTIONS", 1000))
+    LIVE_SEATS_MAX_STREAMS = int(os.environ.get("LIVE_SEATS_MAX_STREAMS", max(WEB_CONNECTIONS // 2, 1)))
+    # Seconds between seat checks by pages that fell back to polling.
+    LIVE_SEATS_FALLBACK_POLL = int(os.environ.get("LIVE_SEATS_FALLBACK_POLL", 15))
+    LIVE_SEATS_POLL_INTERVAL = float(os.environ.get("LIVE_SEATS_POLL_INTERVAL", 1.0))
+    LIVE_SEATS_HEARTBEAT = float(os.environ.get("LIVE_SEATS_HEARTBEAT", 15))
+
+    # Outgoing mail, delivered by ``flask jobs work``. Use "smtp" with ``flask mail sink`` locally.
+    MAIL_BACKEND = os.environ.get("MAIL_BACKEND", "console")
+    MAIL_SERVER = os.environ.get("MAIL_SERVER", "localhost")
+    MAIL_PORT = int(os.environ.get("MAIL_PORT", 1025))
+    MAIL_USERNAME = os.environ.get("MAIL_USERNAME")
+    MAIL_PASSWORD = os.environ.get("MAIL_PASSWORD")
+    MAIL_USE_TLS = os.environ.get("MAIL_USE_TLS", "").lower() in {"1", "true", "yes"}
+    MAIL_DEFAULT_SENDER = os.environ.get("MAIL_DEFAULT_SENDER", "EventManage <no-reply@eventmanage.io>")
+
+    # Admission control for write endpoints. Buckets are "burst" tokens refilled at "rate" per second,
+    # shared by all workers through ADMISSION_STORE (default: instance/admission.db).
+    ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "true").lower() in {"1", "true", "yes"}
+    ADMISSION_STORE = os.environ.get("ADMISSION_STORE")
+    ADMISSION_USER_BURST = float(os.environ.get("ADMISSION_USER_BURST", 10))
+    ADMISSION_USER_RATE = float(os.environ.get("ADMISSION_USER_RATE", 0.5))
+    ADMISSION_IP_BURST = float(os.environ.get("ADMISSION_IP_BURST", 30))
+    ADMISSION_IP_RATE = float(os.environ.get("ADMISSION_IP_RATE", 1))
+    ADMISSION_ENDPOINT_BURST = float(os.environ.get("ADMISSION_ENDPOINT_BURST", 200))
+    ADMISSION_ENDPOINT_RATE = float(os.environ.get("ADMISSION_ENDPOINT_RATE", 50))
+    # Write requests handled at once across all workers on the host; the rest get an immediate 429.
+    # A slot a crashed worker never released frees itself after ADMISSION_SLOT_TTL seconds.
+    ADMISSION_MAX_CONCURRENT_WRITES = int(os.environ.get("ADMISSION_MAX_CONCURRENT_WRITES", 4))
+    ADMISSION_SLOT_TTL = float(os.environ.get("ADMISSION_SLOT_TTL", 30))
+    # Proxies in front of the app that append to X-Forwarded-For (railway.toml sets 1 for Railway's edge).
+    # Until it is set, the per-IP bucket is keyed on the connecting address and ignores the header.
+    TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", 0))
+
+    # Response compression (gzip, plus brotli when the ``brotli`` package is installed).
+    COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() in {"1", "true", "yes"}
+    COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 4))
+
+    # Event images: originals and thumbnails live under MEDIA_ROOT (default: instance/media).
+    # Uploads and remote URLs are only localized when Pillow is installed.
+    MEDIA_ROOT = os.environ.get("MEDIA_ROOT")
+    IMAGE_WIDTHS = [int(width) for width in os.environ.get("IMAGE_WIDTHS", "320,640,960,1280").split(",") if width.strip()]
+    IMAGE_MAX_BYTES = int(os.environ.get("IMAGE_MAX_BYTES", 10 * 1024 * 1024))
+    IMAGE_PROCESSES = int(os.environ.get("IMAGE_PROCESSES", 2))
+    IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", 82))
+    IMAGE_WEBP_QUALITY = int(os.environ.get("IMAGE_WEBP_QUALITY", 80))
+    IMAGE_FETCH_TIMEOUT = float(os.environ.get("IMAGE_FETCH_TIMEOUT", 10))
+
+    # How long a form's idempotency key replays its first outcome instead of running again.
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get("IDEMPOTENCY_TTL_SECONDS", 600))
+
+    # Opt-in profiling at /admin/profiling. Sample rates are shares of requests (0-1); figures are per worker.
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "").lower() in {"1", "true", "yes"}
+    PROFILING_TRACEMALLOC_FRAMES = int(os.environ.get("PROFILING_TRACEMALLOC_FRAMES", 1))
+    PROFILING_MEMORY_SAMPLE_RATE = float(os.environ.get("PROFILING_MEMORY_SAMPLE_RATE", 0.01))
+    PROFILING_CPU_SAMPLE_RATE = float(os.environ.get("PROFILING_CPU_SAMPLE_RATE", 0))
+    PROFILING_CPU_INTERVAL = float(os.environ.get("PROFILING_CPU_INTERVAL", 0.005))
+    PROFILING_KEEP_PROFILES = int(os.environ.get("PROFILING_KEEP_PROFILES", 20))
+
+    # How far ahead open-ended listings expand recurring series.
+    SERIES_HORIZON_DAYS = int(os.environ.get("SERIES_HORIZON_DAYS", 90))
+
+    # Bearer token for /api/v1/changes; the endpoint is disabled when unset.
+    CHANGE_FEED_TOKEN = os.environ.get("CHANGE_FEED_TOKEN")
@@ -0,0 +1,45 @@
+"""Time read-only pages in-process and count the SQL statements each request runs.
+
+Point DATABASE_URL at a copy of a realistic database, e.g.:
+
+    DATABASE_URL=sqlite:///C:/tmp/events-copy.db python scripts/bench_home.py --requests 200
+"""
+from pathlib import Path
+import argparse
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import event as sa_event  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("paths", nargs="*", default=["/events/", "/events/events"])
+parser.add_argument("--requests", type=int, default=100)
+args = parser.parse_args()
+
+app = create_app()
+statements = []
+with app.app_context():
+    sa_event.listen(db.engine, "before_cursor_execute", lambda *_: statements.append(None))
+
+client = app.test_client()
+for path in args.paths:
+    client.get(path).close()  # warm caches
+    timings = []
+    statements.clear()
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        response = client.get(path)
+        response.get_data()
+        timings.append((time.perf_counter() - started) * 1000)
+        response.close()
+    timings.sort()
+    print(
+        f"{path}: median {statistics.median(timings):.2f} ms, "
+        f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, "
+        f"{len(statements) / args.requests:.1f} queries/request"
+    )
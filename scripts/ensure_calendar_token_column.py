@@ -0,0 +1,21 @@
+"""Ensure the user table has the calendar_token column used by personal calendar feeds."""
+from pathlib import Path
+import sqlite3
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DB_PATH = BASE_DIR / "instance" / "events.db"
+
+if not DB_PATH.exists():
+    raise SystemExit(f"Database file not found at {DB_PATH}. Run the app once to create it.")
+
+with sqlite3.connect(DB_PATH) as conn:
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(user)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if "calendar_token" not in columns:
+        cursor.execute("ALTER TABLE user ADD COLUMN calendar_token VARCHAR(64)")
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS ix_user_calendar_token ON user (calendar_token)")
+        conn.commit()
+        print("Added calendar_token column to user table.")
+    else:
+        print("calendar_token column already present. No changes made.")
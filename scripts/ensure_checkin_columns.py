@@ -0,0 +1,38 @@
+"""Ensure the registration table has the check-in column and UID index."""
+from pathlib import Path
+import sqlite3
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DB_PATH = BASE_DIR / "instance" / "events.db"
+
+if not DB_PATH.exists():
+    raise SystemExit(f"Database file not found at {DB_PATH}. Run the app once to create it.")
+
+with sqlite3.connect(DB_PATH) as conn:
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(registration)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if "checked_in_at" not in columns:
+        cursor.execute("ALTER TABLE registration ADD COLUMN checked_in_at DATETIME")
+        print("Added checked_in_at column to registration table.")
+    else:
+        print("checked_in_at column already present.")
+
+    cursor.execute(
+        """
+        SELECT event_id, student_uid, COUNT(*) FROM registration
+        WHERE student_uid IS NOT NULL
+        GROUP BY event_id, student_uid HAVING COUNT(*) > 1
+        """
+    )
+    duplicates = cursor.fetchall()
+    if duplicates:
+        for event_id, student_uid, count in duplicates:
+            print(f"Event {event_id} has {count} registrations with UID {student_uid!r}.")
+        raise SystemExit("Resolve the duplicate UIDs above, then run this script again.")
+
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_registration_event_student_uid ON registration (event_id, student_uid)"
+    )
+    conn.commit()
+    print("Unique (event_id, student_uid) index is in place.")
@@ -0,0 +1,32 @@
+"""Ensure the event table has the recurring-series columns and occurrence index."""
+from pathlib import Path
+import sqlite3
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DB_PATH = BASE_DIR / "instance" / "events.db"
+
+COLUMNS = {
+    "series_id": "INTEGER REFERENCES event_series(id)",
+    "occurrence_start": "DATETIME",
+    "is_exception": "BOOLEAN NOT NULL DEFAULT 0",
+}
+
+if not DB_PATH.exists():
+    raise SystemExit(f"Database file not found at {DB_PATH}. Run the app once to create it.")
+
+with sqlite3.connect(DB_PATH) as conn:
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(event)")
+    columns = [row[1] for row in cursor.fetchall()]
+    for name, definition in COLUMNS.items():
+        if name not in columns:
+            cursor.execute(f"ALTER TABLE event ADD COLUMN {name} {definition}")
+            print(f"Added {name} column to event table.")
+        else:
+            print(f"{name} column already present.")
+
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_event_series_occurrence ON event (series_id, occurrence_start)"
+    )
+    conn.commit()
+    print("Unique (series_id, occurrence_start) index is in place.")
@@ -0,0 +1,29 @@
+"""Ensure the user table has the registration/interest counters and bring them up to date."""
+from pathlib import Path
+import sqlite3
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DB_PATH = BASE_DIR / "instance" / "events.db"
+
+COUNTERS = {
+    "registration_count": "registration",
+    "interest_count": "event_interest",
+}
+
+if not DB_PATH.exists():
+    raise SystemExit(f"Database file not found at {DB_PATH}. Run the app once to create it.")
+
+with sqlite3.connect(DB_PATH) as conn:
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(user)")
+    columns = [row[1] for row in cursor.fetchall()]
+    for name, table in COUNTERS.items():
+        if name not in columns:
+            cursor.execute(f"ALTER TABLE user ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0")
+            print(f"Added {name} column to user table.")
+        else:
+            print(f"{name} column already present.")
+        # Recount from scratch; safe to re-run if the counters ever drift.
+        cursor.execute(f"UPDATE user SET {name} = (SELECT COUNT(*) FROM {table} WHERE {table}.user_id = user.id)")
+    conn.commit()
+    print("Recounted registrations and interests for every user.")
@@ -0,0 +1,68 @@
+"""Give waitlist entries tickets and add the per-event queue counters they are ordered by."""
+from pathlib import Path
+import sqlite3
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+DB_PATH = BASE_DIR / "instance" / "events.db"
+
+if not DB_PATH.exists():
+    raise SystemExit(f"Database file not found at {DB_PATH}. Run the app once to create it.")
+
+with sqlite3.connect(DB_PATH) as conn:
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(waitlist_entry)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if not columns:
+        raise SystemExit("No waitlist_entry table yet; the app creates it with the new layout.")
+
+    cursor.execute("UPDATE waitlist_entry SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    cursor.execute("DROP INDEX IF EXISTS ix_waitlist_event_position")
+    cursor.execute("DROP INDEX IF EXISTS ix_waitlist_event_queue")
+    if "position" in columns:
+        cursor.execute("ALTER TABLE waitlist_entry DROP COLUMN position")
+        print("Dropped position column from waitlist_entry table.")
+
+    if "ticket" not in columns:
+        cursor.execute("ALTER TABLE waitlist_entry ADD COLUMN ticket INTEGER NOT NULL DEFAULT 0")
+        # Entries were appended in join order, so (created_at, id) numbers each queue from 1.
+        cursor.execute(
+            """
+            UPDATE waitlist_entry SET ticket = (
+                SELECT COUNT(*) FROM waitlist_entry AS ahead
+                WHERE ahead.event_id = waitlist_entry.event_id
+                  AND (ahead.created_at < waitlist_entry.created_at
+                       OR (ahead.created_at = waitlist_entry.created_at AND ahead.id <= waitlist_entry.id))
+            )
+            """
+        )
+        print("Added ticket column to waitlist_entry table.")
+    else:
+        print("ticket column already exists.")
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_waitlist_event_ticket ON waitlist_entry (event_id, ticket)"
+    )
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS waitlist_queue (
+            event_id INTEGER NOT NULL PRIMARY KEY REFERENCES event (id) ON DELETE CASCADE,
+            tail INTEGER NOT NULL,
+            head INTEGER NOT NULL
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS waitlist_departure (
+            event_id INTEGER NOT NULL REFERENCES event (id) ON DELETE CASCADE,
+            ticket INTEGER NOT NULL,
+            PRIMARY KEY (event_id, ticket)
+        )
+        """
+    )
+    cursor.execute(
+        "INSERT OR IGNORE INTO waitlist_queue (event_id, tail, head) "
+        "SELECT event_id, MAX(ticket), MIN(ticket) FROM waitlist_entry GROUP BY event_id"
+    )
+    conn.commit()
+    print("Waitlist tickets and queue counters are in place.")
@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+import pytest
+
+_scratch = tempfile.mkdtemp()
+# Config reads these at import, so they are set before the app package loads.
+os.environ["DATABASE_URL"] = f"sqlite:///{_scratch}/test.db"
+os.environ["ADMISSION_STORE"] = f"{_scratch}/admission.db"
+
+from app import create_app, db  # noqa: E402
+from app.models import seed_admin, seed_sample_events  # noqa: E402
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, ADMISSION_ENABLED=False)
+    with app.app_context():
+        seed_admin()
+        seed_sample_events()
+    # Requests get their own app context (and ``g``), as they would in a worker.
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture()
+def admin_client(app):
+    client = app.test_client()
+    response = client.post("/auth/login", data={"email": "admin@example.com", "password": "admin123"})
+    assert response.status_code == 302
+    return client
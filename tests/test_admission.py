@@ -0,0 +1,42 @@
+from flask import jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from app.admission import AdmissionController
+
+
+def _ip_buckets(controller):
+    return [key for key, *_ in controller.buckets("auth.login") if key.startswith("ip:")]
+
+
+def test_untrusted_forwarded_for_cannot_dodge_ip_bucket(app):
+    controller = AdmissionController(app.config, app.instance_path)
+    with app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+        assert _ip_buckets(controller) == ["ip:auth.login:10.0.0.1"]
+    with app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.1"}, headers={"X-Forwarded-For": "203.0.113.7"}):
+        assert _ip_buckets(controller) == ["ip:auth.login:10.0.0.1"]
+
+
+def test_trusted_proxy_keys_ip_bucket_on_client_address(app):
+    app.config["TRUSTED_PROXY_HOPS"] = 1
+    controller = AdmissionController(app.config, app.instance_path)
+    app.add_url_rule("/ip-buckets", "ip_buckets", lambda: jsonify(_ip_buckets(controller)))
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+    client = app.test_client()
+    for address in ("203.0.113.7", "198.51.100.2"):
+        response = client.get("/ip-buckets", headers={"X-Forwarded-For": address}, environ_base={"REMOTE_ADDR": "10.0.0.1"})
+        assert response.get_json() == [f"ip:auth.login:{address}"]
+
+
+def test_concurrency_cap_is_shared_by_workers(app):
+    app.config.update(ADMISSION_MAX_CONCURRENT_WRITES=1, ADMISSION_SLOT_TTL=30)
+    first, second = (AdmissionController(app.config, app.instance_path) for _ in range(2))
+    slot = first.acquire()
+    assert slot is not None and second.acquire() is None
+    first.release(slot)
+    second.release(second.acquire())
+
+    # A slot whose worker died without releasing it lapses after the TTL.
+    app.config["ADMISSION_SLOT_TTL"] = -1
+    assert AdmissionController(app.config, app.instance_path).acquire() is not None
+    assert second.acquire() is not None
@@ -0,0 +1,24 @@
+from datetime import datetime, timedelta
+
+from app import api
+
+
+class _Clock(datetime):
+    now_value = datetime(2031, 5, 1, 23, 59, 30)
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now_value
+
+
+def test_clock_dependent_filters_roll_their_etag(app, monkeypatch):
+    monkeypatch.setattr(api, "datetime", _Clock)
+    client = app.test_client()
+    # Only plain fields, so serialization never meets the patched datetime class.
+    paths = ("/api/v1/events?fields=id&timeframe=today", "/api/v1/events?fields=id&upcoming=1", "/api/v1/events?fields=id")
+    tags = {path: client.get(path).headers["ETag"] for path in paths}
+
+    _Clock.now_value += timedelta(minutes=1)
+    for path, tag in tags.items():
+        response = client.get(path, headers={"If-None-Match": tag})
+        assert response.status_code == (304 if path == paths[2] else 200), path
@@ -0,0 +1,23 @@
+from app import db
+from app.models import User
+
+
+def test_calendar_link_is_only_issued_on_post(app):
+    with app.app_context():
+        user = User(name="Cal Endar", email="cal@example.com")
+        user.set_password("password1")
+        db.session.add(user)
+        db.session.commit()
+    client = app.test_client()
+    client.post("/auth/login", data={"email": "cal@example.com", "password": "password1"})
+
+    page = client.get("/events/my-registrations").get_data(as_text=True)
+    assert "Create calendar link" in page
+    with app.app_context():
+        assert User.query.filter_by(email="cal@example.com").one().calendar_token is None
+
+    assert client.post("/events/calendar/reset-token").status_code == 302
+    with app.app_context():
+        token = User.query.filter_by(email="cal@example.com").one().calendar_token
+    assert token and f"/events/calendar/{token}.ics" in client.get("/events/my-registrations").get_data(as_text=True)
+    assert client.get(f"/events/calendar/{token}.ics").status_code == 200
@@ -0,0 +1,29 @@
+from collections import Counter
+
+from app import db
+from app.models import ChangeLogEntry, Event, EventInterest, Registration, User
+
+
+def test_deleting_an_event_logs_its_cascaded_rows(app, admin_client):
+    with app.app_context():
+        user = User(name="Case Cade", email="cascade@example.com")
+        user.set_password("password1")
+        db.session.add(user)
+        event = Event.query.first()
+        db.session.add_all([
+            Registration(user=user, event=event, attendee_name="Case Cade", attendee_email="cascade@example.com"),
+            EventInterest(user=user, event=event),
+        ])
+        db.session.commit()
+        event_id = event.id
+        registration_id, interest_id = event.registrations[0].id, event.interests[0].id
+        since = db.session.query(db.func.max(ChangeLogEntry.seq)).scalar() or 0
+
+    assert admin_client.post(f"/admin/events/{event_id}/delete").status_code == 302
+
+    with app.app_context():
+        deletes = Counter(
+            (entry.entity, entry.entity_id)
+            for entry in ChangeLogEntry.query.filter(ChangeLogEntry.seq > since, ChangeLogEntry.action == "delete")
+        )
+    assert deletes == {("event", event_id): 1, ("registration", registration_id): 1, ("interest", interest_id): 1}
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from app import db
+from app.models import Event, Registration, User
+from app.summaries import SUPER_SCOPE, dashboard_summary, rebuild_summaries
+
+
+def _register(event, count):
+    for number in range(count):
+        user = User(name=f"Attendee {number}", email=f"attendee{number}@example.com")
+        user.set_password("password1")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(
+            Registration(
+                user_id=user.id,
+                event_id=event.id,
+                attendee_name=user.name,
+                attendee_email=user.email,
+                student_uid=f"UID{number}",
+            )
+        )
+    db.session.commit()
+
+
+def test_resent_bulk_batch_checks_in_once(app, admin_client):
+    with app.app_context():
+        event = Event.query.order_by(Event.id).first()
+        _register(event, 3)
+        event_id, scope = event.id, event.event_type
+    scanned_at = datetime(2030, 1, 1, 9, 30).isoformat()
+    batch = {"scans": [{"uid": f"UID{number}", "scanned_at": scanned_at} for number in range(3)] + [{"uid": "NOPE"}]}
+    url = f"/admin/events/{event_id}/check-in/bulk"
+
+    first = admin_client.post(url, json=batch).get_json()
+    assert [item["status"] for item in first["results"]] == ["checked_in"] * 3 + ["not_found"]
+    assert first["checked_in"] == 3
+
+    # A kiosk that lost the first response sends the same batch again.
+    second = admin_client.post(url, json=batch).get_json()
+    assert [item["status"] for item in second["results"]] == ["already_checked_in"] * 3 + ["not_found"]
+    assert [item.get("checked_in_at") for item in second["results"]] == [item.get("checked_in_at") for item in first["results"]]
+    assert second["checked_in"] == 3
+
+    with app.app_context():
+        assert dashboard_summary(SUPER_SCOPE)["checked_in"] == 3
+        assert dashboard_summary(scope)["checked_in"] == 3
+        rebuild_summaries([SUPER_SCOPE])
+        assert dashboard_summary(SUPER_SCOPE)["checked_in"] == 3
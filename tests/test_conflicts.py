@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.conflicts import conflict_report, venue_conflicts
+from app.models import Event, EventSeries
+
+START = datetime.utcnow().replace(hour=18, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+
+def _form(start, **extra):
+    return {
+        "title": "Chess Club", "summary": "Weekly", "description": "Weekly chess.", "location": "Room 101",
+        "start_time": start.isoformat(timespec="minutes"),
+        "end_time": (start + timedelta(hours=2)).isoformat(timespec="minutes"),
+        "capacity": "20", "event_type": "Technical", **extra,
+    }
+
+
+def test_one_off_events_clash_with_unbooked_series_dates(app, admin_client):
+    admin_client.post("/admin/events/new", data=_form(START, frequency="weekly", interval="1"))
+    third_week = START + timedelta(weeks=2, hours=1)
+    with app.app_context():
+        assert db.session.query(Event).filter_by(location="Room 101").count() == 0
+        clashes = venue_conflicts("room  101", third_week, third_week + timedelta(hours=1))
+        assert [clash.start_time for clash in clashes] == [START + timedelta(weeks=2)]
+
+        report = conflict_report()
+        assert report["venues"] == []
+
+    response = admin_client.post("/admin/events/new", data=_form(third_week, title="Movie Night"), follow_redirects=True)
+    assert b"Room 101 is also booked for &#34;Chess Club&#34;" in response.data
+    page = admin_client.get("/admin/conflicts").get_data(as_text=True)
+    assert "Movie Night" in page and "Chess Club" in page
+
+
+def test_new_series_is_checked_on_every_date(app, admin_client):
+    with app.app_context():
+        db.session.add(Event(**{**_form(START + timedelta(weeks=3), title="Exam"), "capacity": 20,
+                                "start_time": START + timedelta(weeks=3),
+                                "end_time": START + timedelta(weeks=3, hours=2)}))
+        db.session.commit()
+
+    response = admin_client.post(
+        "/admin/events/new", data=_form(START, frequency="weekly", interval="1"), follow_redirects=True
+    )
+    assert b"Room 101 is also booked for &#34;Exam&#34;" in response.data
+    with app.app_context():
+        assert EventSeries.query.filter_by(title="Chess Club").count() == 1
@@ -0,0 +1,24 @@
+from app import db
+from app.cache import CATALOG_VERSION, FACETS_VERSION, current_data_version
+from app.models import Event, Registration, User
+
+
+def test_registrations_leave_the_facets_version_alone(app):
+    with app.app_context():
+        user = User(name="Face Ted", email="facets@example.com")
+        user.set_password("password1")
+        db.session.add(user)
+        db.session.commit()
+        event = Event.query.first()
+        catalog = current_data_version(CATALOG_VERSION, max_age=0)
+        facets = current_data_version(FACETS_VERSION, max_age=0)
+
+        db.session.add(Registration(user_id=user.id, event_id=event.id, attendee_name="Face Ted",
+                                 attendee_email="facets@example.com"))
+        db.session.commit()
+        assert current_data_version(CATALOG_VERSION, max_age=0) == catalog + 1
+        assert current_data_version(FACETS_VERSION, max_age=0) == facets
+
+        event.title = "Renamed"
+        db.session.commit()
+        assert current_data_version(FACETS_VERSION, max_age=0) == facets + 1
@@ -0,0 +1,56 @@
+from app import db, idempotency
+from app.models import Event, Registration, User
+
+
+REGISTRATION = {
+    "attendee_name": "Idem Potent",
+    "attendee_email": "idem@example.com",
+    "department": "CS",
+    "section": "A",
+    "student_uid": "IDEM1",
+    "team_selection": "Solo",
+    "agreement": "on",
+}
+
+
+def _client(app):
+    with app.app_context():
+        user = User(name="Idem Potent", email="idem@example.com")
+        user.set_password("password1")
+        db.session.add(user)
+        db.session.commit()
+        url = f"/events/events/{Event.query.order_by(Event.id).first().id}/register"
+    client = app.test_client()
+    assert client.post("/auth/login", data={"email": "idem@example.com", "password": "password1"}).status_code == 302
+    return client, url
+
+
+def _flashes(client):
+    with client.session_transaction() as session:
+        return session.pop("_flashes", [])
+
+
+def test_repeated_key_replays_first_outcome(app):
+    client, url = _client(app)
+    _flashes(client)
+    first = client.post(url, data={**REGISTRATION, "idempotency_key": "key-aaaaaaaaaaaa"})
+    first_flashes = _flashes(client)
+    again = client.post(url, data={**REGISTRATION, "idempotency_key": "key-aaaaaaaaaaaa"})
+    assert again.status_code == first.status_code == 302
+    assert again.location == first.location
+    assert _flashes(client) == first_flashes == [("success", "You have been registered for the event!")]
+    with app.app_context():
+        assert Registration.query.filter_by(attendee_email="idem@example.com").count() == 1
+
+
+def test_admission_runs_before_key_lookup(app, monkeypatch):
+    client, url = _client(app)
+    app.config.update(ADMISSION_ENABLED=True, ADMISSION_USER_BURST=1, ADMISSION_USER_RATE=0.001)
+    app.extensions.pop("admission", None)
+    lookups = []
+    real_lookup = idempotency._lookup
+    monkeypatch.setattr(idempotency, "_lookup", lambda *args: lookups.append(args) or real_lookup(*args))
+
+    assert client.post(url, data={**REGISTRATION, "idempotency_key": "key-bbbbbbbbbbbb"}).status_code == 302
+    assert client.post(url, data={**REGISTRATION, "idempotency_key": "key-bbbbbbbbbbbb"}).status_code == 429
+    assert len(lookups) == 1
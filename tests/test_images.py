@@ -0,0 +1,46 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from app import images
+from app.images import ImageError, _download
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/hop":
+            self.send_response(302)
+            self.send_header("Location", f"http://127.0.0.2:{self.server.server_port}/image")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"image bytes")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    httpd = HTTPServer(("0.0.0.0", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_port
+    httpd.shutdown()
+
+
+def test_private_hosts_are_refused(app, server):
+    with app.app_context():
+        for host in ("127.0.0.1", "localhost", "[::1]", "169.254.169.254"):
+            with pytest.raises(ImageError):
+                _download(f"http://{host}:{server}/image")
+
+
+def test_redirects_to_private_hosts_are_refused(app, server, monkeypatch):
+    # Treat 127.0.0.1 as the public origin; its redirect points at another loopback address.
+    monkeypatch.setattr(images, "_is_public", lambda address: str(address) == "127.0.0.1")
+    with app.app_context():
+        assert _download(f"http://127.0.0.1:{server}/image") == b"image bytes"
+        with pytest.raises(ImageError):
+            _download(f"http://127.0.0.1:{server}/hop")
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.jobs import prune, prune_command
+from app.models import Job
+
+
+def test_prune_keeps_pending_and_recent_jobs(app):
+    old = datetime.utcnow() - timedelta(days=10)
+    with app.app_context():
+        db.session.add_all(
+            [
+                Job(kind="old.done", status="done", finished_at=old),
+                Job(kind="old.failed", status="failed", finished_at=old),
+                Job(kind="recent.done", status="done", finished_at=datetime.utcnow()),
+                Job(kind="queued", status="queued", run_at=old),
+                Job(kind="running", status="running", run_at=old),
+            ]
+        )
+        db.session.commit()
+
+        assert prune(timedelta(days=7)) == 2
+        assert sorted(job.kind for job in Job.query) == ["queued", "recent.done", "running"]
+
+    result = app.test_cli_runner().invoke(prune_command, ["--keep-days", "0"])
+    assert "Removed 1 finished job(s)." in result.output
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Event
+
+
+def _event(app, seats_left, index=0, start_time=None):
+    with app.app_context():
+        event = Event.query.filter(Event.start_time > datetime.utcnow()).order_by(Event.id).offset(index).first()
+        event.capacity = seats_left + len(event.registrations)
+        event.start_time = start_time or event.start_time
+        db.session.commit()
+        return event.id
+
+
+def test_upcoming_events_stream_seats_even_when_sold_out(app):
+    client = app.test_client()
+    roomy, sold_out = _event(app, seats_left=50), _event(app, seats_left=0, index=1)
+    assert b"data-live-seats-url" in client.get(f"/events/events/{roomy}").data
+    assert b"data-live-seats-url" in client.get(f"/events/events/{sold_out}").data
+
+    response = client.get(f"/events/events/{sold_out}/seats/stream")
+    assert response.status_code == 200 and response.mimetype == "text/event-stream"
+    response.close()
+
+
+def test_past_events_render_seats_once(app):
+    event_id = _event(app, seats_left=1, start_time=datetime.utcnow() - timedelta(days=1))
+    assert b"data-live-seats-url" not in app.test_client().get(f"/events/events/{event_id}").data
+
+
+def test_polling_fallback_when_streams_run_out(app):
+    app.config["LIVE_SEATS_MAX_STREAMS"] = 0
+    client = app.test_client()
+    event_id = _event(app, seats_left=3)
+    assert client.get(f"/events/events/{event_id}/seats/stream").status_code == 503
+
+    seats = client.get(f"/events/events/{event_id}/seats")
+    assert seats.json["seats_remaining"] == 3
+    again = client.get(f"/events/events/{event_id}/seats", headers={"If-None-Match": seats.headers["ETag"]})
+    assert again.status_code == 304
+
+    _event(app, seats_left=2)
+    changed = client.get(f"/events/events/{event_id}/seats", headers={"If-None-Match": seats.headers["ETag"]})
+    assert changed.status_code == 200 and changed.json["seats_remaining"] == 2
@@ -0,0 +1,67 @@
+import random
+
+from app import db
+from app.changes import record_change
+from app.models import Event, EventInterest, EventRecommendation, Registration, User
+from app.recommendations import refresh
+
+
+def _user(number):
+    user = User(name=f"Fan {number}", email=f"fan{number}@example.com")
+    user.set_password("password1")
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+def _register(user, event):
+    registration = Registration(
+        user_id=user.id, event_id=event.id, attendee_name=user.name, attendee_email=user.email, student_uid=f"R{user.id}"
+    )
+    db.session.add(registration)
+    record_change(registration, "create")
+    return registration
+
+
+def _save(user, event):
+    interest = EventInterest(user_id=user.id, event_id=event.id)
+    db.session.add(interest)
+    record_change(interest, "create")
+    return interest
+
+
+def _model():
+    return sorted(db.session.query(EventRecommendation.event_id, EventRecommendation.rank, EventRecommendation.recommended_event_id))
+
+
+def test_incremental_refresh_matches_full_rebuild(app):
+    picks = random.Random(7)
+    with app.app_context():
+        events = Event.query.order_by(Event.id).all()
+        users = [_user(number) for number in range(12)]
+        signals = []
+        for user in users:
+            for event in picks.sample(events, 4):
+                signals.append(_register(user, event) if picks.random() < 0.6 else _save(user, event))
+        db.session.commit()
+        assert refresh()["full"]
+        assert refresh()["skipped"]
+
+        # New signals, a cancellation, a removed interest and a deleted event.
+        for user in users[:3]:
+            taken = {row.event_id for row in user.registrations} | {row.event_id for row in user.interests}
+            _register(user, next(event for event in events if event.id not in taken))
+        for signal in (signals[0], next(row for row in signals if isinstance(row, EventInterest))):
+            record_change(signal, "delete")
+            db.session.delete(signal)
+        doomed = events[-1]
+        record_change(doomed, "delete")
+        db.session.delete(doomed)
+        db.session.commit()
+
+        result = refresh()
+        assert not result["full"] and result["changed"]
+        incremental = _model()
+        assert refresh(full=True)["changed"] == 0
+        assert _model() == incremental
+        assert all(doomed.id not in row for row in incremental)
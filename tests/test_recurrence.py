@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Event, EventSeries, SeriesExclusion
+from app.recurrence import exclude_occurrence, find_occurrence, materialize, occurrences_between
+
+START = datetime(2031, 3, 3, 18, 0)
+
+
+def _series(app):
+    with app.app_context():
+        series = EventSeries(
+            title="Study Night", summary="Weekly", description="Weekly study night.", location="Library",
+            start_time=START, end_time=START + timedelta(hours=2), capacity=20, event_type="Technical",
+            frequency="weekly", interval=1,
+        )
+        db.session.add(series)
+        db.session.flush()
+        materialize(find_occurrence(series.id, (START + timedelta(weeks=1)).strftime("%Y%m%dT%H%M")))
+        exclude_occurrence(series, START + timedelta(weeks=2))
+        db.session.commit()
+        return series.id
+
+
+def _edit(admin_client, series_id, start, **extra):
+    form = {
+        "title": "Study Night", "summary": "Weekly", "description": "Weekly study night.", "location": "Library",
+        "start_time": start.isoformat(timespec="minutes"),
+        "end_time": (start + timedelta(hours=3)).isoformat(timespec="minutes"),
+        "capacity": "20", "event_type": "Technical", "frequency": "weekly", "interval": "1", **extra,
+    }
+    return admin_client.post(f"/admin/series/{series_id}/edit", data=form)
+
+
+def test_time_change_moves_booked_and_cancelled_dates(app, admin_client):
+    series_id = _series(app)
+    new_start = START + timedelta(days=1, minutes=30)
+    assert _edit(admin_client, series_id, new_start).status_code == 302
+
+    with app.app_context():
+        booked = Event.query.filter_by(series_id=series_id).one()
+        assert booked.occurrence_start == booked.start_time == new_start + timedelta(weeks=1)
+        assert booked.end_time == booked.start_time + timedelta(hours=3)
+        excluded = SeriesExclusion.query.filter_by(series_id=series_id).one()
+        assert excluded.occurrence_start == new_start + timedelta(weeks=2)
+
+        window = occurrences_between(START, START + timedelta(weeks=4))
+        virtual = [o.start_time for o in window if o.series_id == series_id]
+        assert virtual == [new_start, new_start + timedelta(weeks=3)]
+
+
+def test_rule_without_a_slot_for_a_booked_date_is_refused(app, admin_client):
+    series_id = _series(app)
+    with app.app_context():
+        series = db.session.get(EventSeries, series_id)
+        series.start_time, series.end_time = datetime(2031, 1, 15, 18), datetime(2031, 1, 15, 20)
+        series.frequency = "monthly"
+        db.session.query(Event).filter_by(series_id=series_id).update({"occurrence_start": datetime(2031, 2, 15, 18)})
+        db.session.query(SeriesExclusion).filter_by(series_id=series_id).delete()
+        db.session.commit()
+
+    # The booked February date would move to February 31st.
+    response = _edit(admin_client, series_id, datetime(2031, 1, 31, 18), frequency="monthly")
+    assert response.status_code == 200 and b"no date matching Feb 15, 2031" in response.data
+    with app.app_context():
+        assert db.session.get(EventSeries, series_id).start_time == datetime(2031, 1, 15, 18)
+        assert Event.query.filter_by(series_id=series_id).one().occurrence_start == datetime(2031, 2, 15, 18)
@@ -0,0 +1,60 @@
+from app import db
+from app.models import Event, Registration, User, WaitlistDeparture, WaitlistEntry, WaitlistQueue
+from app.waitlist import join_waitlist, leave_waitlist, promote_waitlist, queue_position, waitlist_size
+
+
+def _queue(event, count):
+    entries = []
+    for number in range(count):
+        user = User(name=f"Queued {number}", email=f"queued{number}@example.com")
+        user.set_password("password1")
+        db.session.add(user)
+        db.session.flush()
+        details = {"attendee_name": user.name, "attendee_email": user.email, "student_uid": f"Q{number}"}
+        entries.append(join_waitlist(user.id, event, details))
+    db.session.commit()
+    return entries
+
+
+def test_queue_order_survives_leaving_and_promotion(app):
+    with app.app_context():
+        event = Event.query.order_by(Event.id).first()
+        event.capacity = len(event.registrations)
+        db.session.commit()
+        first, second, third, fourth = _queue(event, 4)
+        assert [queue_position(entry) for entry in (first, second, third, fourth)] == [1, 2, 3, 4]
+
+        leave_waitlist(second)
+        db.session.commit()
+        assert [queue_position(entry) for entry in (first, third, fourth)] == [1, 2, 3]
+
+        event.capacity += 2
+        promoted = promote_waitlist(event)
+        db.session.commit()
+        assert [registration.attendee_email for registration in promoted] == [first.attendee_email, third.attendee_email]
+        assert waitlist_size(event.id) == 1
+        assert queue_position(fourth) == 1
+        assert WaitlistEntry.query.filter_by(event_id=event.id).one().id == fourth.id
+        assert Registration.query.filter_by(event_id=event.id, student_uid="Q0").count() == 1
+        # The head passed the second entry's departure, so it no longer shortens anyone's place.
+        assert WaitlistDeparture.query.filter_by(event_id=event.id).count() == 0
+        assert db.session.get(WaitlistQueue, event.id).head == fourth.ticket
+
+
+def test_positions_follow_tickets_after_front_and_middle_departures(app):
+    with app.app_context():
+        event = Event.query.order_by(Event.id).first()
+        event.capacity = len(event.registrations)
+        db.session.commit()
+        entries = _queue(event, 5)
+        assert [entry.ticket for entry in entries] == [1, 2, 3, 4, 5]
+
+        leave_waitlist(entries[0])
+        leave_waitlist(entries[2])
+        db.session.commit()
+        assert [queue_position(entry) for entry in (entries[1], entries[3], entries[4])] == [1, 2, 3]
+
+        db.session.delete(entries[1].user)
+        db.session.commit()
+        assert [queue_position(entry) for entry in (entries[3], entries[4])] == [1, 2]
+        assert WaitlistDeparture.query.filter_by(event_id=event.id).count() == 0
@@ -1,11 +1,18 @@
 print("WSGI starting...")
 
+from werkzeug.middleware.proxy_fix import ProxyFix
+
 from app import create_app
 
 print("Calling create_app()...")
 app = create_app()
 print("create_app() succeeded.")
 
+if app.config["TRUSTED_PROXY_HOPS"]:
+    # The socket peer is the proxy, so the client address comes from X-Forwarded-For.
+    hops = app.config["TRUSTED_PROXY_HOPS"]
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
 if __name__ == "__main__":
     # Force Flask dev server to run
     app.run(host="127.0.0.1", port=5000, debug=True)